@@ -1,9 +1,79 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Optional, Sequence
+
+def _first_true(mask: np.ndarray) -> np.ndarray:
+    # Offset of the first True per row, or the row length when there is none
+    if mask.size == 0:
+        # No entries, or a zero-width window: argmax has nothing to reduce over
+        return np.full(len(mask), mask.shape[1], dtype=np.int64)
+    first = mask.argmax(axis=1)
+    return np.where(mask[np.arange(len(mask)), first], first, mask.shape[1])
+
+def level_offsets(windows: np.ndarray, level: np.ndarray, above: bool) -> np.ndarray:
+    """Offset of the first bar in each forward window at or beyond level (window length when none is)."""
+    return _first_true(windows >= level[:, None] if above else windows <= level[:, None])
+
+def resolve_hits(upper_offset: np.ndarray, lower_offset: np.ndarray, width: int) -> Dict[str, np.ndarray]:
+    # The upper level wins ties, just like the take-profit check in the original day-by-day loop
+    upper = (upper_offset <= lower_offset) & (upper_offset < width)
+    return {
+        'offset': np.minimum(upper_offset, lower_offset),
+        'upper': upper,
+        'lower': ~upper & (lower_offset < width),
+    }
+
+def first_hits(windows: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> Dict[str, np.ndarray]:
+    """Locate the first bar in each forward window at or beyond either level.
+
+    Returns the offset of the first hit (window length when neither level is
+    reached) and whether that hit was the upper or the lower level.
+    """
+    return resolve_hits(level_offsets(windows, upper, True), level_offsets(windows, lower, False), windows.shape[1])
+
+def exit_prices(hits: Dict[str, np.ndarray], take_profit: np.ndarray, stop_loss: np.ndarray,
+                hold: np.ndarray) -> np.ndarray:
+    """Sell at the level hit first, otherwise at the close after the holding period."""
+    return np.where(hits['upper'], take_profit, np.where(hits['lower'], stop_loss, hold))
+
+def simulate_trades(close: np.ndarray, score: np.ndarray, holding_days: int = 10, min_score: float = 4.5,
+                    stop_loss_pct: float = 5, take_profit_pct: float = 10, chunk_size: int = 65536) -> Dict[str, np.ndarray]:
+    """Array version of the backtest_strategy trade loop.
+
+    Every bar with score >= min_score (and a full holding window after it)
+    opens a trade that exits at the take-profit or stop-loss level on the
+    first bar that touches it, otherwise at the close holding_days later.
+    """
+    close = np.asarray(close, dtype='float64')
+    score = np.asarray(score, dtype='float64')
+    last_entry = max(len(close) - holding_days, 0)
+    entry = np.flatnonzero(score[:last_entry] >= min_score)
+
+    buy_price = close[entry]
+    max_hold_price = buy_price * (1 + take_profit_pct / 100)
+    min_hold_price = buy_price * (1 - stop_loss_pct / 100)
+    sell_price = close[entry + holding_days]
+
+    if holding_days > 0 and len(entry):
+        # Row i of the view is close[i + 1 : i + 1 + holding_days], so no copy until it is indexed
+        forward = sliding_window_view(close[1:], holding_days)
+        for start in range(0, len(entry), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            hits = first_hits(forward[entry[chunk]], max_hold_price[chunk], min_hold_price[chunk])
+            sell_price[chunk] = exit_prices(hits, max_hold_price[chunk], min_hold_price[chunk], sell_price[chunk])
+
+    return {
+        'entry': entry,
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'return_pct': ((sell_price - buy_price) / buy_price) * 100,
+    }
 
 def backtest_strategy(df: pd.DataFrame, holding_days: int = 10, min_score: float = 4.5, stop_loss_pct: float = 5, take_profit_pct: float = 10) -> List[Dict]:
     results = []
-    df = df.copy()
     df = df.dropna()
 
     # Validate inputs
@@ -17,33 +87,104 @@ def backtest_strategy(df: pd.DataFrame, holding_days: int = 10, min_score: float
         print("⚠ DataFrame index is not a DatetimeIndex")
         return []
 
-    for i in range(len(df) - holding_days):
-        row = df.iloc[i]
+    trades = simulate_trades(df['Close'].to_numpy(dtype='float64'), df['Score'].to_numpy(dtype='float64'),
+                             holding_days, min_score, stop_loss_pct, take_profit_pct)
+    buy_dates = df.index[trades['entry']].strftime('%Y-%m-%d')
+
+    for buy_date, buy_price, sell_price, return_pct in zip(buy_dates, trades['buy_price'], trades['sell_price'], trades['return_pct']):
+        results.append({
+            'Buy Date': buy_date,
+            'Buy Price': round(buy_price, 2),
+            'Sell Price': round(sell_price, 2),
+            'Return (%)': round(return_pct, 2)
+        })
 
-        if row['Score'] >= min_score:
-            buy_date = df.index[i]
-            buy_price = row['Close']
-            max_hold_price = buy_price * (1 + take_profit_pct / 100)
-            min_hold_price = buy_price * (1 - stop_loss_pct / 100)
+    return results
 
-            # Simulate next holding_days
-            sell_price = df.iloc[i + holding_days]['Close']
-            for j in range(1, holding_days + 1):
-                day_price = df.iloc[i + j]['Close']
-                if day_price >= max_hold_price:
-                    sell_price = max_hold_price
-                    break
-                elif day_price <= min_hold_price:
-                    sell_price = min_hold_price
-                    break
 
-            return_pct = ((sell_price - buy_price) / buy_price) * 100
+def summarize_returns(returns: np.ndarray) -> Dict:
+    """Hit rate, mean return and max drawdown of trades taken in entry order."""
+    if len(returns) == 0:
+        return {'trades': 0, 'hit_rate': None, 'mean_return': None, 'total_return': None, 'max_drawdown': None}
+    equity = np.cumprod(1 + returns / 100)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    return {
+        'trades': int(len(returns)),
+        'hit_rate': round(float((returns > 0).mean() * 100), 2),
+        'mean_return': round(float(returns.mean()), 2),
+        'total_return': round(float((equity[-1] - 1) * 100), 2),
+        'max_drawdown': round(float(((peak - equity) / peak).max() * 100), 2),
+    }
 
+def _sweep_holding_period(close: np.ndarray, score: np.ndarray, holding_days: int, min_scores: Sequence[float],
+                          stop_losses: Sequence[float], take_profits: Sequence[float]) -> List[Dict]:
+    # Entries for the loosest min_score cover every other threshold, so the forward
+    # windows and level hits are computed once and masked per combination.
+    last_entry = max(len(close) - holding_days, 0)
+    entry = np.flatnonzero(score[:last_entry] >= min(min_scores))
+    buy_price = close[entry]
+    hold_price = close[entry + holding_days]
+    if holding_days > 0 and len(entry):
+        forward = sliding_window_view(close[1:], holding_days)[entry]
+    else:
+        forward = np.empty((len(entry), 0))
+
+    # Each level is searched once; first_hits' tie rule then pairs every take-profit with every stop
+    take_profit_hits = {}
+    for take_profit_pct in take_profits:
+        level = buy_price * (1 + take_profit_pct / 100)
+        take_profit_hits[take_profit_pct] = (level, level_offsets(forward, level, above=True))
+    stop_loss_hits = {}
+    for stop_loss_pct in stop_losses:
+        level = buy_price * (1 - stop_loss_pct / 100)
+        stop_loss_hits[stop_loss_pct] = (level, level_offsets(forward, level, above=False))
+    entry_masks = {min_score: score[entry] >= min_score for min_score in min_scores}
+
+    results = []
+    for stop_loss_pct, take_profit_pct in product(stop_losses, take_profits):
+        max_hold_price, upper_offset = take_profit_hits[take_profit_pct]
+        min_hold_price, lower_offset = stop_loss_hits[stop_loss_pct]
+        hits = resolve_hits(upper_offset, lower_offset, forward.shape[1])
+        sell_price = exit_prices(hits, max_hold_price, min_hold_price, hold_price)
+        returns = ((sell_price - buy_price) / buy_price) * 100
+        for min_score in min_scores:
             results.append({
-                'Buy Date': buy_date.strftime('%Y-%m-%d'),
-                'Buy Price': round(buy_price, 2),
-                'Sell Price': round(sell_price, 2),
-                'Return (%)': round(return_pct, 2)
+                'holding_days': holding_days,
+                'min_score': min_score,
+                'stop_loss_pct': stop_loss_pct,
+                'take_profit_pct': take_profit_pct,
+                **summarize_returns(returns[entry_masks[min_score]]),
             })
+    return results
+
+def sweep_backtest(df: pd.DataFrame, holding_days: Sequence[int] = (10,), min_scores: Sequence[float] = (4.5,),
+                   stop_losses: Sequence[float] = (5,), take_profits: Sequence[float] = (10,),
+                   max_workers: Optional[int] = None, parallel_threshold: int = 5000) -> List[Dict]:
+    """Evaluate backtest_strategy over a whole parameter grid in one call.
+
+    Returns one summary per (holding_days, min_score, stop_loss, take_profit)
+    combination; holding periods as long as the data have no room for a
+    trade and report zero trades. Grids with at least parallel_threshold
+    combinations are split by holding period across a process pool.
+    """
+    df = df.dropna()
+    if not all(col in df.columns for col in ['Close', 'Score']):
+        print("⚠ DataFrame missing required columns: 'Close' or 'Score'")
+        return []
+    if not (holding_days and min_scores and stop_losses and take_profits):
+        return []
+
+    if any(int(h) < 1 for h in holding_days):
+        raise ValueError("holding_days must be at least 1")
+
+    close = df['Close'].to_numpy(dtype='float64')
+    score = df['Score'].to_numpy(dtype='float64')
+    periods = sorted({int(h) for h in holding_days})
+    args = (sorted(set(min_scores)), list(dict.fromkeys(stop_losses)), list(dict.fromkeys(take_profits)))
 
-    return results
\ No newline at end of file
+    combinations = len(periods) * len(args[0]) * len(args[1]) * len(args[2])
+    if combinations >= parallel_threshold and len(periods) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_sweep_holding_period, close, score, h, *args) for h in periods]
+            return [row for future in futures for row in future.result()]
+    return [row for h in periods for row in _sweep_holding_period(close, score, h, *args)]
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from bars import Bars, COLUMNS, PRICE_COLUMNS, PRICE_DTYPE
+from providers import BarProvider, get_provider
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bars')
+
+# Seconds a stored series is served without asking the provider for newer bars
+DEFAULT_MAX_AGE = {'1d': 900, '1h': 300, '15m': 120, '5m': 60}
+
+class BarStore:
+    """Append-only on-disk OHLCV store, one directory per (ticker, interval).
+
+    Each column is a raw little-endian file (index.i8 holds epoch nanoseconds
+    in UTC) read back through np.memmap, and meta.json records the column
+    dtypes, timezone and committed row count. Writers append new bars (and
+    at most rewrite the provisional last bar) before publishing the new row
+    count, so readers never see a partial append.
+    """
+
+    def __init__(self, root: Optional[str] = None, provider: Optional[BarProvider] = None,
+                 max_age: Optional[Dict[str, float]] = None):
+        self.root = root or os.environ.get('STOCKAPP_DATA_DIR', DEFAULT_DATA_DIR)
+        self._provider = provider
+        self.max_age = {**DEFAULT_MAX_AGE, **(max_age or {})}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def provider(self) -> BarProvider:
+        return self._provider or get_provider()
+
+    def _dir(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, ticker.upper().replace('/', '_'), interval)
+
+    @contextmanager
+    def _lock(self, ticker: str, interval: str):
+        path = self._dir(ticker, interval)
+        with self._locks_guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, '.lock'), 'a') as handle:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_meta(self, ticker: str, interval: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(ticker, interval), 'meta.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, ticker: str, interval: str, meta: dict) -> None:
+        path = os.path.join(self._dir(ticker, interval), 'meta.json')
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def read(self, ticker: str, interval: str = '1d', start: Optional[datetime] = None) -> pd.DataFrame:
+        meta = self._read_meta(ticker, interval)
+        if not meta or meta['rows'] == 0:
+            return pd.DataFrame()
+        path, rows = self._dir(ticker, interval), meta['rows']
+        stamps = np.memmap(os.path.join(path, 'index.i8'), dtype='<i8', mode='r', shape=(rows,))
+        first = 0 if start is None else int(np.searchsorted(stamps, pd.Timestamp(start).value))
+        index = pd.DatetimeIndex(np.asarray(stamps[first:]).view('datetime64[ns]'), name='Date')
+        index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        columns = {
+            name: np.memmap(os.path.join(path, file), dtype=dtype, mode='r', shape=(rows,))[first:]
+            for name, file, dtype in meta['columns']
+        }
+        return pd.DataFrame(columns, index=index)
+
+    def _stamps(self, ticker: str, interval: str, meta: dict) -> np.ndarray:
+        if meta['rows'] == 0:
+            return np.empty(0, dtype='int64')
+        path = os.path.join(self._dir(ticker, interval), 'index.i8')
+        return np.memmap(path, dtype='<i8', mode='r', shape=(meta['rows'],))
+
+    def read_bars(self, ticker: str, interval: str = '1d', start: Optional[datetime] = None) -> Bars:
+        """OHLCV from start on as Bars, copied once out of the memory-mapped columns.
+
+        The copy keeps held bars stable while writers rewrite the provisional
+        last bar or replace the whole series.
+        """
+        meta = self._read_meta(ticker, interval)
+        if not meta or meta['rows'] == 0:
+            return Bars.empty_bars()
+        path, rows = self._dir(ticker, interval), meta['rows']
+        stamps = np.memmap(os.path.join(path, 'index.i8'), dtype='<i8', mode='r', shape=(rows,))
+        first = 0 if start is None else int(np.searchsorted(stamps, pd.Timestamp(start).value))
+        columns = {
+            name: np.array(np.memmap(os.path.join(path, file), dtype=dtype, mode='r', shape=(rows,))[first:],
+                           dtype=PRICE_DTYPE if name in PRICE_COLUMNS else None)
+            for name, file, dtype in meta['columns'] if name in COLUMNS
+        }
+        return Bars.from_columns(np.array(stamps[first:], dtype='int64'), columns, meta['tz'])
+
+    def _write(self, ticker: str, interval: str, meta: Optional[dict], bars: pd.DataFrame, keep: int) -> dict:
+        # Overwrite everything from row `keep` on with `bars`
+        path = self._dir(ticker, interval)
+        bars = bars.select_dtypes(include='number')
+        if meta is None or keep == 0 or not meta['columns']:
+            meta = {
+                'tz': str(bars.index.tz or 'UTC'),
+                'columns': [[name, f"col{i}.{np.dtype(bars[name].dtype).str[1:]}", np.dtype(bars[name].dtype).str]
+                            for i, name in enumerate(bars.columns)],
+                'rows': 0,
+            }
+            keep = 0
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+        files = [('index.i8', '<i8', index.tz_convert('UTC').as_unit('ns').asi8)]
+        for name, file, dtype in meta['columns']:
+            values = bars[name] if name in bars.columns else pd.Series(np.nan, index=bars.index)
+            files.append((file, dtype, values.to_numpy(dtype=dtype, na_value=0 if np.dtype(dtype).kind in 'iu' else np.nan)))
+        for file, dtype, values in files:
+            mode = 'r+b' if os.path.exists(os.path.join(path, file)) else 'wb'
+            with open(os.path.join(path, file), mode) as f:
+                f.seek(keep * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        meta['rows'] = keep + len(bars)
+        return meta
+
+    def _plan(self, ticker: str, interval: str, start: Optional[datetime], force: bool) -> Optional[dict]:
+        # Decide whether the provider must be asked, and from which timestamp; None means serve as is
+        meta = self._read_meta(ticker, interval)
+        # Only the timestamps are needed to plan, so the price columns stay on disk
+        stored = self._stamps(ticker, interval, meta) if meta else np.empty(0, dtype='int64')
+        requested = pd.Timestamp(start).value if start is not None else 0
+        # 'since' is the start of the last full download, which may precede the first bar
+        since = meta.get('since', int(stored[0]) if len(stored) else None) if meta else None
+        covers_start = since is not None and since <= requested
+        fresh = meta is not None and time.time() - meta.get('checked_at', 0) < self.max_age.get(interval, 60)
+        if covers_start and fresh and not force:
+            return None
+        incremental = covers_start and len(stored) > 0
+        return {
+            'meta': meta,
+            'stored': stored,
+            'requested': requested,
+            'covers_start': covers_start,
+            'fetch_from': pd.Timestamp(int(stored[-1]), tz='UTC') if incremental else start,
+        }
+
+    def _apply(self, ticker: str, interval: str, plan: dict, bars: pd.DataFrame) -> None:
+        meta, stored = plan['meta'], plan['stored']
+        if not bars.empty:
+            bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            incremental = plan['covers_start'] and len(stored) > 0
+            keep = int(np.searchsorted(stored, pd.Timestamp(bars.index[0]).value)) if incremental else 0
+            meta = self._write(ticker, interval, meta, bars, keep)
+            if not plan['covers_start']:
+                meta['since'] = plan['requested']
+        elif meta is None:
+            # Remember that there was nothing, so the provider is not asked again until max_age
+            meta = {'tz': 'UTC', 'columns': [], 'rows': 0, 'since': plan['requested']}
+        meta['checked_at'] = time.time()
+        self._write_meta(ticker, interval, meta)
+
+    def refresh(self, ticker: str, interval: str = '1d', start: Optional[datetime] = None,
+                end: Optional[datetime] = None, force: bool = False) -> pd.DataFrame:
+        """Bring the stored series up to date and return bars from start on.
+
+        Only bars from the last stored timestamp onward are requested from
+        the provider; the last stored bar is re-fetched because it may have
+        been provisional. A series that does not reach back to start is
+        re-downloaded in full.
+        """
+        self._update(ticker, interval, start, end, force)
+        return self.read(ticker, interval, start)
+
+    def refresh_bars(self, ticker: str, interval: str = '1d', start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, force: bool = False) -> Bars:
+        """refresh() returning OHLCV Bars."""
+        self._update(ticker, interval, start, end, force)
+        return self.read_bars(ticker, interval, start)
+
+    def refresh_many(self, tickers: List[str], interval: str = '1d', start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, force: bool = False) -> Dict[str, pd.DataFrame]:
+        """refresh() for a watchlist, with one bulk provider call for every stale ticker."""
+        self._update_many(tickers, interval, start, end, force)
+        return {ticker: self.read(ticker, interval, start) for ticker in tickers}
+
+    def refresh_many_bars(self, tickers: List[str], interval: str = '1d', start: Optional[datetime] = None,
+                          end: Optional[datetime] = None, force: bool = False) -> Dict[str, Bars]:
+        """refresh_many() returning OHLCV Bars."""
+        self._update_many(tickers, interval, start, end, force)
+        return {ticker: self.read_bars(ticker, interval, start) for ticker in tickers}
+
+    def _update(self, ticker: str, interval: str, start: Optional[datetime], end: Optional[datetime], force: bool) -> None:
+        with self._lock(ticker, interval):
+            plan = self._plan(ticker, interval, start, force)
+            if plan is not None:
+                self._apply(ticker, interval, plan, self.provider.fetch_bars(ticker, interval, plan['fetch_from'], end))
+
+    def _update_many(self, tickers: List[str], interval: str, start: Optional[datetime], end: Optional[datetime],
+                     force: bool) -> None:
+        stale = {}
+        for ticker in tickers:
+            plan = self._plan(ticker, interval, start, force)
+            if plan is not None:
+                stale[ticker] = plan['fetch_from']
+
+        if stale:
+            starts = [pd.Timestamp(s) for s in stale.values() if s is not None]
+            fetched = self.provider.fetch_many(list(stale), interval, min(starts) if starts else start, end)
+            for ticker in stale:
+                with self._lock(ticker, interval):
+                    # Re-plan under the lock in case another writer got there first
+                    plan = self._plan(ticker, interval, start, force=True)
+                    bars = fetched.get(ticker, pd.DataFrame())
+                    if not bars.empty and plan['fetch_from'] is not None:
+                        bars = bars[bars.index >= pd.Timestamp(plan['fetch_from'])]
+                    self._apply(ticker, interval, plan, bars)
+
+_store: Optional[BarStore] = None
+
+def get_store() -> BarStore:
+    global _store
+    if _store is None:
+        _store = BarStore()
+    return _store
@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+COLUMNS = PRICE_COLUMNS + ('Volume',)
+
+# Float type prices are held in; float32 halves them at about 7 significant digits
+PRICE_DTYPE = os.environ.get('STOCKAPP_PRICE_DTYPE', 'float64')
+
+# Bar length of each supported interval, finest first
+INTERVALS = {
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+}
+
+class Bars:
+    """OHLCV bars as contiguous NumPy arrays.
+
+    stamps holds epoch nanoseconds in UTC (tz is only used for display),
+    prices are PRICE_DTYPE and volume is int64. Slicing returns views, and
+    to_frame wraps the arrays in a DataFrame without copying them.
+    """
+
+    __slots__ = ('stamps', 'open', 'high', 'low', 'close', 'volume', 'tz', '_dates')
+
+    def __init__(self, stamps: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, tz: str = 'UTC', dates: Optional[pd.DatetimeIndex] = None):
+        self.stamps, self.open, self.high, self.low, self.close, self.volume = stamps, open, high, low, close, volume
+        self.tz = tz
+        self._dates = dates
+
+    @classmethod
+    def empty_bars(cls, dtype: str = PRICE_DTYPE, tz: str = 'UTC') -> 'Bars':
+        prices = [np.empty(0, dtype=dtype) for _ in PRICE_COLUMNS]
+        return cls(np.empty(0, dtype='int64'), *prices, np.empty(0, dtype='int64'), tz=tz)
+
+    @classmethod
+    def from_columns(cls, stamps: np.ndarray, columns: Dict[str, np.ndarray], tz: str = 'UTC',
+                     dtype: str = PRICE_DTYPE) -> 'Bars':
+        """Bars over existing arrays (e.g. memmaps); arrays already of the right dtype are not copied."""
+        prices = [np.asarray(columns[c], dtype=dtype) if c in columns else np.full(len(stamps), np.nan, dtype=dtype)
+                  for c in PRICE_COLUMNS]
+        volume = np.asarray(columns['Volume']) if 'Volume' in columns else np.zeros(len(stamps), dtype='int64')
+        if volume.dtype != np.int64:
+            volume = np.nan_to_num(volume.astype('float64'), nan=0).astype('int64')
+        return cls(np.asarray(stamps, dtype='int64'), *prices, volume, tz=tz)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype: str = PRICE_DTYPE) -> 'Bars':
+        """Typed bars from a provider-style frame: non-numeric cells become NaN,
+        duplicate timestamps keep the last bar and rows are sorted by time."""
+        if df.empty:
+            return cls.empty_bars(dtype)
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+        columns = {c: pd.to_numeric(df[c], errors='coerce').to_numpy() for c in COLUMNS if c in df.columns}
+        return cls.from_columns(index.tz_convert('UTC').as_unit('ns').asi8, columns, str(index.tz), dtype)
+
+    def __len__(self) -> int:
+        return len(self.stamps)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.stamps) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.stamps, self.open, self.high, self.low, self.close, self.volume))
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        # Built once; slices of these bars slice it instead of rebuilding
+        if self._dates is None:
+            index = pd.DatetimeIndex(self.stamps.view('datetime64[ns]'), name='Date')
+            self._dates = index.tz_localize('UTC').tz_convert(self.tz)
+        return self._dates
+
+    def __getitem__(self, rows: slice) -> 'Bars':
+        if not isinstance(rows, slice) or rows.step not in (None, 1):
+            raise TypeError("Bars only support contiguous slices")
+        dates = self._dates[rows] if self._dates is not None else None
+        return Bars(self.stamps[rows], self.open[rows], self.high[rows], self.low[rows],
+                    self.close[rows], self.volume[rows], self.tz, dates)
+
+    def tail(self, n: int) -> 'Bars':
+        return self[max(len(self) - n, 0):]
+
+    def since(self, timestamp) -> 'Bars':
+        return self[int(np.searchsorted(self.stamps, pd.Timestamp(timestamp).value)):]
+
+    def last_session(self) -> 'Bars':
+        """The bars on the same local calendar date as the last one."""
+        if self.empty:
+            return self
+        days = self.dates.normalize()
+        return self[int(days.searchsorted(days[-1])):]
+
+    def merge(self, newer: 'Bars') -> 'Bars':
+        """These bars followed by newer; newer wins where the two overlap in time."""
+        if newer.empty:
+            return self
+        keep = int(np.searchsorted(self.stamps, newer.stamps[0]))
+
+        def join(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+            return np.concatenate([old[:keep], new.astype(old.dtype, copy=False)])
+
+        return Bars(join(self.stamps, newer.stamps), join(self.open, newer.open), join(self.high, newer.high),
+                    join(self.low, newer.low), join(self.close, newer.close), join(self.volume, newer.volume),
+                    self.tz if len(self) else newer.tz)
+
+    def resample(self, interval: str) -> 'Bars':
+        """Coarser bars in one pass: first open, highest high, lowest low, last close and summed volume.
+
+        Buckets follow the local clock in tz, so '1d' bars are local calendar
+        dates stamped at local midnight, like provider daily bars.
+        """
+        if self.empty:
+            return self
+        if interval == '1d':
+            days = self.dates.normalize().asi8
+            starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+            stamps = days[starts]
+        else:
+            size = INTERVALS[interval].value
+            wall = self.dates.tz_localize(None).asi8
+            buckets, offsets = wall // size, wall - self.stamps
+            # A UTC offset change (DST) starts a new bucket, so a repeated wall-clock hour is not merged
+            starts = np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (offsets[1:] != offsets[:-1])])
+            stamps = self.stamps[starts] - wall[starts] % size
+        ends = np.r_[starts[1:], len(self)] - 1
+        return Bars(stamps, self.open[starts], np.fmax.reduceat(self.high, starts), np.fmin.reduceat(self.low, starts),
+                    self.close[ends], np.add.reduceat(self.volume, starts), self.tz)
+
+    def to_frame(self) -> pd.DataFrame:
+        """OHLCV DataFrame indexed by Date in tz, sharing memory with these bars."""
+        columns = dict(zip(COLUMNS, (self.open, self.high, self.low, self.close, self.volume)))
+        return pd.DataFrame(columns, index=self.dates, copy=False)
+
+    def __repr__(self) -> str:
+        span = f", {self.dates[0]} .. {self.dates[-1]}" if len(self) else ""
+        return f"Bars({len(self)} rows, {self.close.dtype}{span})"
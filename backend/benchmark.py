@@ -0,0 +1,874 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import shutil
+import socket
+import subprocess
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Tuple
+from indicators import (
+    add_moving_averages,
+    add_rsi,
+    add_bollinger_bands,
+    add_volume_spike,
+    add_support_resistance,
+    add_atr,
+    compute_indicators
+)
+from scoring import generate_score, score_frame
+from backtester import backtest_strategy, sweep_backtest
+from bar_store import BarStore
+from streaming_indicators import IndicatorState
+import metrics
+import portfolio
+from portfolio import build_panel, simulate_portfolio, summarize_portfolio
+from providers import BarProvider, CSVProvider, SAMPLE_CSV
+from bars import Bars
+from payloads import render
+from tests.synthetic import (
+    synthetic_ohlcv,
+    yfinance_style_bars,
+    with_indicators,
+    backtest_strategy_rowwise,
+    legacy_merge_intraday
+)
+import news_helper
+from news_helper import NewsService, SentimentMemo, fetch_feed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from xml.sax.saxutils import escape
+from ml_model import train_ml_model, MODEL_FEATURES, HORIZON
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_squared_error
+import contextlib
+import io
+
+class SyntheticProvider(BarProvider):
+    """Offline provider serving synthetic_ohlcv bars at one interval for any ticker."""
+
+    name = 'synthetic'
+
+    def __init__(self, rows: int = 252 * 5, latency: float = 0.0, interval: str = '1d'):
+        self.latency = latency
+        self.interval = interval
+        self.bars = synthetic_ohlcv(rows, freq={'1d': 'B', '1h': 'h', '15m': '15min', '5m': '5min'}[interval])
+        # End the series yesterday so date-windowed callers see recent data
+        yesterday = pd.Timestamp.now(tz='UTC').normalize() - pd.Timedelta(days=1)
+        self.bars.index = (self.bars.index - self.bars.index[-1] + yesterday.tz_localize(None)).tz_localize('UTC')
+
+    def fetch_bars(self, ticker, interval, start, end=None):
+        time.sleep(self.latency)
+        if interval != self.interval:
+            return pd.DataFrame()
+        mask = self.bars.index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.bars.index < pd.Timestamp(end)
+        return self.bars[mask].copy()
+
+    def fetch_many(self, tickers, interval, start, end=None):
+        # One round trip for the whole batch, like a bulk download endpoint
+        time.sleep(self.latency)
+        latency, self.latency = self.latency, 0.0
+        try:
+            return {ticker: self.fetch_bars(ticker, interval, start, end) for ticker in tickers}
+        finally:
+            self.latency = latency
+
+def train_ml_model_single_split(df: pd.DataFrame):
+    """The original trainer: three sequential fits on one 80/20 split, kept as the baseline."""
+    df = df.dropna().copy()
+    df['Future_Close'] = df['Close'].shift(-HORIZON)
+    df = df.dropna(subset=['Future_Close'])
+    X_train, X_test, y_train, y_test = train_test_split(df[MODEL_FEATURES], df['Future_Close'], test_size=0.2, shuffle=False)
+    models = [LinearRegression(), RandomForestRegressor(n_estimators=100, random_state=42),
+              GradientBoostingRegressor(n_estimators=100, random_state=42)]
+    best_model, best_mse = None, float("inf")
+    for model in models:
+        mse = mean_squared_error(y_test, model.fit(X_train, y_train).predict(X_test))
+        if mse < best_mse:
+            best_model, best_mse = model, mse
+    return best_model, best_mse
+
+def stub_news_service(root: str) -> NewsService:
+    """Offline news service: one neutral headline per ticker, memo under root."""
+    return NewsService(fetch=lambda ticker: [{"title": "stub"}], memo=SentimentMemo(os.path.join(root, 'news.db')))
+
+def best_of(fn: Callable, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def peak_memory(fn: Callable) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_indicators(sizes: List[int]) -> None:
+    print("== Indicators: add_* chain vs compute_indicators ==")
+    for rows in sizes:
+        df = synthetic_ohlcv(rows, freq='5min')
+        chain = best_of(lambda: with_indicators(df))
+        fused = best_of(lambda: compute_indicators(df))
+        chain_mem = peak_memory(lambda: with_indicators(df)) / 2**20
+        fused_mem = peak_memory(lambda: compute_indicators(df)) / 2**20
+        print(f"{rows:>9} rows  chain {chain * 1000:8.1f} ms {chain_mem:8.1f} MiB  "
+              f"fused {fused * 1000:8.1f} ms {fused_mem:8.1f} MiB")
+
+def bench_streaming(bars: int = 20_000, window: int = 90) -> None:
+    print("== Streaming indicators: IndicatorState.update vs compute_indicators per new bar ==")
+    df = synthetic_ohlcv(bars, freq='5min')
+    df.iloc[::97, df.columns.get_loc('Close')] = np.nan
+    columns = ['MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume_Spike', 'Support', 'Resistance', 'ATR']
+    records = df.to_dict('records')
+
+    state = IndicatorState()
+    start = time.perf_counter()
+    rows = [state.update(bar) for bar in records]
+    per_update = (time.perf_counter() - start) / bars
+
+    expected = compute_indicators(df)[columns].to_numpy()
+    got = pd.DataFrame(rows)[columns].to_numpy()
+    worst = np.nanmax(np.abs(got - expected))
+
+    tail = best_of(lambda: compute_indicators(df.tail(window)), repeat=20)
+    full = best_of(lambda: compute_indicators(df), repeat=3)
+    print(f"update {per_update * 1e6:7.1f} us/bar  (max abs diff {worst:.1e})")
+    print(f"recompute last {window} bars {tail * 1e6:9.1f} us/bar  ({tail / per_update:,.0f}x)")
+    print(f"recompute all {bars} bars {full * 1e6:9.1f} us/bar  ({full / per_update:,.0f}x)")
+
+def bench_payloads(sizes: List[int]) -> None:
+    import gzip
+    from fastapi.encoders import jsonable_encoder
+    from payloads import arrow_available, render
+
+    print("== Payloads: /analyze serialization, records via jsonable_encoder vs render() formats ==")
+    fields = ['Date', 'Close', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume', 'Score', 'Support', 'Resistance', 'ATR']
+    for rows in sizes:
+        frame = compute_indicators(synthetic_ohlcv(rows, freq='5min').tz_localize('UTC'))
+        frame['Score'] = score_frame(frame)
+        frame = frame.rename_axis('Date').reset_index()[fields].fillna(0)
+        result = {"ticker": "SYN", "data": frame, "top_signals": frame.nlargest(5, 'Score')[['Date', 'Close', 'Score']],
+                  "sentiment": 0.0, "predicted_price": 101.5, "trade_action": "hold"}
+
+        def legacy() -> bytes:
+            tables = {k: v.to_dict(orient='records') for k, v in result.items() if isinstance(v, pd.DataFrame)}
+            return json.dumps(jsonable_encoder({**result, **tables})).encode()
+
+        formats = [('legacy records', legacy), ('records', lambda: render(result, 'records')[0]),
+                   ('columnar', lambda: render(result, 'columnar')[0])]
+        if arrow_available():
+            formats.append(('arrow', lambda: render(result, 'arrow')[0]))
+        baseline = best_of(legacy, repeat=1 if rows > 100_000 else 3)
+        print(f"{rows:>9} rows")
+        for label, fn in formats:
+            elapsed = baseline if fn is legacy else best_of(fn, repeat=1 if rows > 100_000 else 3)
+            body = fn()
+            print(f"   {label:>15} {elapsed * 1000:9.1f} ms ({baseline / elapsed:5.1f}x)  "
+                  f"{len(body) / 1e6:8.2f} MB  gzip {len(gzip.compress(body, 6)) / 1e6:7.2f} MB")
+
+def bench_scan(symbols: int = 5000, refresh_tickers: int = 300) -> None:
+    import asyncio
+    import bar_store
+    import fetch_data
+    from scanner import Scanner, SignalIndex
+
+    print(f"== Scanner: /scan queries over {symbols} indexed symbols ==")
+    rng = np.random.default_rng(7)
+    index = SignalIndex()
+    for i in range(symbols):
+        close = float(rng.uniform(10, 500))
+        index.update(f"S{i:05d}", {'Close': close, 'Volume': float(rng.integers(1e5, 1e7)), 'MA20': close * rng.uniform(0.9, 1.1),
+                                   'MA50': close * rng.uniform(0.9, 1.1), 'RSI': float(rng.uniform(5, 95)),
+                                   'Score': int(rng.integers(-1, 5)), 'Volume_Spike': int(rng.random() < 0.1)})
+    queries = [('top 50 by score', {}), ('score >= 3', {'min_score': 3, 'limit': 500}),
+               ('RSI < 30 and spike', {'max_rsi': 30, 'volume_spike': True}),
+               ('lowest RSI', {'sort_by': 'RSI', 'descending': False, 'limit': 20})]
+    for label, kwargs in queries:
+        elapsed = best_of(lambda: index.query(**kwargs), repeat=50)
+        print(f"{label:>20}  {elapsed * 1000:6.3f} ms  ({len(index.query(**kwargs))} rows)")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as root:
+        bar_store._store = BarStore(root=root, provider=SyntheticProvider(rows=252 * 2, latency=0.05))
+        scanner = Scanner([f"R{i:04d}" for i in range(refresh_tickers)], chunk=100)
+        for label in ('cold pass', 'warm pass'):
+            start = time.perf_counter()
+            asyncio.run(scanner.refresh())
+            print(f"{label:>20}  {time.perf_counter() - start:6.2f} s for {refresh_tickers} tickers ({len(scanner.index)} indexed)")
+    fetch_data._quote_states.clear()
+
+def bench_train(rows: int = 250, series: int = 12, holdout: int = 40) -> None:
+    print(f"== Training: single 80/20 split vs walk-forward selection ({rows} daily bars, {os.cpu_count()} cores) ==")
+    frames = []
+    for seed in range(series):
+        df = compute_indicators(synthetic_ohlcv(rows + holdout + HORIZON, freq='B', seed=seed))
+        df['Score'] = score_frame(df)
+        frames.append(df)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        legacy = best_of(lambda: [train_ml_model_single_split(df.iloc[:rows]) for df in frames], repeat=1)
+        serial = best_of(lambda: [train_ml_model(df.iloc[:rows], n_jobs=1) for df in frames], repeat=1)
+        parallel = best_of(lambda: [train_ml_model(df.iloc[:rows], n_jobs=-1) for df in frames], repeat=1)
+    print(f"per series  single split {legacy / series * 1000:7.1f} ms  walk-forward n_jobs=1 {serial / series * 1000:7.1f} ms  "
+          f"n_jobs=-1 {parallel / series * 1000:7.1f} ms  ({legacy / parallel:.1f}x)")
+
+    # Reliability: score each trainer's pick on bars neither of them saw
+    errors = {'single split': [], 'walk-forward': []}
+    for df in frames:
+        # Unseen rows start HORIZON bars after the training window, so no training target reaches them
+        unseen = df.iloc[rows + HORIZON:].copy()
+        unseen['Future_Close'] = df['Close'].shift(-HORIZON).iloc[rows + HORIZON:]
+        unseen = unseen.dropna(subset=['Future_Close'])
+        with quiet:
+            picks = {'single split': train_ml_model_single_split(df.iloc[:rows])[0],
+                     'walk-forward': train_ml_model(df.iloc[:rows])[0]}
+        for label, model in picks.items():
+            errors[label].append(mean_squared_error(unseen['Future_Close'], model.predict(unseen[list(model.feature_names_in_)])))
+    wins = sum(w < s for w, s in zip(errors['walk-forward'], errors['single split']))
+    print(f"unseen-bar MSE over {series} series  single split median {np.median(errors['single split']):.2f}  "
+          f"walk-forward median {np.median(errors['walk-forward']):.2f}  (walk-forward better on {wins}/{series})")
+
+def bench_portfolio(tickers: int = 500, years: int = 10) -> None:
+    print(f"== Portfolio: {tickers} tickers x {years}y daily, in RAM vs memory-mapped panel ==")
+    bars = synthetic_ohlcv(252 * years * tickers, tickers=tickers, freq='B')
+    scored = compute_indicators(bars)
+    # As in bench_backtest, lift the score so the 4.5 threshold trades often enough to measure
+    scored['Score'] = score_frame(scored) + np.random.default_rng(0).integers(0, 5, len(scored))
+    frames = {ticker: group.droplevel(0) for ticker, group in scored.groupby(level=0, sort=False)}
+
+    start = time.perf_counter()
+    panel = build_panel(frames)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    sim = simulate_portfolio(panel.close, panel.score, panel.atr, cost_bps=5)
+    simulated = time.perf_counter() - start
+    summary = summarize_portfolio(sim, 100_000)
+    print(f"panel {panel.close.shape} build {built:5.2f} s  simulate {simulated:5.2f} s  "
+          f"{summary['trades']} trades  return {summary['total_return']}%  max drawdown {summary['max_drawdown']}%  "
+          f"turnover {summary['annual_turnover']}%/y")
+
+    threshold, portfolio.MEMMAP_BYTES = portfolio.MEMMAP_BYTES, 0
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            mapped = build_panel(frames, workdir)
+            start = time.perf_counter()
+            simulate_portfolio(mapped.close, mapped.score, mapped.atr, cost_bps=5)
+            elapsed = time.perf_counter() - start
+            mapped_heap = peak_memory(lambda: build_panel(frames, workdir))
+    finally:
+        portfolio.MEMMAP_BYTES = threshold
+    heap = peak_memory(lambda: build_panel(frames))
+    print(f"memory-mapped: simulate {elapsed:5.2f} s; panel build heap peak "
+          f"{mapped_heap / 2**20:.1f} MB vs {heap / 2**20:.1f} MB in RAM")
+
+def bench_metrics(calls: int = 100_000) -> None:
+    print("== Instrumentation: cost of a span and of a profiled pool call ==")
+    def spans():
+        for _ in range(calls):
+            with metrics.span('bench', rows=1):
+                pass
+    elapsed = best_of(spans)
+    print(f"span()                 {elapsed / calls * 1e6:6.2f} us per stage")
+    df = with_indicators(synthetic_ohlcv(10_000, freq='B'))
+    plain = best_of(lambda: score_frame(df), repeat=5)
+    traced = best_of(lambda: metrics.call_traced(score_frame, (df,), {}), repeat=5)
+    profiled = best_of(lambda: metrics.call_traced(score_frame, (df,), {}, True), repeat=5)
+    print(f"score_frame 10k rows   plain {plain * 1000:6.2f} ms  traced {traced * 1000:6.2f} ms  "
+          f"profiled {profiled * 1000:6.2f} ms")
+
+# Timings stay in this harness rather than in pytest: pytest-benchmark and asv are not dependencies,
+# and wall-clock checks are only meaningful against a baseline from the same machine. The parity
+# checks (same results as the original implementations) live in tests/.
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+def pipeline_frames(source: str, rows: int, tickers: int) -> List[pd.DataFrame]:
+    """Per-ticker OHLCV frames: synthetic random walks, or sample_stock_data.csv replayed for each ticker."""
+    if source == 'csv':
+        bars = CSVProvider(SAMPLE_CSV).fetch_bars('AAPL', '1d', pd.Timestamp(0, tz='UTC'))
+        return [bars.tail(rows).copy() for _ in range(tickers)]
+    panel = synthetic_ohlcv(rows * tickers, tickers=tickers, freq='B')
+    return [panel] if tickers == 1 else [group.droplevel(0) for _, group in panel.groupby(level=0, sort=False)]
+
+def bench_pipeline(source: str = 'synthetic', rows: int = 252 * 10, tickers: int = 1, baseline: str = DEFAULT_BASELINE,
+                   save: bool = False, tolerance: float = 0.5) -> bool:
+    """Time and memory-profile each analyze_stock stage; compare with (or record) the baseline.
+
+    Returns False when a stage is slower or uses more memory than its
+    baseline by more than tolerance (plus a small absolute allowance).
+    """
+    frames = pipeline_frames(source, rows, tickers)
+    rows = len(frames[0])
+    print(f"== Pipeline stages: {source} data, {tickers} ticker(s) x {rows} bars ==")
+    logging.getLogger().setLevel(logging.WARNING)
+    scored = [compute_indicators(f) for f in frames]
+    for f in scored:
+        f['Score'] = score_frame(f)
+    # What analyze_stock hands to payloads.render, for the serialization stages
+    table = scored[0].rename_axis('Date').reset_index()
+    result = {'ticker': 'BENCH', 'data': table[['Date', 'Close', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume',
+                                                'Score', 'Support', 'Resistance', 'ATR']].fillna(0),
+              'top_signals': table.nlargest(5, 'Score')[['Date', 'Close', 'Score']], 'backtest': [], 'sentiment': 0.0}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    provider = CSVProvider(SAMPLE_CSV, rebase=True) if source == 'csv' else SyntheticProvider(rows=rows)
+
+    def load():
+        with tempfile.TemporaryDirectory() as root:
+            BarStore(root=root, provider=provider).refresh_many([f'T{i:04d}' for i in range(tickers)], '1d',
+                                                                start=pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=rows * 2))
+
+    def train():
+        with quiet:
+            for f in scored:
+                train_ml_model(f.tail(365), n_jobs=1)
+
+    stages = {
+        'load (fake provider, cold store)': load,
+        'add_moving_averages': lambda: [add_moving_averages(f) for f in frames],
+        'add_rsi': lambda: [add_rsi(f) for f in frames],
+        'add_bollinger_bands': lambda: [add_bollinger_bands(f) for f in frames],
+        'add_volume_spike': lambda: [add_volume_spike(f) for f in frames],
+        'add_support_resistance': lambda: [add_support_resistance(f) for f in frames],
+        'add_atr': lambda: [add_atr(f) for f in frames],
+        'compute_indicators': lambda: [compute_indicators(f) for f in frames],
+        'generate_score (row-wise)': lambda: [f.apply(generate_score, axis=1) for f in scored],
+        'score_frame': lambda: [score_frame(f) for f in scored],
+        'backtest_strategy': lambda: [backtest_strategy(f) for f in scored],
+        'train_ml_model (365 bars)': train,
+        'serialize records': lambda: render(result, 'records'),
+        'serialize columnar': lambda: render(result, 'columnar'),
+    }
+    measured = {}
+    for name, fn in stages.items():
+        seconds = best_of(fn, repeat=1 if name.startswith('train') else 3)
+        peak = peak_memory(fn)
+        measured[name] = {'seconds': round(seconds, 6), 'peak_mb': round(peak / 2**20, 3)}
+
+    key = f"{source}:{tickers}x{rows}"
+    machine = f"{platform.machine()} {platform.python_version()} {os.cpu_count()} cpu"
+    stored = {}
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f)
+    reference = stored.get(key, {})
+    if reference and reference.get('machine') != machine:
+        print(f"⚠ Baseline for {key} was recorded on {reference.get('machine')}; timings may not be comparable")
+
+    ok = True
+    for name, now in measured.items():
+        before = reference.get('stages', {}).get(name)
+        line = f"{name:>34} {now['seconds'] * 1000:10.2f} ms  peak {now['peak_mb']:8.2f} MB"
+        if before:
+            slower = now['seconds'] > before['seconds'] * (1 + tolerance) + 0.002
+            heavier = now['peak_mb'] > before['peak_mb'] * (1 + tolerance) + 1
+            line += f"   baseline {before['seconds'] * 1000:10.2f} ms {before['peak_mb']:8.2f} MB"
+            if slower or heavier:
+                line += "   REGRESSION"
+                ok = False
+        print(line)
+
+    if save:
+        stored[key] = {'machine': machine, 'stages': measured}
+        with open(baseline, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved baseline {key} to {baseline}")
+    elif not reference:
+        print(f"No baseline for {key}; run with --save-baseline to record one")
+    return ok
+
+SHARED_HEADLINES = ["Stocks rally as inflation cools faster than expected",
+                    "Markets slump on recession fears", "Fed holds rates steady, signals patience"]
+
+class FixtureFeedHandler(BaseHTTPRequestHandler):
+    """Local RSS server: /rss?s=TICKER returns five headlines, three shared by every ticker."""
+
+    latency = 0.05
+
+    def do_GET(self):
+        ticker = parse_qs(urlparse(self.path).query).get('s', ['X'])[0]
+        time.sleep(self.latency)
+        titles = SHARED_HEADLINES + [f"{ticker} beats earnings estimates", f"Analysts downgrade {ticker} on weak guidance"]
+        items = ''.join(f"<item><title>{escape(t)}</title><link>http://fixture/{i}</link>"
+                        f"<pubDate>Mon, 05 Oct 2026 1{i}:00:00 GMT</pubDate></item>" for i, t in enumerate(titles))
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>{ticker}</title>{items}</channel></rss>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def legacy_headlines(ticker: str, analyzer: SentimentIntensityAnalyzer) -> List[dict]:
+    """The original get_latest_headlines: one blocking fetch, every title scored."""
+    return [{'title': h.get('title'), 'sentiment': analyzer.polarity_scores(h.get('title'))['compound']}
+            for h in fetch_feed(ticker)[:5]]
+
+def bench_news(tickers: int = 40) -> None:
+    print(f"== News: {tickers} tickers from a local RSS fixture ({FixtureFeedHandler.latency * 1000:.0f} ms per feed) ==")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureFeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url, news_helper.FEED_URL = news_helper.FEED_URL, f"http://127.0.0.1:{server.server_address[1]}/rss?s=%s"
+    symbols = [f"T{i:03d}" for i in range(tickers)]
+    try:
+        analyzer = SentimentIntensityAnalyzer()
+        start = time.perf_counter()
+        for t in symbols:
+            legacy_headlines(t, analyzer)
+        legacy = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as root:
+            service = NewsService(memo=SentimentMemo(os.path.join(root, 'news.db')))
+            start = time.perf_counter()
+            service.sentiment_many(symbols)
+            cold_time = time.perf_counter() - start
+            start = time.perf_counter()
+            service.sentiment_many(symbols)
+            warm_time = time.perf_counter() - start
+            stats = service.stats()
+            # A new process: empty TTL cache, but the sentiment memo persists on disk
+            restarted = NewsService(memo=SentimentMemo(os.path.join(root, 'news.db')))
+            start = time.perf_counter()
+            restarted.sentiment_many(symbols)
+            memo_time = time.perf_counter() - start
+        print(f"sequential fetch + score {legacy * 1000:7.0f} ms   batch cold {cold_time * 1000:7.0f} ms   "
+              f"TTL-cached {warm_time * 1000:6.2f} ms   after restart (memo warm) {memo_time * 1000:6.0f} ms")
+        print(f"{stats['headlines']} headlines, {stats['unique_headlines']} distinct, {stats['scored']} scored with VADER; "
+              f"{restarted.stats()['scored']} after restart")
+    finally:
+        news_helper.FEED_URL = url
+        server.shutdown()
+
+def bench_backtest() -> None:
+    print("== Backtest: iloc loop vs simulate_trades ==")
+    cases = [
+        ('12y daily', synthetic_ohlcv(252 * 12, freq='B'), 10),
+        ('1y 5-minute', synthetic_ohlcv(252 * 75, freq='5min'), 78),
+    ]
+    for label, bars, holding_days in cases:
+        df = compute_indicators(bars)
+        # The live Score rarely reaches 4.5, so use a threshold that trades often enough to measure
+        df['Score'] = score_frame(df) + np.random.default_rng(0).integers(0, 5, len(df))
+        trades = len(backtest_strategy(df, holding_days=holding_days))
+        rowwise = best_of(lambda: backtest_strategy_rowwise(df, holding_days=holding_days), repeat=1)
+        vectorized = best_of(lambda: backtest_strategy(df, holding_days=holding_days))
+        print(f"{label:>12} {len(df):>7} bars {trades:>6} trades  iloc {rowwise * 1000:9.1f} ms  "
+              f"arrays {vectorized * 1000:7.2f} ms  ({rowwise / vectorized:,.0f}x)")
+
+def bench_sweep() -> None:
+    print("== Sweep: backtest_strategy per combination vs sweep_backtest ==")
+    df = compute_indicators(synthetic_ohlcv(252, freq='B'))
+    df['Score'] = score_frame(df) + np.random.default_rng(0).integers(0, 5, len(df))
+    grid = {
+        'holding_days': [3, 5, 10, 15, 20],
+        'min_scores': [2, 3, 4, 4.5, 5],
+        'stop_losses': [2, 3, 4, 5, 6, 7, 8, 10],
+        'take_profits': [4, 6, 8, 10, 15],
+    }
+    combinations = [(h, m, sl, tp) for h in grid['holding_days'] for m in grid['min_scores']
+                     for sl in grid['stop_losses'] for tp in grid['take_profits']]
+    looped = best_of(lambda: [backtest_strategy(df, *combo) for combo in combinations], repeat=1)
+    swept = best_of(lambda: sweep_backtest(df, **grid))
+    print(f"{len(combinations)} combinations over {len(df)} bars  looped {looped:6.2f} s  "
+          f"sweep {swept * 1000:7.1f} ms  ({looped / swept:,.0f}x)")
+
+def bench_store(latency: float = 0.3) -> None:
+    print(f"== Bar store: provider download ({latency * 1000:.0f} ms simulated) vs warm local read ==")
+    provider = SyntheticProvider(rows=252 * 10, latency=latency)
+    start = provider.bars.index[0]
+    with tempfile.TemporaryDirectory() as root:
+        store = BarStore(root=root, provider=provider)
+        cold = best_of(lambda: store.refresh('TEST', '1d', start=start, force=True), repeat=1)
+        warm = best_of(lambda: store.refresh('TEST', '1d', start=start))
+        print(f"{len(provider.bars)} daily bars  cold {cold * 1000:7.1f} ms  warm {warm * 1000:6.2f} ms")
+
+def bench_bars(tickers: int = 5000, daily: int = 252 * 5, intraday: int = 78) -> None:
+    print(f"== Bars: {tickers} tickers x {daily} daily + {intraday} 5-minute bars held in RAM ==")
+    last_day = pd.Timestamp('2026-10-16 16:00', tz='America/New_York')
+    daily_index = pd.date_range(end=last_day.normalize() - pd.Timedelta(days=1), periods=daily, freq='B', name='Date')
+    intraday_index = pd.date_range(end=last_day, periods=intraday, freq='5min', name='Date')
+
+    def build(convert: Callable) -> Tuple[Dict[str, Any], int]:
+        rng = np.random.default_rng(7)
+        gc.collect()
+        tracemalloc.start()
+        held = {}
+        for t in range(tickers):
+            days, minutes = yfinance_style_bars(daily_index, rng), yfinance_style_bars(intraday_index, rng)
+            held[f"T{t:04d}"] = convert(days, minutes)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return held, size
+
+    variants = {
+        'DataFrame (concat + drop_duplicates)': legacy_merge_intraday,
+        'Bars float64': lambda d, m: Bars.from_frame(d, 'float64').merge(Bars.from_frame(m, 'float64').last_session()),
+        'Bars float32': lambda d, m: Bars.from_frame(d, 'float32').merge(Bars.from_frame(m, 'float32').last_session()),
+    }
+    baseline = None
+    for name, convert in variants.items():
+        held, size = build(convert)
+        baseline = baseline or size
+        print(f"{name:>38}  {size / 2**20:8.1f} MiB  {size / tickers / 1024:6.1f} KiB/ticker  "
+              f"{size / baseline * 100:5.1f}%")
+        del held
+
+def bench_timeframes(days: int = 250, tickers: int = 500) -> None:
+    import fetch_data
+
+    print(f"== Timeframes: Bars.resample vs DataFrame.resample, and the provisional daily bar for {tickers} tickers ==")
+    rng = np.random.default_rng(11)
+    # Extended-hours 5-minute bars (04:00-20:00 ET) across a DST change
+    sessions = pd.bdate_range(end='2026-11-13', periods=days)
+    minutes = pd.timedelta_range('4h', '19h55min', freq='5min')
+    index = pd.DatetimeIndex([d + m for d in sessions for m in minutes]).tz_localize('America/New_York')
+    frame = yfinance_style_bars(index, rng)
+    bars = Bars.from_frame(frame)
+    aggregation = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    for interval, rule in [('15m', '15min'), ('1h', 'h'), ('1d', 'D')]:
+        fast = best_of(lambda: bars.resample(interval))
+        legacy = best_of(lambda: frame.resample(rule).agg(aggregation).dropna(), repeat=1)
+        print(f"{len(bars)} 5m -> {len(bars.resample(interval)):>6} {interval:>3}  Bars {fast * 1000:7.2f} ms  "
+              f"DataFrame {legacy * 1000:7.2f} ms  {legacy / fast:5.1f}x")
+
+    # One session of 5m bars on top of a year of daily bars, per ticker
+    daily = Bars.from_frame(frame.resample('D').agg(aggregation).dropna()[:-1])
+    # What the store returns for the 5-day intraday window
+    intraday = bars.since(bars.dates[-1] - pd.Timedelta(days=5))
+    today = bars.last_session()
+    merged = fetch_data._with_session_bar(daily, intraday)
+    legacy_rows = len(legacy_merge_intraday(daily.to_frame(), today.to_frame()))
+    elapsed = best_of(lambda: [fetch_data._with_session_bar(daily, intraday) for _ in range(tickers)])
+    print(f"daily + session  {len(merged)} rows (concat gave {legacy_rows})  {elapsed / tickers * 1e6:7.1f} us/ticker")
+
+def import_times(code: str) -> List[Tuple[str, float, int]]:
+    """(module, cumulative seconds, depth) for every import `python -X importtime -c code` makes."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=here,
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, name = line.split('|')
+            depth = (len(name) - len(name.lstrip())) // 2
+            times.append((name.strip(), int(cumulative) / 1e6, depth))
+    return times
+
+def first_byte(command: List[str], port: int, env: Dict[str, str], timeout: float = 60) -> Tuple[float, float]:
+    """Seconds from launching a server until GET / answers, and until GET /ready answers 200."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ttfb = None
+        while time.perf_counter() - start < timeout:
+            try:
+                if ttfb is None:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5).read()
+                    ttfb = time.perf_counter() - start
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=5).read()
+                return ttfb, time.perf_counter() - start
+            except (OSError, urllib.error.HTTPError):
+                time.sleep(0.01)
+        raise TimeoutError(f"{command[0]} did not become ready in {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def bench_startup() -> None:
+    print("== Startup: import time of main and time to first byte ==")
+    times = import_times('import main')
+    total = next(seconds for name, seconds, _ in times if name == 'main')
+    print(f"import main  {total * 1000:7.0f} ms; slowest direct imports:")
+    for name, seconds, _ in sorted((t for t in times if t[2] == 1), key=lambda t: -t[1])[:6]:
+        print(f"{name:>28}  {seconds * 1000:7.0f} ms")
+    deferred = import_times('import main, ml_model; ml_model.preload()')
+    loaded = {name for name, _, _ in times}
+    later = sum(seconds for name, seconds, depth in deferred if depth == 0 and name not in loaded)
+    print(f"{'deferred to warm-up':>28}  {later * 1000:7.0f} ms")
+
+    with tempfile.TemporaryDirectory() as root:
+        env = {**os.environ, 'STOCKAPP_PROVIDER': 'csv', 'STOCKAPP_DATA_DIR': root,
+               'STOCKAPP_SCHEDULER_LOCK': os.path.join(root, 'scheduler.lock'), 'STOCKAPP_WATCHLISTS': ''}
+        servers = [('uvicorn', [sys.executable, '-m', 'uvicorn', 'main:app', '--port', '{port}'])]
+        if shutil.which('gunicorn'):
+            servers.append(('gunicorn, 2 workers', ['gunicorn', '-c', 'gunicorn.conf.py', 'main:app',
+                                                    '--bind', '127.0.0.1:{port}', '--workers', '2']))
+        for label, command in servers:
+            with socket.socket() as sock:
+                sock.bind(('127.0.0.1', 0))
+                port = sock.getsockname()[1]
+            ttfb, ready = first_byte([part.format(port=port) for part in command], port, env)
+            print(f"{label:>28}  first byte {ttfb * 1000:6.0f} ms  ready {ready * 1000:6.0f} ms")
+
+def percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else float('nan')
+
+def bench_load(clients: int = 50, latency: float = 0.05) -> None:
+    import uvicorn
+    import bar_store
+    import fetch_data
+    import main as app_module
+
+    print(f"== Load: {clients} concurrent /analyze requests against a local stub provider ==")
+    logging.getLogger().setLevel(logging.WARNING)
+    provider = SyntheticProvider(rows=252 * 2, latency=latency)
+    news_helper.set_news_service(stub_news_service(tempfile.mkdtemp()))
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def request(ticker: str) -> float:
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/analyze?ticker={ticker}", timeout=300) as response:
+            body = json.loads(response.read())
+        assert 'error' not in body, body
+        return time.perf_counter() - start
+
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            bar_store._store = BarStore(root=root, provider=provider)
+            request('WARMUP')  # start the process pool outside the measurement
+            for label, tickers in [('distinct tickers', [f"T{i:03d}" for i in range(clients)]),
+                                   ('same ticker', ['SAME'] * clients)]:
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    start = time.perf_counter()
+                    latencies = list(pool.map(request, tickers))
+                    wall = time.perf_counter() - start
+                print(f"{label:>16}  p50 {percentile(latencies, 50) * 1000:7.0f} ms  "
+                      f"p99 {percentile(latencies, 99) * 1000:7.0f} ms  wall {wall:5.2f} s")
+    finally:
+        server.should_exit = True
+        thread.join()
+
+def bench_batch(tickers: int = 200, latency: float = 0.05) -> None:
+    import asyncio
+    import bar_store
+    import fetch_data
+    import model_registry
+    from model_registry import ModelRegistry
+
+    print(f"== Batch: {tickers} tickers, per-ticker analyze_stock vs analyze_many ==")
+    logging.getLogger().setLevel(logging.WARNING)
+    provider = SyntheticProvider(rows=252 * 2, latency=latency)
+    news_helper.set_news_service(stub_news_service(tempfile.mkdtemp()))
+    symbols = [f"B{i:03d}" for i in range(tickers)]
+
+    async def per_ticker() -> int:
+        results = await asyncio.gather(*(fetch_data.analyze_stock(t) for t in symbols))
+        return sum('error' not in r for r in results)
+
+    async def batched() -> int:
+        return sum(['error' not in r async for r in fetch_data.analyze_many(symbols)])
+
+    for label, run in [('per-ticker', per_ticker), ('batch', batched)]:
+        # Fresh store and registry each time, so both paths download and train from scratch
+        with tempfile.TemporaryDirectory() as root:
+            bar_store._store = BarStore(root=os.path.join(root, 'bars'), provider=provider)
+            model_registry._registry = ModelRegistry(root=os.path.join(root, 'models'))
+            start = time.perf_counter()
+            ok = asyncio.run(run())
+            wall = time.perf_counter() - start
+        print(f"{label:>12}  {ok}/{tickers} ok  wall {wall:6.2f} s  {tickers / wall:7.1f} tickers/s")
+
+def bench_precompute(tickers: int = 20, latency: float = 0.05) -> None:
+    import bar_store
+    import main as app_module
+    import model_registry
+    import response_cache
+    from fastapi.testclient import TestClient
+    from model_registry import ModelRegistry
+    from scheduler import Scheduler, Watchlist
+
+    print(f"== Precompute: first /analyze of the day for {tickers} watchlist tickers, on demand vs precomputed ==")
+    logging.getLogger().setLevel(logging.WARNING)
+    provider = SyntheticProvider(rows=252 * 2, latency=latency)
+    news_helper.set_news_service(stub_news_service(tempfile.mkdtemp()))
+    symbols = [f"P{i:03d}" for i in range(tickers)]
+
+    def first_requests(client: TestClient) -> Tuple[List[float], List[str]]:
+        latencies, statuses = [], []
+        for ticker in symbols:
+            start = time.perf_counter()
+            response = client.get('/analyze', params={'ticker': ticker})
+            latencies.append(time.perf_counter() - start)
+            assert 'error' not in response.json(), response.json()
+            statuses.append(response.headers['x-cache'])
+        return latencies, statuses
+
+    for label, watchlists in [('on demand', []), ('precomputed', [Watchlist('bench', symbols, 0)])]:
+        with tempfile.TemporaryDirectory() as root:
+            bar_store._store = BarStore(root=os.path.join(root, 'bars'), provider=provider)
+            model_registry._registry = ModelRegistry(root=os.path.join(root, 'models'))
+            response_cache._cache = response_cache.ResponseCache()
+            app_module.scheduler = Scheduler(app_module.precompute_analysis, watchlists)
+            with TestClient(app_module.app) as client:
+                start = time.perf_counter()
+                while True:
+                    status = client.get('/precompute/status').json()
+                    if not (status['queued'] or status['running'] or status['retrying']):
+                        break
+                    time.sleep(0.05)
+                background = time.perf_counter() - start
+                latencies, statuses = first_requests(client)
+        hits = statuses.count('HIT')
+        print(f"{label:>12}  p50 {percentile(latencies, 50) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms  "
+              f"cache hits {hits}/{tickers}" + (f"  (scheduler finished in {background:.1f} s, "
+                                                 f"{status['completed']} done, {status['failed']} failed)" if watchlists else ""))
+
+def bench_chart(rows: int = 200_000, width: int = 1200, repeat: int = 20) -> None:
+    import bar_store
+    import generate_graphs
+    import main as app_module
+    from fastapi.testclient import TestClient
+
+    provider = SyntheticProvider(rows=rows, interval='5m')
+    days = (provider.bars.index[-1] - provider.bars.index[0]).days
+    print(f"== Chart: {rows} 5-minute bars ({days} days) drawn {width} px wide ==")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    close = provider.bars['Close'].to_numpy()
+    elapsed = best_of(lambda: generate_graphs.lttb(close, width))
+    kept = generate_graphs.lttb(close, width)
+    # LTTB favours turning points, so the drawn range should be nearly the full one
+    coverage = np.ptp(close[kept]) / np.ptp(close)
+    print(f"{'LTTB':>22}  {elapsed * 1000:8.1f} ms  {len(kept)} points  {coverage * 100:5.1f}% of the price range kept")
+
+    frame = compute_indicators(provider.bars)
+    lttb, bucket_max = generate_graphs.lttb, generate_graphs.bucket_max
+    try:
+        # Every bar drawn, as the matplotlib script used to
+        generate_graphs.lttb = lambda y, threshold: np.arange(len(y))
+        generate_graphs.bucket_max = lambda values, flags, buckets: (np.arange(len(values)), values, flags)
+        full = best_of(lambda: generate_graphs.render_chart(frame, 'TEST', width), repeat=1)
+    finally:
+        generate_graphs.lttb, generate_graphs.bucket_max = lttb, bucket_max
+    downsampled = best_of(lambda: generate_graphs.render_chart(frame, 'TEST', width), repeat=1)
+    print(f"{'render, every bar':>22}  {full * 1000:8.1f} ms")
+    print(f"{'render, downsampled':>22}  {downsampled * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as root:
+        bar_store._store = BarStore(root=root, provider=provider)
+        with TestClient(app_module.app) as client:
+            params = {'ticker': 'CHART', 'interval': '5m', 'days': days, 'width': width}
+            start = time.perf_counter()
+            response = client.get('/chart', params=params)
+            cold = time.perf_counter() - start
+            response.raise_for_status()  # Do not time error responses
+            warm = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = client.get('/chart', params=params)
+                warm.append(time.perf_counter() - start)
+        print(f"{'/chart cold':>22}  {cold * 1000:8.1f} ms  {len(response.content) / 1024:.0f} KiB PNG")
+        print(f"{'/chart warm':>22}  {percentile(warm, 50) * 1000:8.1f} ms p50  {max(warm) * 1000:.1f} ms max")
+
+def bench_scoring(sizes: List[int], rowwise_limit: int) -> None:
+    print("== Scoring: DataFrame.apply(generate_score) vs score_frame ==")
+    for rows in sizes:
+        df = compute_indicators(synthetic_ohlcv(rows, freq='5min'))
+        # Time the NaN/None/zero fall-through paths as well; tests/test_scoring.py checks parity
+        df.iloc[::97, df.columns.get_loc('RSI')] = np.nan
+        df.iloc[::89, df.columns.get_loc('MA20')] = 0.0
+        df.iloc[::83, df.columns.get_loc('Support')] = np.nan
+
+        vectorized = best_of(lambda: score_frame(df))
+        if rows <= rowwise_limit:
+            rowwise = best_of(lambda: df.apply(generate_score, axis=1), repeat=1)
+            print(f"{rows:>9} rows  apply {rowwise * 1000:9.1f} ms  vectorized {vectorized * 1000:7.2f} ms  ({rowwise / vectorized:,.0f}x)")
+        else:
+            print(f"{rows:>9} rows  apply {'skipped':>12}  vectorized {vectorized * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the analysis pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--rowwise-limit', type=int, default=100_000,
+                        help="skip the slow row-wise baseline above this many rows")
+    parser.add_argument('--only', nargs='+', choices=['scoring', 'indicators', 'backtest', 'sweep', 'store', 'load', 'batch', 'streaming', 'payloads', 'scan', 'train', 'portfolio', 'metrics', 'pipeline', 'news', 'bars', 'precompute', 'chart', 'timeframes', 'startup'],
+                        default=['scoring', 'indicators', 'backtest', 'sweep', 'store', 'load', 'batch', 'streaming', 'payloads', 'scan', 'train', 'portfolio', 'metrics', 'pipeline', 'news', 'bars', 'precompute', 'chart', 'timeframes', 'startup'])
+    parser.add_argument('--source', choices=['synthetic', 'csv'], default='synthetic',
+                        help="pipeline data: synthetic random walks or sample_stock_data.csv replayed")
+    parser.add_argument('--rows', type=int, default=252 * 10, help="pipeline bars per ticker")
+    parser.add_argument('--tickers', type=int, default=1, help="pipeline tickers")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="pipeline baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="record the pipeline timings as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="fail when a pipeline stage is this fraction slower or heavier than its baseline")
+    args = parser.parse_args()
+
+    ok = True
+    if 'pipeline' in args.only:
+        ok = bench_pipeline(args.source, args.rows, args.tickers, args.baseline, args.save_baseline, args.tolerance)
+
+    if 'scoring' in args.only:
+        bench_scoring(args.sizes, args.rowwise_limit)
+    if 'indicators' in args.only:
+        bench_indicators(args.sizes)
+    if 'scan' in args.only:
+        bench_scan()
+    if 'payloads' in args.only:
+        bench_payloads([rows for rows in args.sizes if rows <= 1_000_000])
+    if 'streaming' in args.only:
+        bench_streaming()
+    if 'train' in args.only:
+        bench_train()
+    if 'backtest' in args.only:
+        bench_backtest()
+    if 'news' in args.only:
+        bench_news()
+    if 'precompute' in args.only:
+        bench_precompute()
+    if 'startup' in args.only:
+        bench_startup()
+    if 'timeframes' in args.only:
+        bench_timeframes()
+    if 'chart' in args.only:
+        bench_chart()
+    if 'metrics' in args.only:
+        bench_metrics()
+    if 'portfolio' in args.only:
+        bench_portfolio()
+    if 'sweep' in args.only:
+        bench_sweep()
+    if 'store' in args.only:
+        bench_store()
+    if 'bars' in args.only:
+        bench_bars()
+    if 'batch' in args.only:
+        bench_batch()
+    if 'load' in args.only:
+        bench_load()
+    if not ok:
+        print("❌ Pipeline regressions against the baseline")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
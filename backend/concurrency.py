@@ -0,0 +1,70 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from metrics import absorb, call_traced, profiling
+
+# Pool sizes and timeouts (seconds), overridable from the environment
+IO_WORKERS = int(os.environ.get('STOCKAPP_IO_WORKERS', 16))
+CPU_WORKERS = int(os.environ.get('STOCKAPP_CPU_WORKERS', os.cpu_count() or 1))
+FETCH_TIMEOUT = float(os.environ.get('STOCKAPP_FETCH_TIMEOUT', 30))
+NEWS_TIMEOUT = float(os.environ.get('STOCKAPP_NEWS_TIMEOUT', 10))
+ANALYZE_TIMEOUT = float(os.environ.get('STOCKAPP_ANALYZE_TIMEOUT', 120))
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_cpu_pool: Optional[Executor] = None
+_in_flight: Dict[Hashable, asyncio.Future] = {}
+
+def io_pool() -> ThreadPoolExecutor:
+    """Bounded thread pool for blocking network and disk calls."""
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='stockapp-io')
+    return _io_pool
+
+def cpu_pool() -> Executor:
+    """Process pool for indicator, scoring and model work.
+
+    STOCKAPP_CPU_WORKERS=0 runs CPU work on the I/O threads instead, which is
+    handy under debuggers and in environments without fork/spawn.
+    """
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS) if CPU_WORKERS > 0 else io_pool()
+    return _cpu_pool
+
+async def _run(pool: Executor, fn: Callable, args: tuple, kwargs: dict, timeout: Optional[float]) -> Any:
+    loop = asyncio.get_running_loop()
+    # Spans recorded inside the worker come back with the result and are recorded here
+    future = loop.run_in_executor(pool, partial(call_traced, fn, args, kwargs, profiling()))
+    result, spans, rows = await asyncio.wait_for(future, timeout)
+    absorb(spans, rows)
+    return result
+
+async def run_io(fn: Callable, *args, timeout: Optional[float] = FETCH_TIMEOUT, **kwargs) -> Any:
+    return await _run(io_pool(), fn, args, kwargs, timeout)
+
+async def run_cpu(fn: Callable, *args, timeout: Optional[float] = ANALYZE_TIMEOUT, **kwargs) -> Any:
+    return await _run(cpu_pool(), fn, args, kwargs, timeout)
+
+async def coalesce(key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Share one in-flight call between all concurrent callers with the same key.
+
+    The shared task is shielded, so a caller that disconnects or times out
+    does not cancel the work for everyone else.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _in_flight.pop(key) if _in_flight.get(key) is done else None)
+    return await asyncio.shield(task)
+
+def shutdown() -> None:
+    global _io_pool, _cpu_pool
+    if _cpu_pool is not None and _cpu_pool is not _io_pool:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+    _io_pool = _cpu_pool = None
@@ -1,7 +1,7 @@
-FROM python:3.9-slim
+FROM python:3.11-slim
 WORKDIR /app
 COPY requirements.txt .
 RUN pip install -r requirements.txt
 COPY . .
 EXPOSE 8000
-CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000", "--reload"]
\ No newline at end of file
+CMD ["gunicorn", "-c", "gunicorn.conf.py", "main:app"]
\ No newline at end of file
@@ -1,172 +1,539 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from indicators import (
-    add_moving_averages,
-    add_rsi,
-    add_bollinger_bands,
-    add_volume_spike,
-    add_support_resistance,
-    add_atr
-)
-from scoring import generate_score
-from backtester import backtest_strategy
-from ml_model import train_ml_model
-from news_helper import get_latest_headlines
-import pytz
+from typing import Dict, Any, List, Optional, AsyncIterator, Set, Tuple
+from indicators import compute_indicators
+from streaming_indicators import IndicatorState
+from scoring import generate_score, score_frame
+from backtester import backtest_strategy, sweep_backtest
+from portfolio import backtest_portfolio
+from ml_model import train_ml_model, predict_latest, MODEL_FEATURES
+from model_registry import get_registry, data_fingerprint
+from news_helper import get_news_service, average_sentiment, news_batch_timeout
+from bar_store import get_store
+from bars import Bars
+from market_calendar import ist
+from metrics import span
+from concurrency import run_io, run_cpu, coalesce, FETCH_TIMEOUT, NEWS_TIMEOUT, ANALYZE_TIMEOUT
 import logging
-from functools import lru_cache
+import asyncio
+import threading
+import time
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-# Define timezone at the top level
-ist = pytz.timezone('Asia/Kolkata')
+# Calendar days of history providers serve below daily bars (Yahoo: 60 days under 1h, 730 at 1h)
+INTRADAY_HISTORY_DAYS = {'5m': 59, '15m': 59, '1h': 729}
 
-# Cache news headlines to reduce API calls
-@lru_cache(maxsize=128)
-def cached_headlines(ticker):
-    return get_latest_headlines(ticker)
+def _session_window(days: int):
+    end_date = datetime.now(ist)
+    start_date = end_date - timedelta(days=days)
+    midnight = dict(hour=0, minute=0, second=0, microsecond=0)
+    # Daily bars up to yesterday; today's session comes from the intraday bars
+    return start_date.replace(**midnight), end_date.replace(**midnight), end_date - timedelta(days=5)
 
-async def fetch_base_data(ticker: str, days: int = 365) -> pd.DataFrame:
-    try:
-        end_date = datetime.now(ist)
-        start_date = end_date - timedelta(days=days)
-
-        logging.info(f"📥 Downloading data for {ticker} from {start_date} to {end_date}")
-        stock = yf.Ticker(ticker)  # Re-instantiate to avoid stale cache
-        data = stock.history(start=start_date.strftime('%Y-%m-%d'), 
-                           end=end_date.strftime('%Y-%m-%d'), 
-                           interval='1d', 
-                           progress=False, 
-                           auto_adjust=False, 
-                           timeout=30)
+def _with_session_bar(data: Bars, intraday_data: Bars) -> Bars:
+    """Daily bars plus a provisional bar for the latest intraday session (pre/post market included).
 
-        if data.empty:
-            logging.error(f"❌ No daily data for {ticker}")
-            return pd.DataFrame()
+    The session is aggregated into one bar on the daily series' calendar, so
+    rolling windows only ever span daily bars. It is only appended for a
+    session after the last daily bar; a daily bar for the same date is final
+    and kept as is.
+    """
+    if intraday_data.empty:
+        return data
+    if len(data) and data.tz != intraday_data.tz:
+        intraday_data = Bars(intraday_data.stamps, intraday_data.open, intraday_data.high, intraday_data.low,
+                             intraday_data.close, intraday_data.volume, data.tz)
+    today = intraday_data.last_session().resample('1d')
+    if len(data) and today.stamps[0] <= data.stamps[-1]:
+        # The session already has a daily bar (e.g. after the close), or is older: nothing to add
+        return data
+    return data.merge(today)
 
-        # Flatten MultiIndex if present
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = [col[0] for col in data.columns]
-            logging.info("✅ Flattened MultiIndex columns")
+def _interval_start(days: int, interval: str) -> datetime:
+    # The last `days` calendar days of intraday bars, as far back as providers serve them
+    return datetime.now(ist) - timedelta(days=min(days, INTRADAY_HISTORY_DAYS[interval]))
+
+def load_interval_data(ticker: str, days: int, interval: str) -> Bars:
+    """Bars at an intraday interval ('1h', '15m' or '5m'), kept as their own series."""
+    start = _interval_start(days, interval)
+    logging.info(f"📥 Loading {interval} data for {ticker} from {start}")
+    with span('download', ticker=ticker, interval=interval) as stage:
+        data = get_store().refresh_bars(ticker, interval, start=start)
+        stage['rows'] = len(data)
+    if data.empty:
+        logging.error(f"❌ No {interval} data for {ticker}")
+    return data
+
+def load_base_data(ticker: str, days: int = 365, interval: str = '1d') -> Bars:
+    try:
+        if interval != '1d':
+            return load_interval_data(ticker, days, interval)
+        daily_start, daily_end, intraday_start = _session_window(days)
+        store = get_store()
 
-        # Attempt intraday data for after-hours prices
-        logging.info("🎯 Attempting intraday data for after-hours...")
-        intraday_data = yf.Ticker(ticker).history(period="1d", interval="5m", prepost=True)
-        if not intraday_data.empty:
-            data = pd.concat([data, intraday_data]).sort_index().drop_duplicates()
-            logging.info("✅ Intraday/after-hours data added")
+        logging.info(f"📥 Loading data for {ticker} from {daily_start} to {daily_end}")
+        with span('download', ticker=ticker) as stage:
+            data = store.refresh_bars(ticker, '1d', start=daily_start, end=daily_end)
 
+            if data.empty:
+                logging.error(f"❌ No daily data for {ticker}")
+                return data
+
+            # Attempt intraday data for after-hours prices
+            logging.info("🎯 Attempting intraday data for after-hours...")
+            data = _with_session_bar(data, store.refresh_bars(ticker, '5m', start=intraday_start))
+            stage['rows'] = len(data)
         return data
 
     except Exception as e:
         logging.error(f"🔥 Error fetching base data: {str(e)}")
-        return pd.DataFrame()
+        return Bars.empty_bars()
 
-async def analyze_stock(ticker: str, days: int = 90) -> Dict[str, Any]:
+def load_many_base_data(tickers: List[str], days: int = 365, interval: str = '1d') -> Dict[str, Bars]:
     try:
-        data = await fetch_base_data(ticker, days)
-        if data.empty:
-            return {"error": "❌ Failed to fetch stock data"}
+        if interval != '1d':
+            start = _interval_start(days, interval)
+            logging.info(f"📥 Loading {interval} data for {len(tickers)} tickers from {start}")
+            with span('download', tickers=len(tickers), interval=interval) as stage:
+                frames = get_store().refresh_many_bars(tickers, interval, start=start)
+                stage['rows'] = sum(len(f) for f in frames.values())
+            return frames
+        daily_start, daily_end, intraday_start = _session_window(days)
+        store = get_store()
+
+        logging.info(f"📥 Loading data for {len(tickers)} tickers from {daily_start} to {daily_end}")
+        with span('download', tickers=len(tickers)) as stage:
+            daily = store.refresh_many_bars(tickers, '1d', start=daily_start, end=daily_end)
+            intraday = store.refresh_many_bars([t for t in tickers if not daily[t].empty], '5m', start=intraday_start)
+            frames = {t: _with_session_bar(daily[t], intraday[t]) if t in intraday else daily[t] for t in tickers}
+            stage['rows'] = sum(len(f) for f in frames.values())
+        return frames
 
-        if 'Close' not in data.columns or 'Volume' not in data.columns:
-            logging.error(f"❌ Missing required columns in data: {data.columns}")
-            return {"error": "❌ Data missing required columns: 'Close' or 'Volume'"}
-
-        # Process recent data for indicators
-        recent_data = data.tail(days).copy()
-        logging.info("📊 Applying indicators to recent data...")
-        recent_data = add_moving_averages(recent_data)
-        recent_data = add_rsi(recent_data)
-        recent_data = add_bollinger_bands(recent_data)
-        recent_data = add_volume_spike(recent_data)
-        recent_data = add_support_resistance(recent_data)
-        recent_data = add_atr(recent_data)
+    except Exception as e:
+        logging.error(f"🔥 Error fetching base data: {str(e)}")
+        return {t: Bars.empty_bars() for t in tickers}
+
+async def fetch_base_data(ticker: str, days: int = 365, interval: str = '1d') -> Bars:
+    try:
+        return await run_io(load_base_data, ticker, days, interval, timeout=FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out fetching base data for {ticker} after {FETCH_TIMEOUT}s")
+        return Bars.empty_bars()
+
+async def fetch_news_many(tickers: List[str]) -> Dict[str, Dict]:
+    """Sentiment and headlines for a watchlist, fetching uncached feeds concurrently."""
+    tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+    timeout = news_batch_timeout(len(tickers))
+    try:
+        with span('news', tickers=len(tickers)):
+            return await run_io(get_news_service().sentiment_many, tickers, timeout=timeout)
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out fetching news for {len(tickers)} tickers after {timeout}s")
+        return {}
+
+async def fetch_headlines(ticker: str) -> List[Dict]:
+    try:
+        with span('news', ticker=ticker) as stage:
+            # The news service caches headlines per ticker with a TTL
+            headlines, hit = await run_io(get_news_service().lookup, ticker, timeout=NEWS_TIMEOUT)
+            stage['cache'] = 'hit' if hit else 'miss'
+        return headlines
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out fetching news for {ticker} after {NEWS_TIMEOUT}s")
+        return []
+
+def build_scored_frame(data: Bars, days: Optional[int]) -> pd.DataFrame:
+    # Process recent data for indicators (the last `days` bars, or all of them for None);
+    # tail and to_frame are views, compute_indicators copies once
+    data = data.tail(days) if days is not None else data
+    logging.info("📊 Applying indicators to recent data...")
+    with span('indicators', rows=len(data)):
+        recent_data = compute_indicators(data.to_frame())
         recent_data = recent_data.dropna()
 
-        if recent_data.empty or 'Close' not in recent_data.columns:
-            return {"error": "❌ No valid data after indicator processing"}
+    if recent_data.empty or 'Close' not in recent_data.columns:
+        return pd.DataFrame()
+
+    logging.info("📈 Generating scores...")
+    with span('scoring', rows=len(recent_data)):
+        recent_data['Score'] = score_frame(recent_data)
+    return recent_data
+
+def analyze_frame(data: Bars, days: Optional[int]) -> Dict[str, Any]:
+    """CPU-bound part of analyze_stock: indicators, scores and backtest.
 
-        logging.info("📈 Generating scores...")
-        recent_data['Score'] = recent_data.apply(generate_score, axis=1)
+    Runs in the process pool, so it only takes and returns picklable data.
+    """
+    return analyze_scored_frame(build_scored_frame(data, days))
 
-        logging.info("🧠 Training ML model on recent data...")
-        features = recent_data[['RSI', 'MA20', 'MA50', 'ATR', 'Score']].dropna()
-        if len(features) < 10:
-            return {"error": "❌ Insufficient data for model training"}
-        model, mse = train_ml_model(recent_data)
-        logging.info("✅ Model trained")
+def build_scored_panel(frames: Dict[str, Bars], days: Optional[int]) -> Dict[str, pd.DataFrame]:
+    """build_scored_frame for many tickers, as one stacked (ticker, row) panel."""
+    recent = {t: (bars.tail(days) if days is not None else bars).to_frame() for t, bars in frames.items() if not bars.empty}
+    if not recent:
+        return {}
+    # Row positions instead of timestamps, so tickers from different exchanges/timezones stack cleanly
+    panel = pd.concat({t: f.reset_index(drop=True) for t, f in recent.items()}, names=['Ticker', 'Row'])
 
-        logging.info("🔁 Running backtest on recent data...")
+    logging.info(f"📊 Applying indicators to {len(recent)} tickers...")
+    with span('indicators', rows=len(panel), tickers=len(recent)):
+        panel = compute_indicators(panel).dropna()
+    logging.info("📈 Generating scores...")
+    with span('scoring', rows=len(panel), tickers=len(recent)):
+        panel['Score'] = score_frame(panel)
+
+    scored = {}
+    for ticker, group in panel.groupby(level=0, sort=False):
+        group = group.droplevel(0)
+        group.index = recent[ticker].index[group.index.to_numpy()]
+        scored[ticker] = group
+    return scored
+
+def analyze_scored_frame(recent_data: pd.DataFrame) -> Dict[str, Any]:
+    if recent_data.empty:
+        return {"error": "❌ No valid data after indicator processing"}
+
+    features = recent_data[['RSI', 'MA20', 'MA50', 'ATR', 'Score']].dropna()
+    if len(features) < 10:
+        return {"error": "❌ Insufficient data for model training"}
+
+    logging.info("🔁 Running backtest on recent data...")
+    with span('backtest', rows=len(recent_data)):
         backtest = backtest_strategy(recent_data)
-        logging.info("✅ Backtest complete")
-
-        logging.info("📰 Fetching news...")
-        headlines = cached_headlines(ticker)
-        sentiment_score = sum(h.get('sentiment', 0) for h in headlines) / len(headlines) if headlines else 0
-        logging.info(f"✅ News fetched, Sentiment Score: {sentiment_score}")
-
-        latest = recent_data.iloc[-1]
-        predicted_price = None
-        if model and hasattr(model, 'predict'):
-            try:
-                feature_values = [latest.get('MA20', 0), latest.get('MA50', 0), latest.get('RSI', 0), latest.get('ATR', 0), latest.get('Score', 0)]
-                feature_array = np.array([feature_values])
-                predicted_price = model.predict(feature_array)[0]
-                logging.info(f"📈 Predicted 10-day future price: {predicted_price}")
-            except Exception as e:
-                logging.error(f"Prediction error: {e}")
-
-        trade_action = None
-        if predicted_price and latest['Close']:
-            if predicted_price > latest['Close'] * 1.05 and latest['Close'] < latest.get('BB_upper', float('inf')):
-                trade_action = "buy"
-            elif predicted_price < latest['Close'] * 0.95 and latest['Close'] > latest.get('BB_lower', 0):
-                trade_action = "sell"
-
-        return {
-            "ticker": ticker.upper(),
-            "data": recent_data[['Date', 'Close', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume', 'Score', 'Support', 'Resistance', 'ATR']].fillna(0).to_dict(orient='records'),
-            "top_signals": recent_data.nlargest(5, 'Score')[['Date', 'Close', 'Score']].reset_index().to_dict(orient='records'),
-            "backtest": backtest[-5:] if backtest else [],
-            "sentiment": sentiment_score,
-            "predicted_price": round(float(predicted_price), 2) if predicted_price else None,
-            "trade_action": trade_action
+    logging.info("✅ Backtest complete")
+
+    return {"frame": recent_data, "backtest": backtest}
+
+async def _train_model(ticker: str, recent_data: pd.DataFrame, fingerprint: str) -> Dict[str, Any]:
+    logging.info(f"🧠 Training ML model for {ticker}...")
+    with span('train', ticker=ticker, rows=len(recent_data)):
+        model, mse = await run_cpu(train_ml_model, recent_data, timeout=ANALYZE_TIMEOUT)
+    logging.info("✅ Model trained")
+    return get_registry().put(ticker, MODEL_FEATURES, fingerprint, model, mse)
+
+# The event loop only keeps weak references to tasks, so running retrains are held here until done
+_background_tasks: Set[asyncio.Task] = set()
+
+def _retrain_in_background(ticker: str, recent_data: pd.DataFrame, fingerprint: str) -> None:
+    async def retrain():
+        try:
+            await coalesce(('train', ticker.upper(), fingerprint), lambda: _train_model(ticker, recent_data, fingerprint))
+        except Exception as e:
+            logging.error(f"🔥 Background retrain failed for {ticker}: {str(e)}")
+    task = asyncio.ensure_future(retrain())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def get_model(ticker: str, recent_data: pd.DataFrame) -> Dict[str, Any]:
+    """Serve a model for ticker from the registry, training only when there is none.
+
+    A cached model for older data, or one past the registry's max age, keeps
+    serving while a replacement trains in the background.
+    """
+    registry = get_registry()
+    with span('model', ticker=ticker) as stage:
+        fingerprint = data_fingerprint(recent_data, MODEL_FEATURES)
+        entry = registry.get(ticker, MODEL_FEATURES, fingerprint)
+        if entry is not None and not registry.expired(entry):
+            stage['cache'] = 'hit'
+            return entry
+
+        fallback = entry or registry.latest(ticker, MODEL_FEATURES)
+        if fallback is not None:
+            logging.info(f"♻ Serving cached model for {ticker}, retraining in background")
+            _retrain_in_background(ticker, recent_data, fingerprint)
+            stage['cache'] = 'stale'
+            return fallback
+
+        stage['cache'] = 'miss'
+        return await coalesce(('train', ticker.upper(), fingerprint), lambda: _train_model(ticker, recent_data, fingerprint))
+
+def predict_action(latest: pd.Series, model) -> Dict[str, Any]:
+    predicted_price = None
+    if model and hasattr(model, 'predict'):
+        try:
+            predicted_price = predict_latest(model, latest)
+            logging.info(f"📈 Predicted 10-day future price: {predicted_price}")
+        except Exception as e:
+            logging.error(f"Prediction error: {e}")
+
+    trade_action = None
+    if predicted_price and latest['Close']:
+        if predicted_price > latest['Close'] * 1.05 and latest['Close'] < latest.get('BB_upper', float('inf')):
+            trade_action = "buy"
+        elif predicted_price < latest['Close'] * 0.95 and latest['Close'] > latest.get('BB_lower', 0):
+            trade_action = "sell"
+    return {"predicted_price": predicted_price, "trade_action": trade_action}
+
+def _window(days: int, interval: str) -> Optional[int]:
+    # Daily analysis keeps the last `days` bars; intraday analysis uses every bar of the `days` loaded
+    return days if interval == '1d' else None
+
+def _model_key(ticker: str, interval: str) -> str:
+    # Models trained on different timeframes must never stand in for each other
+    return ticker if interval == '1d' else f"{ticker}_{interval}"
+
+async def _complete_analysis(ticker: str, analysis_future, interval: str = '1d') -> Dict[str, Any]:
+    # Indicator work and the news request overlap instead of running back to back
+    logging.info("📰 Fetching news...")
+    analysis, headlines = await asyncio.gather(analysis_future, fetch_headlines(ticker))
+    if analysis.get("error"):
+        return analysis
+
+    sentiment_score = average_sentiment(headlines)
+    logging.info(f"✅ News fetched, Sentiment Score: {sentiment_score}")
+
+    recent_data = analysis["frame"]
+    entry = await get_model(_model_key(ticker, interval), recent_data)
+    prediction = predict_action(recent_data.iloc[-1], entry['model'])
+    predicted_price = prediction["predicted_price"]
+
+    # The bar timestamps live in the index; expose them as the 'Date' field the frontend reads.
+    # Tables stay DataFrames here; payloads.render turns them into records, columns or Arrow
+    records = recent_data.rename_axis('Date').reset_index()
+    return {
+        "ticker": ticker.upper(),
+        "interval": interval,
+        "data": records[['Date', 'Close', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume', 'Score', 'Support', 'Resistance', 'ATR']].fillna(0),
+        "top_signals": records.nlargest(5, 'Score')[['Date', 'Close', 'Score']],
+        "backtest": analysis["backtest"][-5:] if analysis["backtest"] else [],
+        "sentiment": sentiment_score,
+        "predicted_price": round(float(predicted_price), 2) if predicted_price else None,
+        "trade_action": prediction["trade_action"],
+        "model": {
+            "name": type(entry['model']).__name__,
+            "age_seconds": round(time.time() - entry['trained_at'], 1),
+            "validation_mse": round(entry['mse'], 4),
+            "fresh": entry['fingerprint'] == data_fingerprint(recent_data, MODEL_FEATURES)
         }
+    }
+
+async def _analyze_stock(ticker: str, days: int, interval: str) -> Dict[str, Any]:
+    try:
+        data = await fetch_base_data(ticker, days, interval)
+        if data.empty:
+            return {"error": "❌ Failed to fetch stock data"}
+
+        analysis = run_cpu(analyze_frame, data, _window(days, interval), timeout=ANALYZE_TIMEOUT)
+        return await _complete_analysis(ticker, analysis, interval)
 
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out analyzing {ticker} after {ANALYZE_TIMEOUT}s")
+        return {"error": f"⚠ Analysis timed out after {ANALYZE_TIMEOUT:.0f}s"}
     except Exception as e:
         logging.error(f"🔥 Critical error in analyze_stock: {str(e)}")
         return {"error": f"⚠ System Error: {str(e)}"}
 
-async def get_latest_price(ticker: str) -> Dict[str, Any]:
+async def analyze_stock(ticker: str, days: int = 90, interval: str = '1d') -> Dict[str, Any]:
+    """Indicators, backtest and model prediction on `interval` bars ('1d', '1h', '15m' or '5m')."""
+    # Concurrent requests for the same ticker share one analysis; callers get their own copy
+    result = await coalesce(('analyze', ticker.upper(), days, interval), lambda: _analyze_stock(ticker, days, interval))
+    return dict(result)
+
+async def _analyze_scored(ticker: str, frame: Optional[pd.DataFrame], interval: str) -> Dict[str, Any]:
     try:
-        stock = yf.Ticker(ticker)  # Re-instantiate to avoid stale cache
-        info = stock.info
-        latest_price = info.get('currentPrice', info.get('regularMarketPrice', None))
-        latest_time = info.get('regularMarketTime', None)
-
-        # Fallback to historical data if real-time is unavailable
-        if not latest_price or not latest_time:
-            data = stock.history(period="1d", interval="1d")
-            if not data.empty:
-                latest_price = data['Close'].iloc[-1]
-                latest_time = data.index[-1].timestamp()
-                logging.info(f"🎯 Fallback to historical close: ${latest_price} at {datetime.fromtimestamp(latest_time, ist)}")
-
-        # Attempt intraday data for after-hours
-        intraday_data = yf.Ticker(ticker).history(period="1d", interval="5m", prepost=True)
-        if not intraday_data.empty and intraday_data.index[-1].timestamp() > (latest_time or 0):
-            latest_price = intraday_data['Close'].iloc[-1]
-            latest_time = intraday_data.index[-1].timestamp()
-            logging.info(f"🎯 Updated with intraday: ${latest_price} at {datetime.fromtimestamp(latest_time, ist)}")
-
-        return {
-            "latest_price": latest_price,
-            "latest_time": datetime.fromtimestamp(latest_time, ist).strftime('%Y-%m-%d %H:%M:%S') if latest_time else None
-        }
+        if frame is None:
+            return {"ticker": ticker, "error": "❌ Failed to fetch stock data"}
+        result = await _complete_analysis(ticker, run_cpu(analyze_scored_frame, frame, timeout=ANALYZE_TIMEOUT), interval)
+        return {"ticker": ticker, **result}
+    except asyncio.TimeoutError:
+        return {"ticker": ticker, "error": f"⚠ Analysis timed out after {ANALYZE_TIMEOUT:.0f}s"}
+    except Exception as e:
+        logging.error(f"🔥 Critical error analyzing {ticker}: {str(e)}")
+        return {"ticker": ticker, "error": f"⚠ System Error: {str(e)}"}
+
+async def analyze_many(tickers: List[str], days: int = 90, interval: str = '1d') -> AsyncIterator[Dict[str, Any]]:
+    """Analyze a watchlist, yielding each ticker's result as soon as it is ready.
+
+    Bars are loaded with one bulk provider call, indicators and scores are
+    computed over the stacked panel in a single pass, and the per-ticker
+    backtest and model work is spread over the process pool.
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+    try:
+        # Warm the news cache for the whole watchlist while the bars load and score
+        news = asyncio.ensure_future(fetch_news_many(tickers))
+        frames = await run_io(load_many_base_data, tickers, days, interval, timeout=FETCH_TIMEOUT)
+        scored = await run_cpu(build_scored_panel, frames, _window(days, interval), timeout=ANALYZE_TIMEOUT)
+        await news
+    except asyncio.TimeoutError:
+        for ticker in tickers:
+            yield {"ticker": ticker, "error": "⚠ Batch data preparation timed out"}
+        return
+
+    pending = [asyncio.ensure_future(_analyze_scored(ticker, scored.get(ticker), interval)) for ticker in tickers]
+    for next_result in asyncio.as_completed(pending):
+        yield await next_result
+
+def sweep_frame(data: Bars, days: int, holding_days: List[int], min_scores: List[float],
+                stop_losses: List[float], take_profits: List[float]) -> Dict[str, Any]:
+    recent_data = build_scored_frame(data, days)
+    if recent_data.empty:
+        return {"error": "❌ No valid data after indicator processing"}
+
+    logging.info(f"🔁 Sweeping {len(holding_days) * len(min_scores) * len(stop_losses) * len(take_profits)} backtest combinations...")
+    results = sweep_backtest(recent_data, holding_days, min_scores, stop_losses, take_profits)
+    logging.info("✅ Sweep complete")
+
+    ranked = [r for r in results if r['trades']]
+    return {
+        "combinations": len(results),
+        "best": max(ranked, key=lambda r: r['mean_return']) if ranked else None,
+        "results": results
+    }
+
+async def sweep_stock(ticker: str, days: int, holding_days: List[int], min_scores: List[float],
+                      stop_losses: List[float], take_profits: List[float]) -> Dict[str, Any]:
+    try:
+        data = await fetch_base_data(ticker, days)
+        if data.empty:
+            return {"error": "❌ Failed to fetch stock data"}
+
+        # sweep_backtest fans large grids out to its own process pool, so drive it from a thread
+        result = await run_io(sweep_frame, data, days, holding_days, min_scores, stop_losses, take_profits,
+                              timeout=ANALYZE_TIMEOUT)
+        if result.get("error"):
+            return result
+        return {"ticker": ticker.upper(), **result}
+
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out sweeping {ticker} after {ANALYZE_TIMEOUT}s")
+        return {"error": f"⚠ Sweep timed out after {ANALYZE_TIMEOUT:.0f}s"}
+    except Exception as e:
+        logging.error(f"🔥 Critical error in sweep_stock: {str(e)}")
+        return {"error": f"⚠ System Error: {str(e)}"}
+
+def portfolio_frames(frames: Dict[str, Bars], days: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    scored = build_scored_panel(frames, days)
+    logging.info(f"💼 Simulating portfolio over {len(scored)} tickers...")
+    result = backtest_portfolio(scored, **params)
+    logging.info("✅ Portfolio backtest complete")
+    return result
+
+async def portfolio_stocks(tickers: List[str], days: int, **params) -> Dict[str, Any]:
+    """Portfolio backtest across tickers; params are passed to simulate_portfolio."""
+    tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+    try:
+        frames = await run_io(load_many_base_data, tickers, days, timeout=FETCH_TIMEOUT)
+        result = await run_cpu(portfolio_frames, frames, days, params, timeout=ANALYZE_TIMEOUT)
+        if result.get("error"):
+            return result
+        return {**result, "missing": [t for t in tickers if t not in result["tickers"]]}
+
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out on portfolio backtest of {len(tickers)} tickers")
+        return {"error": f"⚠ Portfolio backtest timed out after {ANALYZE_TIMEOUT:.0f}s"}
+    except Exception as e:
+        logging.error(f"🔥 Critical error in portfolio_stocks: {str(e)}")
+        return {"error": f"⚠ System Error: {str(e)}"}
+
+# Indicator fields pushed to streaming subscribers with every quote
+QUOTE_COLUMNS = ['Close', 'Volume', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Support', 'Resistance', 'ATR', 'Score']
+
+def _price_at(data: Bars) -> Dict[str, Any]:
+    return {
+        "latest_price": float(data.close[-1]),
+        "latest_time": data.dates[-1].tz_convert(ist).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def load_latest_price(ticker: str) -> Dict[str, Any]:
+    try:
+        # The newest stored intraday bar (pre/post market included), else the last daily close;
+        # the store only goes upstream when its copy is older than max_age
+        store = get_store()
+        now = datetime.now(ist)
+        data = store.refresh_bars(ticker, '5m', start=now - timedelta(days=5))
+        if data.empty:
+            data = store.refresh_bars(ticker, '1d', start=now - timedelta(days=10))
+            if data.empty:
+                return {"error": "❌ No price data available"}
+            logging.info(f"🎯 Fallback to historical close: ${data.close[-1]} at {data.dates[-1]}")
+        return _price_at(data)
     except Exception as e:
         logging.error(f"🔥 Error fetching latest price: {str(e)}")
-        return {"error": f"⚠ System Error: {str(e)}"}
\ No newline at end of file
+        return {"error": f"⚠ System Error: {str(e)}"}
+
+# Per-ticker streaming indicator state, committed through the bar at the stored timestamp.
+# Shared by live quotes and the scanner, so a ticker watched by both is only advanced once
+_quote_states: Dict[str, Tuple[IndicatorState, pd.Timestamp]] = {}
+_quote_states_lock = threading.Lock()
+
+def latest_indicators(ticker: str, recent_data: pd.DataFrame) -> Dict[str, float]:
+    # Every bar but the last is final; the last one may still be forming, so it is only previewed
+    with _quote_states_lock:
+        state, committed_at = _quote_states.get(ticker, (None, None))
+        if state is None or committed_at not in recent_data.index[:-1]:
+            # First quote, or the history moved under us (new session, revised bars): rebuild
+            state = IndicatorState.from_frame(recent_data.iloc[:-1])
+        else:
+            start = recent_data.index.get_loc(committed_at) + 1
+            for bar in recent_data.iloc[start:-1].to_dict('records'):
+                state.update(bar)
+        if len(recent_data) > 1:
+            _quote_states[ticker] = (state, recent_data.index[-2])
+        latest = recent_data.iloc[-1].to_dict()
+        indicators = {**latest, **state.update(latest, commit=False)}
+    indicators['Score'] = generate_score(indicators)
+    return indicators
+
+def load_quote(ticker: str, days: int = 90) -> Dict[str, Any]:
+    """Latest price plus the indicator row /analyze would end on, for streaming.
+
+    Indicators are updated bar by bar from the previous quote's state instead
+    of being recomputed over the whole window.
+    """
+    data = load_base_data(ticker, days)
+    if data.empty:
+        return {"ticker": ticker.upper(), "error": "❌ Failed to fetch stock data"}
+    # The daily series ends in a provisional session bar, so the price and time come from the intraday bars
+    quote = {"ticker": ticker.upper(), **load_latest_price(ticker)}
+    indicators = latest_indicators(ticker.upper(), data.tail(days).to_frame())
+    quote["indicators"] = {col: float(indicators[col]) for col in QUOTE_COLUMNS if col in indicators}
+    return quote
+
+async def get_latest_price(ticker: str) -> Dict[str, Any]:
+    try:
+        return await coalesce(('latest', ticker.upper()), lambda: run_io(load_latest_price, ticker, timeout=FETCH_TIMEOUT))
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out fetching latest price for {ticker} after {FETCH_TIMEOUT}s")
+        return {"error": f"⚠ Latest price timed out after {FETCH_TIMEOUT:.0f}s"}
+
+# History loaded ahead of a chart's first bar, so MA50 and the other windows are warmed up there
+CHART_WARMUP = {'1d': timedelta(days=100), '1h': timedelta(days=14), '15m': timedelta(days=5), '5m': timedelta(days=5)}
+
+def load_chart_bars(ticker: str, days: int, interval: str = '1d') -> Bars:
+    start = datetime.now(ist) - timedelta(days=days) - CHART_WARMUP.get(interval, timedelta(days=5))
+    try:
+        with span('download', ticker=ticker, interval=interval) as stage:
+            data = get_store().refresh_bars(ticker, interval, start=start)
+            stage['rows'] = len(data)
+        return data
+    except Exception as e:
+        logging.error(f"🔥 Error fetching chart data: {str(e)}")
+        return Bars.empty_bars()
+
+def chart_key(data: Bars) -> str:
+    """Identifies the newest bar, including a still-forming one's latest close and volume."""
+    return f"{data.stamps[-1]}:{float(data.close[-1])!r}:{int(data.volume[-1])}"
+
+def render_chart_bars(data: Bars, ticker: str, days: int, width: int = 1200, height: int = 1000,
+                      fmt: str = 'png') -> bytes:
+    """The indicator chart for the `days` ending at the last bar, so the image depends only on the bars."""
+    from generate_graphs import render_chart  # Only processes that draw charts pay for importing matplotlib
+    with span('indicators', rows=len(data)):
+        frame = compute_indicators(data.to_frame())
+    first = int(np.searchsorted(data.stamps, data.stamps[-1] - days * 86400 * 10**9))
+    with span('chart', rows=len(frame) - first, fmt=fmt):
+        return render_chart(frame.iloc[first:], ticker.upper(), width, height, fmt)
+
+async def fetch_chart_bars(ticker: str, days: int, interval: str = '1d') -> Bars:
+    try:
+        return await run_io(load_chart_bars, ticker, days, interval, timeout=FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error(f"⏱ Timed out fetching chart data for {ticker} after {FETCH_TIMEOUT}s")
+        return Bars.empty_bars()
+
+async def draw_chart(data: Bars, ticker: str, days: int, width: int, height: int, fmt: str) -> bytes:
+    return await run_cpu(render_chart_bars, data, ticker, days, width, height, fmt)
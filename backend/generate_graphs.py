@@ -1,109 +1,124 @@
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
+import io
+import matplotlib
+matplotlib.use('Agg')  # Headless: charts are rendered to bytes, never shown
 import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from typing import Tuple
+
+DPI = 100
+
+def lttb(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps when drawing
+    equally spaced values y with `threshold` points (all of them if fewer)."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype='float64')
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    centers_x = edges[:-1] + (counts - 1) / 2
+    centers_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The third vertex is the average of the next bucket (the last point after the final bucket)
+        next_x, next_y = (centers_x[i + 1], centers_y[i + 1]) if i + 3 < threshold else (n - 1, y[-1])
+        candidates = np.arange(start, end)
+        area = np.abs((a - next_x) * (y[start:end] - y[a]) - (a - candidates) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
 
-def fetch_stock_data(ticker, start_date, end_date):
-    """Fetch OHLCV data from Yahoo Finance."""
-    stock = yf.Ticker(ticker)
-    df = stock.history(start=start_date, end=end_date)
-    df = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
-    return df
+def bucket_max(values: np.ndarray, flags: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(first row, max value, any flag) per bucket of about len(values) / buckets rows, for bar-like series."""
+    n = len(values)
+    starts = np.unique(np.linspace(0, n, min(buckets, n) + 1).astype(np.int64)[:-1])
+    return starts, np.maximum.reduceat(values, starts), np.logical_or.reduceat(flags, starts)
 
-def calculate_indicators(df):
-    """Calculate MA, Bollinger Bands, RSI, and Volume Spikes."""
-    # Moving Averages (MA20, MA50)
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    df['MA50'] = df['Close'].rolling(window=50).mean()
-    
-    # Bollinger Bands
-    df['BB_Mid'] = df['Close'].rolling(window=20).mean()
-    df['BB_Std'] = df['Close'].rolling(window=20).std()
-    df['BB_Upper'] = df['BB_Mid'] + 2 * df['BB_Std']
-    df['BB_Lower'] = df['BB_Mid'] - 2 * df['BB_Std']
-    
-    # RSI
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    
-    # Volume Spike (Volume > 1.5x 20-day average)
-    df['Volume_MA20'] = df['Volume'].rolling(window=20).mean()
-    df['Volume_Spike'] = df['Volume'] > 1.5 * df['Volume_MA20']
-    
-    return df
+def plot_price_ma(ax, df: pd.DataFrame, rows: np.ndarray, ticker: str) -> None:
+    """Price with MA20/MA50."""
+    dates = df.index[rows]
+    ax.plot(dates, df['Close'].to_numpy()[rows], label='Close Price', color='blue', linewidth=1)
+    ax.plot(dates, df['MA20'].to_numpy()[rows], label='MA20', color='orange', linewidth=1)
+    ax.plot(dates, df['MA50'].to_numpy()[rows], label='MA50', color='green', linewidth=1)
+    ax.set_title(f'{ticker} - Price with MA20/MA50')
+    ax.set_ylabel('Price')
 
-def plot_price_ma(df, ticker):
-    """Plot Price with MA20/MA50."""
-    plt.figure(figsize=(12, 6))
-    plt.plot(df.index, df['Close'], label='Close Price', color='blue')
-    plt.plot(df.index, df['MA20'], label='MA20', color='orange')
-    plt.plot(df.index, df['MA50'], label='MA50', color='green')
-    plt.title(f'{ticker} - Price with MA20/MA50')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid()
-    plt.show()
+def plot_bollinger_bands(ax, df: pd.DataFrame, rows: np.ndarray, ticker: str) -> None:
+    """Bollinger Bands."""
+    dates = df.index[rows]
+    ax.plot(dates, df['Close'].to_numpy()[rows], label='Close Price', color='blue', linewidth=1)
+    ax.plot(dates, df['BB_upper'].to_numpy()[rows], label='BB Upper', color='red', linestyle='--', linewidth=1)
+    ax.plot(dates, df['MA20'].to_numpy()[rows], label='BB Mid (MA20)', color='orange', linewidth=1)
+    ax.plot(dates, df['BB_lower'].to_numpy()[rows], label='BB Lower', color='green', linestyle='--', linewidth=1)
+    ax.set_title(f'{ticker} - Bollinger Bands')
+    ax.set_ylabel('Price')
 
-def plot_bollinger_bands(df, ticker):
-    """Plot Bollinger Bands."""
-    plt.figure(figsize=(12, 6))
-    plt.plot(df.index, df['Close'], label='Close Price', color='blue')
-    plt.plot(df.index, df['BB_Upper'], label='BB Upper', color='red', linestyle='--')
-    plt.plot(df.index, df['BB_Mid'], label='BB Mid (MA20)', color='orange')
-    plt.plot(df.index, df['BB_Lower'], label='BB Lower', color='green', linestyle='--')
-    plt.title(f'{ticker} - Bollinger Bands')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid()
-    plt.show()
+def plot_rsi(ax, df: pd.DataFrame, rows: np.ndarray, ticker: str) -> None:
+    """RSI."""
+    ax.plot(df.index[rows], df['RSI'].to_numpy()[rows], label='RSI', color='purple', linewidth=1)
+    ax.axhline(30, color='red', linestyle='--', label='Oversold (30)')
+    ax.axhline(70, color='green', linestyle='--', label='Overbought (70)')
+    ax.set_title(f'{ticker} - RSI')
+    ax.set_ylabel('RSI')
 
-def plot_rsi(df, ticker):
-    """Plot RSI."""
-    plt.figure(figsize=(12, 4))
-    plt.plot(df.index, df['RSI'], label='RSI', color='purple')
-    plt.axhline(30, color='red', linestyle='--', label='Oversold (30)')
-    plt.axhline(70, color='green', linestyle='--', label='Overbought (70)')
-    plt.title(f'{ticker} - RSI')
-    plt.xlabel('Date')
-    plt.ylabel('RSI')
-    plt.legend()
-    plt.grid()
-    plt.show()
+def plot_volume_spikes(ax, df: pd.DataFrame, buckets: int, ticker: str) -> None:
+    """Volume with spikes highlighted; each drawn bar is the largest volume in its bucket."""
+    volume = df['Volume'].to_numpy(dtype='float64')
+    starts, peaks, spikes = bucket_max(volume, df['Volume_Spike'].to_numpy() == 1, buckets)
+    dates = df.index[starts]
+    ax.vlines(dates[~spikes], 0, peaks[~spikes], label='Volume', color='gray')
+    ax.vlines(dates[spikes], 0, peaks[spikes], label='Volume Spike (>1.5x MA20)', color='red')
+    average = df['Volume'].rolling(20, min_periods=1).mean().to_numpy()
+    ax.plot(dates, average[starts], label='Volume MA20', color='blue', linewidth=1)
+    ax.set_title(f'{ticker} - Volume with Spikes')
+    ax.set_ylabel('Volume')
 
-def plot_volume_spikes(df, ticker):
-    """Plot Volume with Spikes Highlighted."""
-    plt.figure(figsize=(12, 6))
-    plt.bar(df.index, df['Volume'], label='Volume', color='gray')
-    spikes = df[df['Volume_Spike']]
-    plt.bar(spikes.index, spikes['Volume'], label='Volume Spike (>1.5x MA20)', color='red')
-    plt.plot(df.index, df['Volume_MA20'], label='Volume MA20', color='blue')
-    plt.title(f'{ticker} - Volume with Spikes')
-    plt.xlabel('Date')
-    plt.ylabel('Volume')
-    plt.legend()
-    plt.grid()
-    plt.show()
+def render_chart(df: pd.DataFrame, ticker: str, width: int = 1200, height: int = 1000, fmt: str = 'png') -> bytes:
+    """The four indicator panels for a compute_indicators frame, as PNG or SVG bytes.
+
+    Line series are downsampled with LTTB to about one point per horizontal
+    pixel, so drawing cost depends on the image size rather than the bar count.
+    """
+    figure = Figure(figsize=(width / DPI, height / DPI), dpi=DPI)
+    axes = figure.subplots(4, 1, sharex=True, gridspec_kw={'height_ratios': [3, 3, 1.5, 1.5]})
+    price_rows = lttb(df['Close'].to_numpy(), width)
+    plot_price_ma(axes[0], df, price_rows, ticker)
+    plot_bollinger_bands(axes[1], df, price_rows, ticker)
+    plot_rsi(axes[2], df, lttb(df['RSI'].to_numpy(), width), ticker)
+    plot_volume_spikes(axes[3], df, width, ticker)
+    for ax in axes:
+        ax.legend(loc='upper left', fontsize='small')
+        ax.grid()
+    axes[-1].set_xlabel('Date')
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt)
+    return buffer.getvalue()
 
 def main():
-    # Configuration
-    ticker = 'AAPL'  # Change to desired ticker
-    start_date = '2024-01-01'  # Change to desired start date
-    end_date = '2024-12-31'    # Change to desired end date
-    
-    # Fetch and process data
-    df = fetch_stock_data(ticker, start_date, end_date)
-    df = calculate_indicators(df)
-    
-    # Generate plots
-    plot_price_ma(df, ticker)
-    plot_bollinger_bands(df, ticker)
-    plot_rsi(df, ticker)
-    plot_volume_spikes(df, ticker)
+    import argparse
+    from fetch_data import load_chart_bars, render_chart_bars
+
+    parser = argparse.ArgumentParser(description="Render the indicator chart for a ticker to a file")
+    parser.add_argument('ticker', nargs='?', default='AAPL')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    args = parser.parse_args()
+
+    bars = load_chart_bars(args.ticker, args.days, args.interval)
+    if bars.empty:
+        print(f"❌ No {args.interval} data for {args.ticker}")
+        return
+    path = f"{args.ticker}_{args.interval}.{args.format}"
+    with open(path, 'wb') as f:
+        f.write(render_chart_bars(bars, args.ticker, args.days, fmt=args.format))
+    print(f"✅ Wrote {path}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
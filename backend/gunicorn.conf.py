@@ -0,0 +1,28 @@
+# Production serving: gunicorn -c gunicorn.conf.py main:app
+import os
+import time
+
+bind = os.environ.get('STOCKAPP_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('STOCKAPP_WEB_WORKERS', os.cpu_count() or 1))
+worker_class = 'uvicorn_worker.UvicornWorker'
+# Longer than the slowest analysis, so a busy worker is not killed mid-request
+timeout = int(float(os.environ.get('STOCKAPP_ANALYZE_TIMEOUT', 120))) + 30
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master; workers are forked with it already loaded
+preload_app = True
+
+# Each worker has its own CPU process pool; split the cores between them unless set explicitly
+os.environ.setdefault('STOCKAPP_CPU_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked,
+    # so the heavy modules are loaded once and shared copy-on-write
+    import main
+    started = time.perf_counter()
+    main.preload()
+    server.log.info(f"Preloaded shared state in {time.perf_counter() - started:.2f}s")
+    if workers > 1 and not os.environ.get('STOCKAPP_CACHE_URL'):
+        server.log.warning(f"{workers} workers without STOCKAPP_CACHE_URL: each keeps its own response cache, "
+                           f"and precomputed results only reach the worker that runs the scheduler")
@@ -1,6 +1,17 @@
 import numpy as np
 import pandas as pd
-from typing import Tuple
+from typing import Tuple, Dict, Any, Optional
+
+DEFAULT_INDICATOR_SPEC: Dict[str, Any] = {
+    'short_window': 20,
+    'long_window': 50,
+    'rsi_period': 14,
+    'bb_window': 20,
+    'volume_window': 20,
+    'spike_multiplier': 1.5,
+    'sr_window': 20,
+    'atr_period': 14,
+}
 
 def add_moving_averages(df: pd.DataFrame, short_window: int = 20, long_window: int = 50) -> pd.DataFrame:
     df = df.copy()
@@ -14,9 +25,6 @@ def add_rsi(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     df = df.copy()
     if 'Close' not in df.columns:
         raise ValueError("DataFrame missing 'Close' column")
-    print(f"add_rsi: Close type: {df['Close'].dtype}")
-    print(f"add_rsi: Close sample: {df['Close'].head().to_list()}")
-    print(f"add_rsi: Close NaN count: {df['Close'].isna().sum()}")
     close = pd.to_numeric(df['Close'], errors='coerce')
     if close.isna().all():
         raise ValueError("Close column contains no valid numeric data")
@@ -67,11 +75,128 @@ def add_atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     close = pd.to_numeric(df['Close'], errors='coerce')
     if high.isna().all() or low.isna().all() or close.isna().all():
         raise ValueError("High, Low, or Close contains no valid numeric data")
-    prev_close = close.shift(1).fillna(close[0])
+    prev_close = close.shift(1).fillna(close.iloc[0])
     true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
     df['ATR'] = true_range.rolling(window=period, min_periods=1).mean().fillna(0)
     return df
 
+_FLOAT_COLUMNS = ['MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Support', 'Resistance', 'ATR']
+
+def compute_indicators(df: pd.DataFrame, spec: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Single-pass equivalent of the add_* chain.
+
+    Copies the input once, shares rolling windows over Close between MA20,
+    Bollinger bands and support/resistance, and writes the float indicators
+    into one preallocated float64 block that the result frame is built on.
+
+    df may also be a stacked (ticker, date) panel with a MultiIndex whose
+    first level is the ticker. Rows must be grouped by ticker; every window
+    then restarts at each ticker, matching a per-ticker call exactly.
+
+    Prices must already be numeric (Bars.to_frame, or any provider frame
+    after Bars.from_frame); float32 prices are computed on in float64.
+    Volume is coerced with pd.to_numeric, as add_volume_spike does.
+    """
+    spec = {**DEFAULT_INDICATOR_SPEC, **(spec or {})}
+    missing = [col for col in ('High', 'Low', 'Close', 'Volume') if col not in df.columns]
+    if missing:
+        raise ValueError(f"DataFrame missing {missing} column(s)")
+
+    close = df['Close'].astype('float64', copy=False)
+    high = df['High'].astype('float64', copy=False)
+    low = df['Low'].astype('float64', copy=False)
+    volume = pd.to_numeric(df['Volume'], errors='coerce')
+    if close.isna().all():
+        raise ValueError("Close column contains no valid numeric data")
+    if high.isna().all() or low.isna().all():
+        raise ValueError("High, Low, or Close contains no valid numeric data")
+
+    panel = isinstance(df.index, pd.MultiIndex)
+    starts = np.array([0])
+    if panel:
+        codes = df.index.codes[0]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        if len(starts) != len(np.unique(codes)):
+            raise ValueError("Panel rows must be grouped by ticker")
+    group_sizes = np.diff(np.r_[starts, len(df)])
+
+    def rolling(series: pd.Series, window: int):
+        if panel:
+            return series.groupby(level=0, sort=False).rolling(window, min_periods=1)
+        return series.rolling(window, min_periods=1)
+
+    def previous(values: np.ndarray) -> np.ndarray:
+        # Value one row back within the same ticker, NaN on each ticker's first row
+        shifted = np.roll(values.astype('float64'), 1)
+        shifted[starts] = np.nan
+        return shifted
+
+    def ffill(values: pd.Series) -> np.ndarray:
+        values = pd.Series(values.to_numpy(), index=df.index)
+        return (values.groupby(level=0, sort=False).ffill() if panel else values.ffill()).to_numpy()
+
+    windows: Dict[int, Any] = {}
+    means: Dict[int, np.ndarray] = {}
+
+    def rolling_close(window: int):
+        if window not in windows:
+            windows[window] = rolling(close, window)
+        return windows[window]
+
+    def rolling_mean(window: int) -> np.ndarray:
+        if window not in means:
+            means[window] = rolling_close(window).mean().to_numpy()
+        return means[window]
+
+    # One row per indicator, so each is a contiguous column once the block is wrapped as the result
+    block = np.empty((len(_FLOAT_COLUMNS), len(df)), dtype='float64')
+    close_values = close.to_numpy(dtype='float64')
+
+    block[0] = ffill(pd.Series(rolling_mean(spec['short_window'])))
+    block[1] = ffill(pd.Series(rolling_mean(spec['long_window'])))
+
+    period = spec['rsi_period']
+    delta = pd.Series(np.nan_to_num(close_values - previous(close_values), nan=0.0), index=df.index)
+    avg_gain = rolling(delta.clip(lower=0), period).mean().to_numpy()
+    avg_loss = rolling(delta.clip(upper=0).abs(), period).mean().to_numpy()
+    rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+    block[2] = np.nan_to_num(100 - (100 / (1 + rs)), nan=50.0)
+
+    band = 2 * np.nan_to_num(rolling_close(spec['bb_window']).std().to_numpy(), nan=0.0)
+    block[3] = rolling_mean(spec['bb_window']) + band
+    block[4] = rolling_mean(spec['bb_window']) - band
+
+    avg_volume = rolling(volume, spec['volume_window']).mean().to_numpy()
+    volume_spike = pd.Series((volume.to_numpy() > (avg_volume * spec['spike_multiplier'])).astype(int), index=df.index)
+
+    block[5] = rolling_close(spec['sr_window']).min().to_numpy()
+    block[6] = rolling_close(spec['sr_window']).max().to_numpy()
+
+    prev_close = previous(close_values)
+    missing_prev = np.isnan(prev_close)
+    prev_close[missing_prev] = np.repeat(close_values[starts], group_sizes)[missing_prev]
+    high_values, low_values = high.to_numpy(dtype='float64'), low.to_numpy(dtype='float64')
+    true_range = np.fmax(np.fmax(high_values - low_values, np.abs(high_values - prev_close)),
+                         np.abs(low_values - prev_close))
+    atr = rolling(pd.Series(true_range, index=df.index), spec['atr_period']).mean().to_numpy()
+    block[7] = np.nan_to_num(atr, nan=0.0)
+
+    if df.columns.isin(_FLOAT_COLUMNS + ['Volume_Spike']).any():
+        # Recomputing over existing indicator columns: overwrite them where they are, as the add_* chain does
+        result = df.copy()
+        result['Volume'] = volume
+        result[_FLOAT_COLUMNS[:5]] = block[:5].T
+        result['Volume_Spike'] = volume_spike
+        result[_FLOAT_COLUMNS[5:]] = block[5:].T
+        return result
+
+    # The block becomes the result's float indicator columns as is; the input columns are copied in around it
+    result = pd.DataFrame(block.T, index=df.index, columns=_FLOAT_COLUMNS, copy=False)
+    for position, name in enumerate(df.columns):
+        result.insert(position, name, volume if name == 'Volume' else df[name])
+    result.insert(len(df.columns) + 5, 'Volume_Spike', volume_spike)
+    return result
+
 def align_dataframes(*dfs: pd.DataFrame) -> Tuple[pd.DataFrame, ...]:
     aligned = []
     for df in dfs:
@@ -1,11 +1,76 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fetch_data import analyze_stock
+from fetch_data import (analyze_stock, analyze_many, sweep_stock, portfolio_stocks, fetch_news_many, get_latest_price,
+                        fetch_chart_bars, draw_chart, chart_key)
+from quote_hub import get_hub
+from scanner import get_scanner, IndexColumn
+from response_cache import get_cache, backend_from_env, CachedResponse, ResponseCache, CACHE_CAPACITY
+from bar_store import DEFAULT_MAX_AGE
+from scheduler import Scheduler
+from market_calendar import session_ttl
+from payloads import render, negotiate, dumps, arrow_available, JSON_MEDIA_TYPE
+from concurrency import run_io, run_cpu, shutdown as shutdown_pools
+from news_helper import get_news_service, get_analyzer
+import metrics
+import ml_model
+from contextlib import asynccontextmanager
 import uvicorn
-from typing import Dict, Any
+from typing import Annotated, Dict, Any, List, Optional
+from pydantic import Field
 import logging
+import asyncio
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
 
-app = FastAPI()
+def preload() -> None:
+    """Load what the first requests would otherwise pay for: scikit-learn and the VADER lexicon.
+
+    gunicorn.conf.py runs this in the master before forking, so workers share
+    the loaded modules; otherwise each server warms up after it starts listening.
+    """
+    ml_model.preload()
+    get_analyzer()
+
+# Set once the warm-up finished; /ready answers 503 until then
+readiness: Dict[str, Any] = {"ready": False, "warm_up_seconds": None, "error": None}
+
+async def warm_up() -> None:
+    started = time.perf_counter()
+    try:
+        await run_io(preload, timeout=None)
+        # Start the CPU pool now; forked workers inherit the modules loaded above
+        await run_cpu(ml_model.preload, timeout=None)
+    except Exception as e:
+        # Still serve: whatever failed to load is loaded again on first use
+        readiness["error"] = str(e)
+        logger.error(f"Warm-up failed: {str(e)}")
+    readiness.update(ready=True, warm_up_seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"✅ Ready after {readiness['warm_up_seconds']}s warm-up")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background, so the port opens as soon as the app is imported
+    warming = asyncio.ensure_future(warm_up())
+    if os.environ.get('STOCKAPP_SCAN_ON_STARTUP') == '1':
+        get_scanner().start()
+    # With several server workers, only the one holding the scheduler lock precomputes
+    if scheduler.watchlists and scheduler.claim():
+        tickers = {t for w in scheduler.watchlists for t in w.tickers}
+        if len(tickers) * len(PRECOMPUTE_FORMATS) > CACHE_CAPACITY:
+            logger.warning(f"⚠ {len(tickers)} watchlist tickers x {len(PRECOMPUTE_FORMATS)} formats exceed the response "
+                           f"cache capacity ({CACHE_CAPACITY}); raise STOCKAPP_CACHE_CAPACITY or precomputed results will be evicted")
+        scheduler.start()
+    yield
+    warming.cancel()
+    await scheduler.stop()
+    await get_scanner().stop()
+    await get_hub().close()
+    shutdown_pools()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.RequestMetrics)
 
 # Enable CORS
 app.add_middleware(
@@ -20,20 +85,85 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds an /analyze result stays fresh while the ticker's market is open
+ANALYZE_CACHE_TTL = float(os.environ.get('STOCKAPP_ANALYZE_CACHE_TTL', 60))
+# Off-hours cap on that TTL: no new bars arrive before the next open, but the embedded news sentiment still changes
+ANALYZE_CLOSED_TTL = float(os.environ.get('STOCKAPP_ANALYZE_CLOSED_TTL', 3600))
+# /analyze response formats the precompute scheduler stores for each watchlist ticker
+PRECOMPUTE_FORMATS = [f.strip() for f in os.environ.get('STOCKAPP_PRECOMPUTE_FORMATS', 'records').split(',') if f.strip()]
+# Rendered charts are keyed by their last bar, so an entry never goes out of date and only
+# needs to live as long as it is likely to be asked for again
+CHART_CACHE_CAPACITY = int(os.environ.get('STOCKAPP_CHART_CACHE_CAPACITY', 64))
+CHART_CACHE_TTL = float(os.environ.get('STOCKAPP_CHART_CACHE_TTL', 86400))
+CHART_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+def analysis_ttl(ticker: str) -> float:
+    return session_ttl(ticker, ANALYZE_CACHE_TTL, closed_ttl=ANALYZE_CLOSED_TTL)
+
+def _not_modified(request: Request, cached: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return cached.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(cached.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def response_format(request: Request, fmt: Optional[str]) -> str:
+    return negotiate(fmt, request.headers.get("accept"))
+
+async def cached_json(request: Request, key: str, ticker: str, compute, fmt: str = "records",
+                      profile: bool = False) -> Response:
+    """Serve compute()'s result through the response cache, with ETag/Last-Modified validation.
+
+    fmt is 'records', 'columnar' or 'arrow' (see payloads.render); each format is cached separately.
+    With profile set the cache is bypassed and the JSON result gains a 'profile' breakdown.
+    """
+    if profile:
+        with metrics.trace(profile=True) as trace:
+            result = await compute()
+        body, media_type = render({**result, "profile": trace.report()}, "columnar" if fmt == "columnar" else "records")
+        return Response(content=body, media_type=media_type, headers={"Cache-Control": "no-store", "X-Cache": "BYPASS"})
+
+    if fmt == "arrow" and not arrow_available():
+        return Response(content=dumps({"error": "⚠ Arrow output needs pyarrow installed; use format=columnar"}),
+                        status_code=406, media_type=JSON_MEDIA_TYPE)
+
+    async def encode():
+        result = await compute()
+        body, media_type = render(result, fmt)
+        return body, media_type, not result.get("error")
+
+    with metrics.span('response', cache='') as stage:
+        cached, status = await get_cache().get(f"{key}:{fmt}", encode, lambda: analysis_ttl(ticker))
+        stage['cache'] = status
+    headers = {
+        "Vary": "Accept",
+        "ETag": cached.etag,
+        "Last-Modified": formatdate(cached.last_modified, usegmt=True),
+        "Cache-Control": f"max-age={max(0, int(cached.fresh_until - time.time()))}",
+        "X-Cache": status.upper(),
+    }
+    if _not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     return {"message": "✅ Backend is running. Use /analyze?ticker=AAPL"}
 
-@app.get("/analyze")
-async def analyze(ticker: str = Query(..., example="AAPL")) -> Dict[str, Any]:
+async def _analyze(ticker: str, interval: str = "1d") -> Dict[str, Any]:
     try:
-        result = await analyze_stock(ticker)
+        result = await analyze_stock(ticker, interval=interval)
         if result.get("error"):
             return {"error": result["error"]}
         
         # Mock broker API
         if result.get("trade_action"):
-            trade_result = f"Mock {result['trade_action']} of {ticker} at ${result['data'][-1]['Close']:.2f}"
+            trade_result = f"Mock {result['trade_action']} of {ticker} at ${result['data']['Close'].iloc[-1]:.2f}"
             result["trade_status"] = trade_result
             logger.info(f"Trade executed: {trade_result}")
         
@@ -42,5 +172,247 @@ async def analyze(ticker: str = Query(..., example="AAPL")) -> Dict[str, Any]:
         logger.error(f"Error in analyze: {str(e)}")
         return {"error": str(e)}
 
+@app.get("/analyze")
+async def analyze(
+    request: Request,
+    ticker: str = Query(..., example="AAPL"),
+    interval: str = Query("1d", pattern="^(1d|1h|15m|5m)$"),
+    format: Optional[str] = Query(None, pattern="^(records|columnar|arrow)$"),
+    profile: bool = Query(False),
+) -> Response:
+    # interval picks the bar timeframe indicators, backtest and model run on;
+    # format=columnar returns one array per column with epoch-millisecond dates;
+    # format=arrow (or Accept: application/vnd.apache.arrow.stream) returns an Arrow IPC stream;
+    # profile=true skips the cache and adds per-stage timings and the hottest functions
+    return await cached_json(request, f"analyze:{ticker.upper()}:{interval}", ticker, lambda: _analyze(ticker, interval),
+                             response_format(request, format), profile)
+
+async def precompute_analysis(ticker: str) -> None:
+    """Run /analyze for ticker and store the response under the keys /analyze serves from."""
+    result = await _analyze(ticker)
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    for fmt in PRECOMPUTE_FORMATS:
+        body, media_type = render(result, fmt)
+        await get_cache().put(f"analyze:{ticker.upper()}:1d:{fmt}", body, media_type, analysis_ttl(ticker))
+
+# Precomputes /analyze for the STOCKAPP_WATCHLISTS tickers after each session open and close
+scheduler = Scheduler(precompute_analysis)
+
+@app.get("/ready")
+async def ready() -> Response:
+    # Readiness probe: 503 until the warm-up has loaded the heavy modules and started the CPU pool
+    return Response(content=dumps(readiness), status_code=200 if readiness["ready"] else 503,
+                    media_type=JSON_MEDIA_TYPE)
+
+@app.get("/precompute/status")
+async def precompute_status() -> Dict[str, Any]:
+    return scheduler.status()
+
+@app.post("/precompute/run")
+async def precompute_run(
+    watchlist: Optional[str] = Query(None),
+    tickers: List[str] = Query([]),
+    priority: int = Query(0),
+) -> Dict[str, Any]:
+    # Queue a watchlist (at its own priority) and/or extra tickers now, e.g. after a data fix
+    try:
+        queued = scheduler.enqueue_watchlist(watchlist) if watchlist else 0
+    except KeyError:
+        return {"error": f"❌ Unknown watchlist {watchlist!r}"}
+    symbols = [t.strip() for value in tickers for t in value.split(',') if t.strip()]
+    queued += scheduler.enqueue(symbols, priority)
+    return {"queued": queued, **scheduler.status()}
+
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, int]:
+    return get_cache().stats()
+
+@app.get("/metrics")
+async def metrics_endpoint() -> PlainTextResponse:
+    cache = [f"# TYPE stockapp_response_cache_{name} {'gauge' if name == 'entries' else 'counter'}\n"
+             f"stockapp_response_cache_{name} {value}" for name, value in get_cache().stats().items()]
+    return PlainTextResponse(metrics.render(cache), media_type="text/plain; version=0.0.4")
+
+@app.get("/analyze/batch")
+async def analyze_batch(
+    tickers: List[str] = Query(..., examples=[["AAPL", "MSFT"]]),
+    days: int = Query(90, ge=30, le=3650),
+    interval: str = Query("1d", pattern="^(1d|1h|15m|5m)$"),
+    format: str = Query("records", pattern="^(records|columnar)$"),
+) -> StreamingResponse:
+    # Accept both ?tickers=AAPL&tickers=MSFT and ?tickers=AAPL,MSFT
+    symbols = [t.strip() for value in tickers for t in value.split(',') if t.strip()]
+
+    async def lines():
+        # One JSON document per line, in completion order, so clients can render as results arrive
+        async for result in analyze_many(symbols, days, interval):
+            yield render(result, format)[0] + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/news/batch")
+async def news_batch(tickers: List[str] = Query(..., examples=[["AAPL", "MSFT"]])) -> Dict[str, Any]:
+    symbols = [t.strip() for value in tickers for t in value.split(',') if t.strip()]
+    try:
+        return await fetch_news_many(symbols)
+    except Exception as e:
+        logger.error(f"Error in news_batch: {str(e)}")
+        return {"error": str(e)}
+
+@app.get("/news/stats")
+async def news_stats() -> Dict[str, int]:
+    return get_news_service().stats()
+
+@app.get("/latest")
+async def latest(ticker: str = Query(..., examples=["AAPL"])) -> Dict[str, Any]:
+    try:
+        return await get_latest_price(ticker)
+    except Exception as e:
+        logger.error(f"Error in latest: {str(e)}")
+        return {"error": str(e)}
+
+# Images are much larger than JSON results, so they get their own, smaller LRU
+chart_cache = ResponseCache(capacity=CHART_CACHE_CAPACITY, stale=0, backend=backend_from_env())
+
+@app.get("/chart")
+async def chart(
+    request: Request,
+    ticker: str = Query(..., examples=["AAPL"]),
+    days: int = Query(365, ge=1, le=3650),
+    interval: str = Query("1d", pattern="^(1d|1h|15m|5m)$"),
+    width: int = Query(1200, ge=300, le=4000),
+    height: int = Query(1000, ge=300, le=4000),
+    format: str = Query("png", pattern="^(png|svg)$"),
+) -> Response:
+    # Price/MA, Bollinger, RSI and volume panels; series are downsampled to the image width
+    bars = await fetch_chart_bars(ticker, days, interval)
+    if bars.empty:
+        return Response(content=dumps({"error": "❌ Failed to fetch stock data"}), status_code=404,
+                        media_type=JSON_MEDIA_TYPE)
+
+    async def draw():
+        return await draw_chart(bars, ticker, days, width, height, format), CHART_MEDIA_TYPES[format], True
+
+    key = f"chart:{ticker.upper()}:{interval}:{days}:{width}x{height}:{format}:{chart_key(bars)}"
+    try:
+        with metrics.span('response', cache='') as stage:
+            cached, status = await chart_cache.get(key, draw, lambda: CHART_CACHE_TTL)
+            stage['cache'] = status
+    except Exception as e:
+        logger.error(f"Error in chart: {str(e)}")
+        return Response(content=dumps({"error": str(e)}), status_code=500, media_type=JSON_MEDIA_TYPE)
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": formatdate(cached.last_modified, usegmt=True),
+        # A newer bar can arrive once the store's copy is due for a refresh
+        "Cache-Control": f"max-age={int(DEFAULT_MAX_AGE[interval])}",
+        "X-Cache": status.upper(),
+    }
+    if _not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+@app.get("/stream")
+async def stream(request: Request, ticker: str = Query(..., examples=["AAPL"])) -> StreamingResponse:
+    # Server-sent events: one 'quote' event per changed snapshot, comment lines as keep-alives
+    async def events():
+        async for snapshot in get_hub().stream(ticker):
+            if await request.is_disconnected():
+                break
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+            else:
+                # payloads.dumps writes missing indicators (NaN) as null, which the browser can parse
+                yield f"event: quote\ndata: {dumps(snapshot).decode()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def quotes_ws(websocket: WebSocket, ticker: str = Query(..., examples=["AAPL"])) -> None:
+    await websocket.accept()
+    try:
+        async for snapshot in get_hub().stream(ticker):
+            if snapshot is None:
+                await websocket.send_json({"type": "heartbeat"})
+            else:
+                await websocket.send_text(dumps({"type": "quote", **snapshot}).decode())
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/scan")
+async def scan(
+    min_score: Optional[float] = Query(None, examples=[2]),
+    max_rsi: Optional[float] = Query(None, examples=[30]),
+    min_rsi: Optional[float] = Query(None),
+    volume_spike: Optional[bool] = Query(None),
+    sort: IndexColumn = Query("Score"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=1000),
+) -> Dict[str, Any]:
+    # Answers come from the in-memory signal index; the first call starts its background refresh
+    scanner = get_scanner()
+    scanner.start()
+    started = time.perf_counter()
+    results = scanner.index.query(min_score=min_score, max_rsi=max_rsi, min_rsi=min_rsi, volume_spike=volume_spike,
+                                  sort_by=sort, descending=order == "desc", limit=limit)
+    return {
+        **scanner.status(),
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+        "results": results,
+    }
+
+@app.get("/backtest/sweep")
+async def backtest_sweep(
+    request: Request,
+    ticker: str = Query(..., examples=["AAPL"]),
+    days: int = Query(365, ge=30, le=3650),
+    holding_days: List[Annotated[int, Field(ge=1)]] = Query([5, 10, 20]),
+    min_score: List[float] = Query([2, 3, 4.5]),
+    stop_loss: List[float] = Query([3, 5, 8]),
+    take_profit: List[float] = Query([5, 10, 15]),
+) -> Response:
+    async def sweep() -> Dict[str, Any]:
+        try:
+            return await sweep_stock(ticker, days, holding_days, min_score, stop_loss, take_profit)
+        except Exception as e:
+            logger.error(f"Error in backtest_sweep: {str(e)}")
+            return {"error": str(e)}
+
+    key = f"sweep:{ticker.upper()}:{days}:{holding_days}:{min_score}:{stop_loss}:{take_profit}"
+    return await cached_json(request, key, ticker, sweep)
+
+@app.get("/backtest/portfolio")
+async def backtest_portfolio(
+    request: Request,
+    tickers: List[str] = Query(..., examples=[["AAPL", "MSFT"]]),
+    days: int = Query(365, ge=30, le=3650),
+    initial_capital: float = Query(100_000, gt=0),
+    max_positions: int = Query(20, ge=1, le=500),
+    max_weight: float = Query(0.1, gt=0, le=1),
+    risk_per_trade: float = Query(0.01, gt=0, le=1),
+    atr_multiple: float = Query(2, gt=0),
+    holding_days: int = Query(10, ge=1, le=250),
+    min_score: float = Query(4.5),
+    stop_loss: float = Query(5, gt=0),
+    take_profit: float = Query(10, gt=0),
+    cost_bps: float = Query(0, ge=0),
+) -> Response:
+    symbols = sorted({t.strip().upper() for value in tickers for t in value.split(',') if t.strip()})
+    params = dict(initial_capital=initial_capital, max_positions=max_positions, max_weight=max_weight,
+                  risk_per_trade=risk_per_trade, atr_multiple=atr_multiple, holding_days=holding_days,
+                  min_score=min_score, stop_loss_pct=stop_loss, take_profit_pct=take_profit, cost_bps=cost_bps)
+
+    async def simulate() -> Dict[str, Any]:
+        try:
+            return await portfolio_stocks(symbols, days, **params)
+        except Exception as e:
+            logger.error(f"Error in backtest_portfolio: {str(e)}")
+            return {"error": str(e)}
+
+    key = f"portfolio:{','.join(symbols)}:{days}:{sorted(params.items())}"
+    return await cached_json(request, key, symbols[0] if symbols else "", simulate)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
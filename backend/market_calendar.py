@@ -0,0 +1,68 @@
+import os
+import pytz
+from datetime import datetime, time, timedelta
+from typing import NamedTuple, Optional
+
+# Define timezone at the top level
+ist = pytz.timezone('Asia/Kolkata')
+
+class Exchange(NamedTuple):
+    name: str
+    tz: object
+    open: time
+    close: time
+
+# Sessions include the pre/post-market hours the intraday bars are fetched with
+NSE = Exchange('NSE', ist, time(9, 0), time(15, 30))
+US = Exchange('US', pytz.timezone('America/New_York'), time(4, 0), time(20, 0))
+
+# Extra closed dates (YYYY-MM-DD, comma separated), e.g. exchange holidays
+HOLIDAYS = {d.strip() for d in os.environ.get('STOCKAPP_HOLIDAYS', '').split(',') if d.strip()}
+
+def exchange_for(ticker: str) -> Exchange:
+    return NSE if ticker.upper().endswith(('.NS', '.BO')) else US
+
+def _trading_day(exchange: Exchange, day) -> bool:
+    return day.weekday() < 5 and day.isoformat() not in HOLIDAYS
+
+def _at(exchange: Exchange, day, moment: time) -> datetime:
+    return exchange.tz.localize(datetime.combine(day, moment))
+
+def is_open(exchange: Exchange, now: Optional[datetime] = None) -> bool:
+    local = (now or datetime.now(ist)).astimezone(exchange.tz)
+    return _trading_day(exchange, local.date()) and exchange.open <= local.time() < exchange.close
+
+def next_open(exchange: Exchange, now: Optional[datetime] = None) -> datetime:
+    """Start of the next session strictly after now, in IST."""
+    now = now or datetime.now(ist)
+    day = now.astimezone(exchange.tz).date()
+    for _ in range(15):
+        start = _at(exchange, day, exchange.open)
+        if start > now and _trading_day(exchange, day):
+            return start.astimezone(ist)
+        day += timedelta(days=1)
+    return (now + timedelta(days=1)).astimezone(ist)
+
+def next_close(exchange: Exchange, now: Optional[datetime] = None) -> datetime:
+    """End of the session in progress, or of the next one, in IST."""
+    now = now or datetime.now(ist)
+    local = now.astimezone(exchange.tz)
+    if is_open(exchange, now):
+        return _at(exchange, local.date(), exchange.close).astimezone(ist)
+    start = next_open(exchange, now).astimezone(exchange.tz)
+    return _at(exchange, start.date(), exchange.close).astimezone(ist)
+
+def session_ttl(ticker: str, open_ttl: float, now: Optional[datetime] = None,
+                closed_ttl: Optional[float] = None) -> float:
+    """Seconds a result for ticker stays valid: open_ttl while trading (never past the close),
+    otherwise until the next session opens, since no new bars can arrive before then.
+
+    closed_ttl caps the off-hours TTL for results that embed data which keeps
+    changing while the market is closed, such as news sentiment.
+    """
+    now = now or datetime.now(ist)
+    exchange = exchange_for(ticker)
+    if is_open(exchange, now):
+        return max(1.0, min(open_ttl, (next_close(exchange, now) - now).total_seconds()))
+    until_open = (next_open(exchange, now) - now).total_seconds()
+    return max(1.0, until_open if closed_ttl is None else min(closed_ttl, until_open))
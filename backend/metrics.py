@@ -0,0 +1,197 @@
+import cProfile
+import contextvars
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PROFILE_ROWS = 30
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra: str) -> str:
+    pairs = [f'{k}="{v}"' for k, v in list(zip(names, values)) + list(extra.items())]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts, then +Inf, sum
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in sorted(self._series.items())]
+        for label_values, series in items:
+            running = 0
+            for bound, count in zip(list(self.buckets) + ['+Inf'], series[:-1]):
+                running += count
+                lines.append(f'{self.name}_bucket{_labels(self.labels, label_values, le=str(bound))} {int(running)}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, label_values)} {series[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labels, label_values)} {int(running)}')
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_labels(self.labels, label_values)} {value}')
+        return lines
+
+STAGE_SECONDS = Histogram('stockapp_stage_seconds', 'Duration of analysis pipeline stages', ('stage', 'cache'))
+STAGE_ROWS = Counter('stockapp_stage_rows_total', 'Rows processed by analysis pipeline stages', ('stage',))
+REQUEST_SECONDS = Histogram('stockapp_request_seconds', 'HTTP request duration', ('method', 'route', 'status'))
+
+class Trace:
+    """Spans (and, when profiling, cProfile rows) collected for one request."""
+
+    def __init__(self, profile: bool = False):
+        self.profile = profile
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.functions: Dict[Tuple[str, int, str], List[float]] = {}
+
+    def add_functions(self, rows: Dict[Tuple[str, int, str], Tuple[int, float, float]]) -> None:
+        for key, (calls, own, cumulative) in rows.items():
+            total = self.functions.setdefault(key, [0, 0.0, 0.0])
+            total[0] += calls
+            total[1] += own
+            total[2] += cumulative
+
+    def report(self, limit: int = PROFILE_ROWS) -> Dict[str, Any]:
+        top = sorted(self.functions.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'stages': [{**{k: v for k, v in s.items() if k != 'seconds'}, 'ms': round(s['seconds'] * 1000, 3)}
+                       for s in self.spans],
+            'functions': [{
+                'function': f"{name} ({file}:{line})",
+                'calls': calls,
+                'own_ms': round(own * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3),
+            } for (file, line, name), (calls, own, cumulative) in top],
+        }
+
+# The active request trace, if any, and (inside pool workers) where spans are buffered for the caller
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('stockapp_trace', default=None)
+_buffer: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar('stockapp_spans', default=None)
+
+def _observe(record: Dict[str, Any]) -> None:
+    STAGE_SECONDS.observe(record['seconds'], record['stage'], str(record.get('cache', '')))
+    if record.get('rows'):
+        STAGE_ROWS.inc(record['rows'], record['stage'])
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append(record)
+
+@contextmanager
+def span(stage: str, **attrs) -> Iterator[Dict[str, Any]]:
+    """Time a pipeline stage. The yielded dict takes extra fields such as rows or cache ('hit'/'miss')."""
+    record = {'stage': stage, **attrs}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        buffer = _buffer.get()
+        if buffer is not None:
+            buffer.append(record)
+        else:
+            _observe(record)
+
+def profiling() -> bool:
+    trace = _trace.get()
+    return trace is not None and trace.profile
+
+@contextmanager
+def trace(profile: bool = False) -> Iterator[Trace]:
+    """Collect the spans of everything awaited inside the block, optionally with cProfile rows."""
+    current = Trace(profile)
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        _trace.reset(token)
+
+def call_traced(fn: Callable, args: tuple, kwargs: dict, profile: bool = False) -> Tuple[Any, list, dict]:
+    """Run fn in a pool worker, returning its result with the spans it recorded
+    (and cProfile rows when profile is set), so the caller's process can keep them."""
+    spans: List[Dict[str, Any]] = []
+    token = _buffer.set(spans)
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler is None:
+            return fn(*args, **kwargs), spans, {}
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+        rows = {key: (calls, own, cumulative)
+                for key, (_, calls, own, cumulative, _) in pstats.Stats(profiler).stats.items()}
+        return result, spans, rows
+    finally:
+        _buffer.reset(token)
+
+def absorb(spans: List[Dict[str, Any]], rows: Dict) -> None:
+    """Record spans and profile rows returned by call_traced in the calling context."""
+    for record in spans:
+        _observe(record)
+    trace = _trace.get()
+    if rows and trace is not None:
+        trace.add_functions(rows)
+
+def render(extra: Optional[List[str]] = None) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = STAGE_SECONDS.render() + STAGE_ROWS.render() + REQUEST_SECONDS.render() + (extra or [])
+    return '\n'.join(lines) + '\n'
+
+class RequestMetrics:
+    """ASGI middleware recording time to response start per route into REQUEST_SECONDS.
+
+    Timing stops at the response headers, so long-lived streams (SSE) count
+    their setup rather than their lifetime.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                route = scope.get('route')
+                REQUEST_SECONDS.observe(time.perf_counter() - start, scope['method'],
+                                        getattr(route, 'path', 'unmatched'), str(message['status']))
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
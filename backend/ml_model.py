@@ -1,11 +1,178 @@
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
-from sklearn.dummy import DummyRegressor
+from joblib import Parallel, delayed
+import math
+import os
+import numpy as np
 import pandas as pd
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-def train_ml_model(df: pd.DataFrame):
+# scikit-learn takes over a second to import, so it is imported where models are
+# built; servers call preload() once they are accepting requests
+
+# Feature columns the models are trained on, in order
+MODEL_FEATURES = ['MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'ATR', 'Score']
+
+# Bars between a feature row and the close it predicts
+HORIZON = 10
+
+# Walk-forward settings: folds, the smallest training window, the smallest test
+# fold (as a share of the rows, like the 80/20 holdout it replaced), parallel
+# jobs, and when a candidate counts as clearly losing. Training already runs
+# in a CPU pool worker per request, so one job avoids oversubscribing cores;
+# -1 uses every core when training runs on its own.
+WF_SPLITS = int(os.environ.get('STOCKAPP_TRAIN_SPLITS', 2))
+MIN_TRAIN = 60
+MIN_TEST_FRACTION = 0.2
+TRAIN_JOBS = int(os.environ.get('STOCKAPP_TRAIN_JOBS', 1))
+PRUNE_AFTER = 1
+PRUNE_RATIO = 1.5
+
+# Tree ensembles grow in these steps with warm_start and stop once a step
+# improves the fold's best MSE by less than GROWTH_TOL
+GROWTH_STEPS = (25, 50, 100)
+GROWTH_TOL = 0.01
+
+def walk_forward_splits(n: int, n_splits: int = WF_SPLITS, gap: int = HORIZON, min_train: int = MIN_TRAIN,
+                        min_test: float = MIN_TEST_FRACTION) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window (train, test) index pairs, newest first.
+
+    The test blocks tile the later part of the data and each holds at least
+    `min_test` of the rows; the earliest training window keeps at least half
+    the rows and never fewer than min_train, so there are fewer folds than
+    n_splits when the data is short. Each test block starts `gap` rows after
+    its training window, so no training target overlaps it.
+
+    When not even one such fold fits (e.g. the ~80 rows of a default
+    /analyze window), this falls back to a single holdout split: the last
+    `min_test` of the rows, trained on everything up to `gap` rows before
+    them, which may be fewer than min_train rows.
+    """
+    available = n - max(min_train, n // 2) - gap
+    smallest = max(1, math.ceil(min_test * n))
+    if available < smallest:
+        return [holdout_split(n, gap, smallest)]
+    n_splits = min(n_splits, available // smallest)
+    test_size = max(smallest, available // n_splits)
+    folds = []
+    for k in range(n_splits):
+        test_start = n - (k + 1) * test_size
+        folds.append((np.arange(test_start - gap), np.arange(test_start, test_start + test_size)))
+    return folds
+
+def holdout_split(n: int, gap: int, test_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The single (train, test) split used when the data is too short to walk forward."""
+    test_start = n - test_size
+    return np.arange(max(0, test_start - gap)), np.arange(test_start, n)
+
+def preload() -> None:
+    """Import scikit-learn now rather than during the first training."""
+    import sklearn.dummy
+    import sklearn.metrics
+    _candidates()
+
+def _candidates() -> Dict[str, object]:
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.linear_model import LinearRegression
+    return {
+        "LinearRegression": LinearRegression(),
+        "RandomForest": RandomForestRegressor(n_estimators=GROWTH_STEPS[0], warm_start=True, random_state=42),
+        "GradientBoosting": GradientBoostingRegressor(n_estimators=GROWTH_STEPS[0], warm_start=True, random_state=42),
+    }
+
+class FoldFit(NamedTuple):
+    model: object
+    curve: List[float]
+    steps: int
+    finished: bool
+
+def _fit_fold(name: str, X: pd.DataFrame, y: pd.Series, train: np.ndarray, test: np.ndarray,
+              fit: Optional[FoldFit] = None, max_steps: int = len(GROWTH_STEPS)) -> FoldFit:
+    """Fit a candidate on one fold, or extend an earlier fit, by up to max_steps growth steps.
+
+    The curve holds the test MSE at each model size so far: one entry per
+    step for forests, one per stage (via staged_predict) for boosting, and
+    a single entry for LinearRegression. Growth finishes at the last step
+    or once a step stops improving the best MSE.
+    """
+    from sklearn.metrics import mean_squared_error
+    X_train, y_train, X_test, y_test = X.iloc[train], y.iloc[train], X.iloc[test], y.iloc[test]
+    fit = fit or FoldFit(_candidates()[name], [], 0, False)
+    if fit.finished:
+        return fit
+    model, curve, steps = fit.model, list(fit.curve), fit.steps
+    if name == "LinearRegression":
+        model.fit(X_train, y_train)
+        return FoldFit(model, [mean_squared_error(y_test, model.predict(X_test))], 1, True)
+    for trees in GROWTH_STEPS[steps:steps + max_steps]:
+        best = min(curve, default=float("inf"))
+        # warm_start: the step adds trees to the fitted ensemble instead of refitting it
+        model.set_params(n_estimators=trees).fit(X_train, y_train)
+        if name == "GradientBoosting":
+            staged = model.staged_predict(X_test)
+            curve.extend(mean_squared_error(y_test, preds) for i, preds in enumerate(staged) if i >= len(curve))
+        else:
+            curve.append(mean_squared_error(y_test, model.predict(X_test)))
+        steps += 1
+        if best - min(curve) < GROWTH_TOL * min(curve):
+            return FoldFit(model, curve, steps, True)
+    return FoldFit(model, curve, steps, steps == len(GROWTH_STEPS))
+
+def _final_model(name: str, size: int, n_jobs: int):
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.linear_model import LinearRegression
+    if name == "RandomForest":
+        return RandomForestRegressor(n_estimators=GROWTH_STEPS[size], random_state=42, n_jobs=n_jobs)
+    if name == "GradientBoosting":
+        return GradientBoostingRegressor(n_estimators=size + 1, random_state=42)
+    return LinearRegression()
+
+def walk_forward_select(X: pd.DataFrame, y: pd.Series, n_jobs: int = TRAIN_JOBS) -> Tuple[Optional[str], int, float]:
+    """(candidate name, size index, mean walk-forward MSE) of the best candidate.
+
+    Every candidate is first fitted at its smallest size on the PRUNE_AFTER
+    newest folds (always leaving at least one fold for later), in parallel. Candidates whose MSE is over PRUNE_RATIO
+    times the leader's are dropped; the rest are grown from those fits and
+    run on the older folds. A candidate's size is the one with the lowest
+    MSE averaged over its folds.
+    """
+    folds = walk_forward_splits(len(X))
+    if len(folds[0][0]) < MIN_TRAIN:
+        print(f"⚠ Only {len(X)} rows: selecting on one holdout split with {len(folds[0][0])} training rows")
+    fits: Dict[Tuple[str, int], FoldFit] = {}
+    # Threads: the fits release the GIL, and this already runs inside a CPU pool worker
+    parallel = Parallel(n_jobs=n_jobs, prefer='threads')
+
+    def run(jobs: List[Tuple[str, int]], max_steps: int) -> None:
+        results = parallel(delayed(_fit_fold)(name, X, y, *folds[k], fits.get((name, k)), max_steps) for name, k in jobs)
+        fits.update(zip(jobs, results))
+
+    def score(name: str) -> Tuple[int, float]:
+        curves = [fit.curve for (candidate, _), fit in fits.items() if candidate == name]
+        # Sizes a fold never grew to inherit its last score
+        length = max(len(curve) for curve in curves)
+        mean_curve = np.mean([curve + [curve[-1]] * (length - len(curve)) for curve in curves], axis=0)
+        size = int(np.argmin(mean_curve))
+        return size, float(mean_curve[size])
+
+    names = list(_candidates())
+    screened = range(max(1, min(PRUNE_AFTER, len(folds) - 1)))
+    run([(name, k) for name in names for k in screened], max_steps=1)
+    leader = min(score(name)[1] for name in names)
+    survivors = [name for name in names if score(name)[1] <= PRUNE_RATIO * leader]
+    for name in names:
+        if name not in survivors:
+            print(f"{name} dropped after {len(screened)} folds (MSE {score(name)[1]:.2f})")
+    run([(name, k) for name in survivors for k in range(len(folds))], max_steps=len(GROWTH_STEPS))
+
+    best_name, best_size, best_mse = None, 0, float("inf")
+    for name in survivors:
+        size, mse = score(name)
+        print(f"{name} walk-forward MSE: {mse:.2f}")
+        if mse < best_mse:
+            best_name, best_size, best_mse = name, size, mse
+    return best_name, best_size, best_mse
+
+def train_ml_model(df: pd.DataFrame, n_jobs: int = TRAIN_JOBS):
+    from sklearn.dummy import DummyRegressor
     df = df.dropna().copy()
 
     if len(df) < 60:
@@ -13,14 +180,14 @@ def train_ml_model(df: pd.DataFrame):
         dummy = DummyRegressor(strategy="mean").fit(df[['MA20']], df['Close'])  # Train dummy for compatibility
         return dummy, 0.0
 
-    required_features = ['MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'ATR', 'Score']
+    required_features = MODEL_FEATURES
     if not all(col in df.columns for col in required_features):
         print("❌ Missing required features in data")
         dummy = DummyRegressor(strategy="mean").fit(df[['MA20']], df['Close'])  # Fallback
         return dummy, 0.0
 
     # Target: Price after 10 days
-    df['Future_Close'] = df['Close'].shift(-10)
+    df['Future_Close'] = df['Close'].shift(-HORIZON)
     df = df.dropna(subset=['Future_Close'])
 
     if len(df) < 60:
@@ -36,29 +203,19 @@ def train_ml_model(df: pd.DataFrame):
     X = df[features]
     y = df['Future_Close']
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    best_name, best_size, best_mse = walk_forward_select(X, y, n_jobs)
 
-    models = {
-        "LinearRegression": LinearRegression(),
-        "RandomForest": RandomForestRegressor(n_estimators=100, random_state=42),
-        "GradientBoosting": GradientBoostingRegressor(n_estimators=100, random_state=42)
-    }
-
-    best_model = None
-    best_mse = float("inf")
-
-    for name, model in models.items():
-        model.fit(X_train, y_train)
-        preds = model.predict(X_test)
-        mse = mean_squared_error(y_test, preds)
-        print(f"{name} MSE: {mse:.2f}")
-        if mse < best_mse:
-            best_mse = mse
-            best_model = model
-
-    if best_model is None:
+    if best_name is None:
         print("⚠ No model outperformed fallback. Using DummyRegressor.")
-        best_model = DummyRegressor(strategy="mean").fit(X_train, y_train)
-        best_mse = mean_squared_error(y_test, best_model.predict(X_test))
+        return DummyRegressor(strategy="mean").fit(X, y), float(np.var(y))
+
+    # Refit the winner, at its selected size, on every row
+    return _final_model(best_name, best_size, n_jobs).fit(X, y), best_mse
 
-    return best_model, best_mse
+def predict_latest(model, latest: pd.Series) -> Optional[float]:
+    """Predict from one indicator row using the columns the model was fitted on."""
+    features: List[str] = list(getattr(model, 'feature_names_in_', MODEL_FEATURES))
+    if not all(col in latest.index for col in features):
+        return None
+    row = pd.DataFrame([latest[features].to_numpy(dtype='float64')], columns=features)
+    return float(np.asarray(model.predict(row))[0])
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import joblib
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'models')
+
+def data_fingerprint(df: pd.DataFrame, features: Sequence[str]) -> str:
+    """Short hash of the training inputs; changes whenever a bar is added or revised."""
+    columns = [col for col in list(features) + ['Close'] if col in df.columns]
+    digest = hashlib.sha1()
+    digest.update(df.index.asi8.tobytes() if isinstance(df.index, pd.DatetimeIndex) else str(len(df)).encode())
+    digest.update(df[columns].to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()[:16]
+
+def feature_key(features: Sequence[str]) -> str:
+    return hashlib.sha1(','.join(features).encode()).hexdigest()[:8]
+
+class ModelRegistry:
+    """Trained models keyed by (ticker, feature set, data fingerprint).
+
+    Entries live in an in-memory LRU backed by joblib files on disk, and the
+    newest entry per (ticker, feature set) is tracked so a slightly stale
+    model can keep serving while a replacement trains.
+    """
+
+    def __init__(self, root: Optional[str] = None, capacity: int = 64, max_age: Optional[float] = None,
+                 keep_on_disk: int = 3):
+        self.root = root or os.environ.get('STOCKAPP_MODEL_DIR', DEFAULT_MODEL_DIR)
+        self.capacity = capacity
+        self.keep_on_disk = keep_on_disk
+        self.max_age = max_age if max_age is not None else float(os.environ.get('STOCKAPP_MODEL_MAX_AGE', 6 * 3600))
+        self._entries: 'OrderedDict[Tuple[str, str, str], Dict]' = OrderedDict()
+        self._latest: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str, features: Sequence[str]) -> str:
+        return os.path.join(self.root, ticker.upper().replace('/', '_'), feature_key(features))
+
+    def _remember(self, key: Tuple[str, str, str], entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def get(self, ticker: str, features: Sequence[str], fingerprint: str) -> Optional[Dict]:
+        key = (ticker.upper(), feature_key(features), fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        path = os.path.join(self._dir(ticker, features), f"{fingerprint}.joblib")
+        if not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            print(f"⚠ Could not load cached model {path}: {e}")
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def latest(self, ticker: str, features: Sequence[str]) -> Optional[Dict]:
+        fingerprint = self._latest.get((ticker.upper(), feature_key(features)))
+        if fingerprint is None:
+            try:
+                with open(os.path.join(self._dir(ticker, features), 'latest.json')) as f:
+                    fingerprint = json.load(f)['fingerprint']
+            except (FileNotFoundError, KeyError, json.JSONDecodeError):
+                return None
+        return self.get(ticker, features, fingerprint)
+
+    def put(self, ticker: str, features: Sequence[str], fingerprint: str, model, mse: float) -> Dict:
+        entry = {
+            'model': model,
+            'mse': float(mse),
+            'features': list(features),
+            'fingerprint': fingerprint,
+            'trained_at': time.time(),
+        }
+        self._remember((ticker.upper(), feature_key(features), fingerprint), entry)
+        self._latest[(ticker.upper(), feature_key(features))] = fingerprint
+
+        path = self._dir(ticker, features)
+        try:
+            os.makedirs(path, exist_ok=True)
+            tmp = os.path.join(path, f".{fingerprint}.{os.getpid()}.tmp")
+            joblib.dump(entry, tmp)
+            os.replace(tmp, os.path.join(path, f"{fingerprint}.joblib"))
+            with open(tmp, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'trained_at': entry['trained_at']}, f)
+            os.replace(tmp, os.path.join(path, 'latest.json'))
+            saved = sorted((f for f in os.listdir(path) if f.endswith('.joblib')),
+                           key=lambda f: os.path.getmtime(os.path.join(path, f)), reverse=True)
+            for old in saved[self.keep_on_disk:]:
+                os.remove(os.path.join(path, old))
+        except OSError as e:
+            print(f"⚠ Could not persist model for {ticker}: {e}")
+        return entry
+
+    def expired(self, entry: Dict) -> bool:
+        return time.time() - entry['trained_at'] > self.max_age
+
+_registry: Optional[ModelRegistry] = None
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
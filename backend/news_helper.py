@@ -1,28 +1,238 @@
-from yahoo_fin import news
-from typing import List, Dict
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Iterable, Optional, Tuple
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from response_cache import SQLiteKV
 
-# Initialize VADER sentiment analyzer
-analyzer = SentimentIntensityAnalyzer()
+# %s is the ticker; point it at a local server to run offline
+FEED_URL = os.environ.get('STOCKAPP_NEWS_FEED_URL', 'https://feeds.finance.yahoo.com/rss/2.0/headline?s=%s&region=US&lang=en-US')
+DEFAULT_NEWS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'news.db')
+
+# Seconds a ticker's headlines stay cached, and a failed fetch before it is retried
+NEWS_TTL = float(os.environ.get('STOCKAPP_NEWS_TTL', 900))
+NEWS_ERROR_TTL = 60
+NEWS_FETCH_TIMEOUT = float(os.environ.get('STOCKAPP_NEWS_FETCH_TIMEOUT', 5))
+NEWS_WORKERS = int(os.environ.get('STOCKAPP_NEWS_WORKERS', 8))
+# Scores are a pure function of the title, so they are kept much longer than the feeds
+SENTIMENT_TTL = 30 * 86400
+HEADLINES_PER_TICKER = 5
+
+NO_NEWS = [{"title": "No news available", "sentiment": 0.0}]
+NEWS_UNAVAILABLE = [{"title": "News not available", "sentiment": 0.0}]
+
+def headline_key(title: str) -> str:
+    """Hash of the normalized title; the same story syndicated under several tickers shares it."""
+    normalized = re.sub(r'\s+', ' ', title).strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:20]
+
+_analyzer: Optional[SentimentIntensityAnalyzer] = None
+
+def get_analyzer() -> SentimentIntensityAnalyzer:
+    # VADER reads its lexicon when built, so that waits for the first headline (or preload)
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def fetch_feed(ticker: str, timeout: float = NEWS_FETCH_TIMEOUT) -> List[Dict]:
+    # feedparser and requests are only needed once a feed is actually fetched
+    import feedparser
+    import requests
+    response = requests.get(FEED_URL % ticker, timeout=timeout, headers={'User-Agent': 'Mozilla/5.0'})
+    response.raise_for_status()
+    return feedparser.parse(response.content).entries
+
+class SentimentMemo:
+    """VADER compound scores memoized per headline hash in a persistent store."""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.environ.get('STOCKAPP_NEWS_DB', DEFAULT_NEWS_DB)
+        try:
+            self.store: Optional[SQLiteKV] = SQLiteKV(path)
+        except Exception as e:
+            print(f"⚠ Sentiment memo unavailable at {path}, scoring every headline: {e}")
+            self.store = None
+        self.scored = 0
+
+    def scores(self, titles: Dict[str, str]) -> Dict[str, float]:
+        """Compound score per key of titles ({headline_key: title})."""
+        result: Dict[str, float] = {}
+        for key, title in titles.items():
+            raw = self._get(key)
+            if raw is None:
+                result[key] = get_analyzer().polarity_scores(title)['compound']
+                self.scored += 1
+                self._set(key, result[key])
+            else:
+                result[key] = float(raw)
+        return result
+
+    def _get(self, key: str) -> Optional[bytes]:
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            print(f"⚠ Sentiment memo read failed: {e}")
+            return None
+
+    def _set(self, key: str, score: float) -> None:
+        if self.store is not None:
+            try:
+                self.store.setex(key, SENTIMENT_TTL, repr(score).encode())
+            except Exception as e:
+                print(f"⚠ Sentiment memo write failed: {e}")
+
+class NewsService:
+    """Headlines with sentiment for many tickers at once.
+
+    Feeds that are not cached are fetched concurrently, each only once even
+    when several callers ask at the same time. Headlines shared between
+    tickers are scored once, and scores come from the persistent memo
+    whenever the headline has been seen before.
+    """
+
+    def __init__(self, ttl: float = NEWS_TTL, memo: Optional[SentimentMemo] = None,
+                 fetch=fetch_feed, workers: int = NEWS_WORKERS):
+        self.ttl = ttl
+        self.memo = memo or SentimentMemo()
+        self.fetch = fetch
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stockapp-news')
+        self._entries: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'fetches': 0, 'fetch_errors': 0, 'headlines': 0, 'unique_headlines': 0}
+
+    def _cached(self, ticker: str) -> Optional[List[Dict]]:
+        entry = self._entries.get(ticker)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        return None
+
+    def _fetch(self, ticker: str) -> Optional[List[Dict]]:
+        try:
+            entries = self.fetch(ticker)
+        except Exception as e:
+            print(f"⚠ Error fetching news for {ticker}: {str(e)}")
+            with self._lock:
+                self.counters['fetch_errors'] += 1
+            return None
+        with self._lock:
+            self.counters['fetches'] += 1
+        seen, unique = set(), []
+        for entry in entries:
+            title = entry.get('title', 'No title available')
+            key = headline_key(title)
+            if key not in seen:
+                seen.add(key)
+                unique.append((key, entry))
+            if len(unique) == HEADLINES_PER_TICKER:
+                break
+        return unique
+
+    def _refresh(self, owned: Dict[str, Future]) -> Dict[str, List[Dict]]:
+        feeds = dict(zip(owned, self.pool.map(self._fetch, owned)))
+        # Score each distinct headline once across every feed in this batch
+        titles = {key: entry.get('title', 'No title available')
+                  for unique in feeds.values() if unique for key, entry in unique}
+        scores = self.memo.scores(titles)
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            self.counters['headlines'] += sum(len(unique) for unique in feeds.values() if unique)
+            self.counters['unique_headlines'] += len(titles)
+            for ticker, unique in feeds.items():
+                if unique is None:
+                    headlines, expires = NEWS_UNAVAILABLE, now + NEWS_ERROR_TTL
+                elif not unique:
+                    headlines, expires = NO_NEWS, now + self.ttl
+                else:
+                    headlines = [{
+                        'title': titles[key],
+                        'date': entry.get('published', 'No date available'),
+                        'link': entry.get('link', ''),
+                        'sentiment': scores[key]  # Add sentiment score (-1 to 1)
+                    } for key, entry in unique]
+                    expires = now + self.ttl
+                self._entries[ticker] = (expires, headlines)
+                result[ticker] = headlines
+                self._in_flight.pop(ticker)
+                owned[ticker].set_result(headlines)
+        return result
+
+    def headlines_many(self, tickers: Iterable[str]) -> Dict[str, List[Dict]]:
+        tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+        result: Dict[str, List[Dict]] = {}
+        owned: Dict[str, Future] = {}
+        waiting: Dict[str, Future] = {}
+        with self._lock:
+            for ticker in tickers:
+                cached = self._cached(ticker)
+                if cached is not None:
+                    self.counters['hits'] += 1
+                    result[ticker] = cached
+                elif ticker in self._in_flight:
+                    waiting[ticker] = self._in_flight[ticker]
+                else:
+                    owned[ticker] = self._in_flight[ticker] = Future()
+
+        if owned:
+            try:
+                result.update(self._refresh(owned))
+            except BaseException as e:
+                # Never leave concurrent callers waiting on a fetch that died
+                with self._lock:
+                    for ticker, future in owned.items():
+                        if self._in_flight.get(ticker) is future:
+                            del self._in_flight[ticker]
+                        if not future.done():
+                            future.set_exception(e)
+                raise
+
+        for ticker, future in waiting.items():
+            result[ticker] = future.result()
+        return {ticker: result[ticker] for ticker in tickers}
+
+    def lookup(self, ticker: str) -> Tuple[List[Dict], bool]:
+        """(headlines, whether they came from the cache)."""
+        with self._lock:
+            cached = self._cached(ticker.upper())
+            if cached is not None:
+                self.counters['hits'] += 1
+        if cached is not None:
+            return cached, True
+        return self.headlines_many([ticker])[ticker.upper()], False
+
+    def sentiment_many(self, tickers: Iterable[str]) -> Dict[str, Dict]:
+        """Average sentiment and headlines per ticker, for a whole watchlist in one call."""
+        return {ticker: {'sentiment': average_sentiment(headlines), 'headlines': headlines}
+                for ticker, headlines in self.headlines_many(tickers).items()}
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, 'entries': len(self._entries), 'scored': self.memo.scored}
+
+def news_batch_timeout(tickers: int) -> float:
+    # Feeds are fetched NEWS_WORKERS at a time, each bounded by NEWS_FETCH_TIMEOUT
+    return NEWS_FETCH_TIMEOUT * (1 + (tickers - 1) // NEWS_WORKERS) + 5
+
+def average_sentiment(headlines: List[Dict]) -> float:
+    return sum(h.get('sentiment', 0) for h in headlines) / len(headlines) if headlines else 0
+
+_service: Optional[NewsService] = None
+
+def get_news_service() -> NewsService:
+    global _service
+    if _service is None:
+        _service = NewsService()
+    return _service
+
+def set_news_service(service: NewsService) -> None:
+    global _service
+    _service = service
 
 def get_latest_headlines(ticker: str) -> List[Dict]:
-    try:
-        headlines = news.get_yf_rss(ticker)
-        if not headlines:
-            return [{"title": "No news available", "sentiment": 0.0}]
-
-        formatted_headlines = []
-        for h in headlines[:5]:
-            title = h.get('title', 'No title available')
-            # Analyze sentiment of the title
-            sentiment_score = analyzer.polarity_scores(title)['compound']
-            formatted_headlines.append({
-                'title': title,
-                'date': h.get('published', 'No date available'),
-                'link': h.get('link', ''),
-                'sentiment': sentiment_score  # Add sentiment score (-1 to 1)
-            })
-        return formatted_headlines
-    except Exception as e:
-        print(f"⚠ Error fetching news: {str(e)}")
-        return [{"title": "News not available", "sentiment": 0.0}]
\ No newline at end of file
+    return get_news_service().headlines_many([ticker])[ticker.upper()]
@@ -0,0 +1,97 @@
+import importlib.util
+import json
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # plain json fallback: slower, with NaN/inf mapped to null as orjson does
+    orjson = None
+
+FORMATS = ('records', 'columnar', 'arrow')
+JSON_MEDIA_TYPE = 'application/json'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+def arrow_available() -> bool:
+    return importlib.util.find_spec('pyarrow') is not None
+
+def negotiate(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Pick the response format: an explicit ?format= wins, then the Accept header, then records."""
+    if fmt in FORMATS:
+        return fmt
+    if accept and ARROW_MEDIA_TYPE in accept:
+        return 'arrow'
+    return 'records'
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def _finite(obj: Any) -> Any:
+    # json.dumps writes NaN and Infinity, which JSON.parse rejects; orjson writes null
+    if isinstance(obj, float):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _finite(obj.tolist())
+    if isinstance(obj, np.floating):
+        return _finite(float(obj))
+    return obj
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(obj), default=_default, allow_nan=False).encode()
+
+def records(frame: pd.DataFrame) -> list:
+    # The original row-per-dict layout; timestamps become ISO 8601 strings
+    rows = frame.to_dict(orient='records')
+    dates = [name for name in frame.columns if pd.api.types.is_datetime64_any_dtype(frame[name])]
+    if orjson is not None and dates:
+        # orjson writes datetime natively but not pd.Timestamp, so hand it plain datetimes
+        for name in dates:
+            for row, value in zip(rows, pd.DatetimeIndex(frame[name]).to_pydatetime()):
+                row[name] = value
+    return rows
+
+def columns(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """One array per column; datetime columns become epoch milliseconds (UTC)."""
+    result = {}
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            result[name] = pd.DatetimeIndex(values).as_unit('ms').asi8
+        else:
+            result[name] = values.to_numpy()
+    return result
+
+def _arrow(result: Dict[str, Any]) -> bytes:
+    import pyarrow as pa
+    # The bar table is the record batch; everything else rides along as JSON schema metadata
+    data = result['data']
+    table = pa.Table.from_pydict({name: values for name, values in columns(data).items()})
+    rest = {k: columns(v) if isinstance(v, pd.DataFrame) else v for k, v in result.items() if k != 'data'}
+    table = table.replace_schema_metadata({b'stockapp': dumps(rest)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def render(result: Dict[str, Any], fmt: str = 'records') -> Tuple[bytes, str]:
+    """Serialize an analysis result whose tabular fields are DataFrames; returns (body, media type)."""
+    if fmt == 'arrow' and isinstance(result.get('data'), pd.DataFrame):
+        return _arrow(result), ARROW_MEDIA_TYPE
+    convert = columns if fmt == 'columnar' else records
+    payload = {k: convert(v) if isinstance(v, pd.DataFrame) else v for k, v in result.items()}
+    if fmt == 'columnar' and 'error' not in result:
+        payload['format'] = 'columnar'
+    return dumps(payload), JSON_MEDIA_TYPE
@@ -0,0 +1,218 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Panel arrays larger than this many bytes are backed by temporary files instead of RAM
+MEMMAP_BYTES = int(os.environ.get('STOCKAPP_MEMMAP_BYTES', 256 * 2**20))
+
+TRADING_DAYS = 252
+
+class Panel(NamedTuple):
+    """Close, Score and ATR aligned on one (session date x ticker) grid; NaN where a ticker has no bar."""
+    dates: pd.DatetimeIndex
+    tickers: List[str]
+    close: np.ndarray
+    score: np.ndarray
+    atr: np.ndarray
+
+def allocate(shape, dtype: str = 'float64', fill: float = np.nan, workdir: Optional[str] = None) -> np.ndarray:
+    """np.full, or a memory-mapped temporary file when the array would exceed MEMMAP_BYTES."""
+    if int(np.prod(shape)) * np.dtype(dtype).itemsize <= MEMMAP_BYTES:
+        return np.full(shape, fill, dtype=dtype)
+    # The file is unlinked as soon as it closes; the mapping keeps it alive until the array is freed
+    with tempfile.TemporaryFile(dir=workdir) as f:
+        array = np.memmap(f, dtype=dtype, mode='w+', shape=shape)
+    array[:] = fill
+    return array
+
+def _session_days(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # Calendar date in the exchange's own timezone, so NSE and US bars share one daily grid
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+def build_panel(frames: Dict[str, pd.DataFrame], workdir: Optional[str] = None) -> Panel:
+    """Align scored per-ticker frames (Close, Score and ATR columns) into a Panel.
+
+    When a ticker has several bars on one date (e.g. today's intraday bar
+    after the daily bars) the last one is used.
+    """
+    usable = {t: f for t, f in frames.items()
+              if not f.empty and all(col in f.columns for col in ('Close', 'Score', 'ATR'))}
+    tickers = list(usable)
+    days = {t: _session_days(f.index) for t, f in usable.items()}
+    dates = pd.DatetimeIndex(np.unique(np.concatenate([d.to_numpy() for d in days.values()]))) if days else pd.DatetimeIndex([])
+
+    shape = (len(dates), len(tickers))
+    close, score, atr = (allocate(shape, workdir=workdir) for _ in range(3))
+    for col, ticker in enumerate(tickers):
+        keep = ~days[ticker].duplicated(keep='last')
+        rows = dates.get_indexer(days[ticker][keep])
+        frame = usable[ticker][keep]
+        close[rows, col] = frame['Close'].to_numpy(dtype='float64')
+        score[rows, col] = frame['Score'].to_numpy(dtype='float64')
+        atr[rows, col] = frame['ATR'].to_numpy(dtype='float64')
+    return Panel(dates, tickers, close, score, atr)
+
+def simulate_portfolio(close: np.ndarray, score: np.ndarray, atr: np.ndarray, initial_capital: float = 100_000,
+                       max_positions: int = 20, max_weight: float = 0.1, risk_per_trade: float = 0.01,
+                       atr_multiple: float = 2, holding_days: int = 10, min_score: float = 4.5,
+                       stop_loss_pct: float = 5, take_profit_pct: float = 10, cost_bps: float = 0) -> Dict[str, np.ndarray]:
+    """Day-by-day portfolio simulation over (date x ticker) arrays, vectorized across tickers.
+
+    Positions follow the backtest_strategy rules: a close at or beyond the
+    take-profit or stop-loss level exits at that level, otherwise the
+    position exits at the close holding_days bars after entry. Entries go
+    to the highest scores with score >= min_score, one position per ticker
+    and at most max_positions at once. Each is sized so an adverse move of
+    atr_multiple ATRs loses risk_per_trade of equity, capped at max_weight
+    of equity and by the cash on hand. Shares are fractional and every
+    trade pays cost_bps of its value.
+    """
+    days, tickers = close.shape
+    cost = cost_bps / 10_000
+    cash = float(initial_capital)
+    shares = np.zeros(tickers)
+    entry_price = np.zeros(tickers)
+    entry_day = np.zeros(tickers, dtype=np.int64)
+    bars_held = np.zeros(tickers, dtype=np.int64)
+    mark = np.full(tickers, np.nan)
+
+    equity = np.empty(days)
+    exposure = np.empty(days)
+    turnover = np.empty(days)
+    positions = np.empty(days, dtype=np.int64)
+    trades: List[np.ndarray] = []
+
+    for t in range(days):
+        price = np.asarray(close[t])
+        valid = ~np.isnan(price)
+        mark = np.where(valid, price, mark)
+        held = shares > 0
+
+        # Exits: only tickers that printed a bar today can move
+        check = held & valid
+        bars_held += check
+        take = check & (price >= entry_price * (1 + take_profit_pct / 100))
+        stop = check & ~take & (price <= entry_price * (1 - stop_loss_pct / 100))
+        expire = check & ~take & ~stop & (bars_held >= holding_days)
+        exiting = np.flatnonzero(take | stop | expire)
+        sold = 0.0
+        if len(exiting):
+            exit_price = np.where(take[exiting], entry_price[exiting] * (1 + take_profit_pct / 100),
+                                  np.where(stop[exiting], entry_price[exiting] * (1 - stop_loss_pct / 100), price[exiting]))
+            value = shares[exiting] * exit_price
+            sold = float(value.sum())
+            cash += sold * (1 - cost)
+            trades.append(np.column_stack([exiting, entry_day[exiting], np.full(len(exiting), t),
+                                           entry_price[exiting], exit_price, shares[exiting]]))
+            shares[exiting] = 0.0
+            held[exiting] = False
+
+        marked = float(np.dot(shares[held], mark[held]))
+        total = cash + marked
+
+        # Entries: best scores first, into the free slots, while cash lasts
+        bought = 0.0
+        slots = max_positions - int(held.sum())
+        if slots > 0:
+            signal = np.asarray(score[t])
+            ranges = np.asarray(atr[t])
+            candidates = np.flatnonzero(valid & ~held & (signal >= min_score) & (ranges > 0))
+            if len(candidates):
+                candidates = candidates[np.argsort(-signal[candidates], kind='stable')[:slots]]
+                risk_value = risk_per_trade * total / (atr_multiple * ranges[candidates]) * price[candidates]
+                value = np.minimum(risk_value, max_weight * total)
+                affordable = np.cumsum(value * (1 + cost)) <= cash
+                candidates, value = candidates[affordable], value[affordable]
+                if len(candidates):
+                    bought = float(value.sum())
+                    cash -= bought * (1 + cost)
+                    shares[candidates] = value / price[candidates]
+                    entry_price[candidates] = price[candidates]
+                    entry_day[candidates] = t
+                    bars_held[candidates] = 0
+                    held[candidates] = True
+                    marked += bought
+
+        total = cash + marked
+        equity[t] = total
+        exposure[t] = marked / total if total else 0.0
+        turnover[t] = (sold + bought) / total if total else 0.0
+        positions[t] = int(held.sum())
+
+    trades_array = np.concatenate(trades) if trades else np.empty((0, 6))
+    return {
+        'equity': equity,
+        'exposure': exposure,
+        'turnover': turnover,
+        'positions': positions,
+        'cash': np.float64(cash),
+        'ticker': trades_array[:, 0].astype(np.int64),
+        'entry_day': trades_array[:, 1].astype(np.int64),
+        'exit_day': trades_array[:, 2].astype(np.int64),
+        'buy_price': trades_array[:, 3],
+        'sell_price': trades_array[:, 4],
+        'shares': trades_array[:, 5],
+    }
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """Fractional distance below the running peak (0 at a new high)."""
+    peak = np.maximum.accumulate(equity)
+    return (peak - equity) / peak
+
+def summarize_portfolio(sim: Dict[str, np.ndarray], initial_capital: float) -> Dict[str, Any]:
+    equity = sim['equity']
+    if len(equity) == 0:
+        return {'trades': 0, 'total_return': None, 'cagr': None, 'max_drawdown': None,
+                'annual_turnover': None, 'hit_rate': None, 'mean_exposure': None}
+    returns = (sim['sell_price'] - sim['buy_price']) / sim['buy_price'] * 100
+    years = len(equity) / TRADING_DAYS
+    growth = equity[-1] / initial_capital
+    return {
+        'trades': int(len(returns)),
+        'total_return': round(float((growth - 1) * 100), 2),
+        'cagr': round(float((growth ** (1 / years) - 1) * 100), 2) if growth > 0 else None,
+        'max_drawdown': round(float(drawdown(equity).max() * 100), 2),
+        # Traded value (buys plus sells) over equity, per year
+        'annual_turnover': round(float(sim['turnover'].sum() / years * 100), 2),
+        'hit_rate': round(float((returns > 0).mean() * 100), 2) if len(returns) else None,
+        'mean_exposure': round(float(sim['exposure'].mean() * 100), 2),
+    }
+
+def backtest_portfolio(frames: Dict[str, pd.DataFrame], initial_capital: float = 100_000,
+                       workdir: Optional[str] = None, **params) -> Dict[str, Any]:
+    """Portfolio backtest over scored per-ticker frames (see simulate_portfolio for params).
+
+    Returns a summary plus equity-curve and trade tables.
+    """
+    panel = build_panel(frames, workdir)
+    if not panel.tickers:
+        return {"error": "❌ No tickers with Close, Score and ATR data"}
+
+    sim = simulate_portfolio(panel.close, panel.score, panel.atr, initial_capital=initial_capital, **params)
+    curve = pd.DataFrame({
+        'Date': panel.dates,
+        'Equity': sim['equity'].round(2),
+        'Drawdown (%)': (drawdown(sim['equity']) * 100).round(2),
+        'Exposure (%)': (sim['exposure'] * 100).round(2),
+        'Turnover (%)': (sim['turnover'] * 100).round(2),
+        'Positions': sim['positions'],
+    })
+    trades = pd.DataFrame({
+        'Ticker': np.asarray(panel.tickers, dtype=object)[sim['ticker']],
+        'Buy Date': panel.dates[sim['entry_day']].strftime('%Y-%m-%d'),
+        'Sell Date': panel.dates[sim['exit_day']].strftime('%Y-%m-%d'),
+        'Buy Price': sim['buy_price'].round(2),
+        'Sell Price': sim['sell_price'].round(2),
+        'Shares': sim['shares'].round(4),
+        'Return (%)': ((sim['sell_price'] - sim['buy_price']) / sim['buy_price'] * 100).round(2),
+    })
+    return {
+        "tickers": panel.tickers,
+        "summary": summarize_portfolio(sim, initial_capital),
+        "equity": curve,
+        "trades": trades,
+    }
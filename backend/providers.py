@@ -0,0 +1,129 @@
+import os
+import pandas as pd
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_stock_data.csv')
+
+def _flatten(data: pd.DataFrame) -> pd.DataFrame:
+    # yfinance returns (field, ticker) MultiIndex columns for downloads
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = [col[0] for col in data.columns]
+    return data
+
+class BarProvider(ABC):
+    """Source of OHLCV bars. Subclasses implement fetch_bars."""
+
+    name = 'base'
+
+    @abstractmethod
+    def fetch_bars(self, ticker: str, interval: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Bars for ticker at interval with start <= timestamp < end, indexed by a DatetimeIndex."""
+
+    def fetch_many(self, tickers: List[str], interval: str, start: datetime,
+                   end: Optional[datetime] = None) -> Dict[str, pd.DataFrame]:
+        """Bars for several tickers at once; providers with a bulk API override this."""
+        return {ticker: self.fetch_bars(ticker, interval, start, end) for ticker in tickers}
+
+class YFinanceProvider(BarProvider):
+    name = 'yfinance'
+
+    def __init__(self, timeout: int = 30):
+        self.timeout = timeout
+
+    def fetch_bars(self, ticker: str, interval: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        import yfinance as yf
+        stock = yf.Ticker(ticker)  # Re-instantiate to avoid stale cache
+        data = stock.history(start=start,
+                             end=end,
+                             interval=interval,
+                             prepost=interval != '1d',
+                             auto_adjust=False,
+                             timeout=self.timeout)
+        return _flatten(data)
+
+    def fetch_many(self, tickers: List[str], interval: str, start: datetime,
+                   end: Optional[datetime] = None) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        if len(tickers) == 1:
+            return {tickers[0]: self.fetch_bars(tickers[0], interval, start, end)}
+        data = yf.download(tickers,
+                           start=start,
+                           end=end,
+                           interval=interval,
+                           prepost=interval != '1d',
+                           auto_adjust=False,
+                           group_by='ticker',
+                           threads=True,
+                           progress=False,
+                           timeout=self.timeout)
+        if data.empty:
+            return {ticker: pd.DataFrame() for ticker in tickers}
+        return {ticker: data[ticker].dropna(how='all') if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+                for ticker in tickers}
+
+class CSVProvider(BarProvider):
+    """Serves daily bars from a yfinance-style CSV, e.g. sample_stock_data.csv.
+
+    path may be a single file, served for every ticker, or a directory of
+    <TICKER>.csv files. There is no intraday data. With rebase=True the dates
+    are shifted by whole days so the last bar lands on yesterday, which lets
+    the fixed sample file stand in for a live feed.
+    """
+
+    name = 'csv'
+
+    def __init__(self, path: str = SAMPLE_CSV, rebase: bool = False):
+        self.path = path
+        self.rebase = rebase
+        self._frames = {}
+
+    def _load(self, ticker: str) -> pd.DataFrame:
+        path = os.path.join(self.path, f"{ticker.upper()}.csv") if os.path.isdir(self.path) else self.path
+        if path not in self._frames:
+            if not os.path.exists(path):
+                self._frames[path] = pd.DataFrame()
+            else:
+                with open(path) as f:
+                    multi_header = f.readline().startswith('Price,')
+                data = pd.read_csv(path, header=[0, 1] if multi_header else 0, index_col=0)
+                data = _flatten(data)
+                data.index = pd.to_datetime(data.index)
+                if data.index.tz is None:
+                    data.index = data.index.tz_localize('UTC')
+                data.index.name = 'Date'
+                if self.rebase and len(data):
+                    yesterday = pd.Timestamp.now(tz='UTC').normalize() - pd.Timedelta(days=1)
+                    data.index = data.index + (yesterday - data.index[-1].normalize())
+                self._frames[path] = data.apply(pd.to_numeric, errors='coerce').sort_index()
+        return self._frames[path]
+
+    def fetch_bars(self, ticker: str, interval: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        data = self._load(ticker)
+        if interval != '1d' or data.empty:
+            return pd.DataFrame()
+        mask = data.index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= data.index < pd.Timestamp(end)
+        return data[mask].copy()
+
+def provider_from_env() -> BarProvider:
+    # STOCKAPP_PROVIDER=yfinance (default) or csv[:path]
+    spec = os.environ.get('STOCKAPP_PROVIDER', 'yfinance')
+    kind, _, arg = spec.partition(':')
+    if kind == 'csv':
+        return CSVProvider(arg or SAMPLE_CSV, rebase=True)
+    return YFinanceProvider()
+
+_provider: Optional[BarProvider] = None
+
+def get_provider() -> BarProvider:
+    global _provider
+    if _provider is None:
+        _provider = provider_from_env()
+    return _provider
+
+def set_provider(provider: BarProvider) -> None:
+    global _provider
+    _provider = provider
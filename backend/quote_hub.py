@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+from concurrency import run_io, FETCH_TIMEOUT
+from fetch_data import load_quote
+
+# Seconds between upstream polls per symbol, and how long a poller outlives its last subscriber
+STREAM_INTERVAL = float(os.environ.get('STOCKAPP_STREAM_INTERVAL', 30))
+STREAM_LINGER = float(os.environ.get('STOCKAPP_STREAM_LINGER', 60))
+HEARTBEAT = 15.0
+
+class QuoteHub:
+    """Fans quote snapshots out to every subscriber of a ticker.
+
+    Each ticker with at least one subscriber has exactly one poller task,
+    so upstream load grows with the number of symbols being watched, not
+    with the number of clients. Snapshots are only published when they
+    change, and a slow subscriber loses its oldest queued snapshot instead
+    of holding up the others.
+    """
+
+    def __init__(self, loader: Callable[[str], Dict[str, Any]], interval: float = STREAM_INTERVAL,
+                 linger: float = STREAM_LINGER, queue_size: int = 8):
+        self.loader = loader
+        self.interval = interval
+        self.linger = linger
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def subscriber_count(self, ticker: Optional[str] = None) -> int:
+        if ticker is not None:
+            return len(self._subscribers.get(ticker.upper(), ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, ticker: str) -> asyncio.Queue:
+        ticker = ticker.upper()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(ticker, set()).add(queue)
+        if ticker in self._latest:
+            queue.put_nowait(self._latest[ticker])
+        poller = self._pollers.get(ticker)
+        if poller is None or poller.done():
+            self._pollers[ticker] = asyncio.ensure_future(self._poll(ticker))
+        return queue
+
+    def unsubscribe(self, ticker: str, queue: asyncio.Queue) -> None:
+        self._subscribers.get(ticker.upper(), set()).discard(queue)
+
+    def _publish(self, ticker: str, snapshot: Dict[str, Any]) -> None:
+        self._latest[ticker] = snapshot
+        for queue in self._subscribers.get(ticker, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    async def _poll(self, ticker: str) -> None:
+        idle_since = None
+        try:
+            while True:
+                if self._subscribers.get(ticker):
+                    idle_since = None
+                    try:
+                        snapshot = await run_io(self.loader, ticker, timeout=FETCH_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        snapshot = {"ticker": ticker, "error": f"⚠ Quote timed out after {FETCH_TIMEOUT:.0f}s"}
+                    except Exception as e:
+                        logging.error(f"🔥 Error polling {ticker}: {str(e)}")
+                        snapshot = {"ticker": ticker, "error": f"⚠ System Error: {str(e)}"}
+                    if snapshot != self._latest.get(ticker):
+                        self._publish(ticker, snapshot)
+                else:
+                    # Keep the poller (and its last snapshot) briefly so reconnecting clients start warm
+                    idle_since = idle_since or asyncio.get_running_loop().time()
+                    if asyncio.get_running_loop().time() - idle_since >= self.linger:
+                        break
+                await asyncio.sleep(self.interval)
+        finally:
+            if self._pollers.get(ticker) is asyncio.current_task():
+                del self._pollers[ticker]
+                self._latest.pop(ticker, None)
+                self._subscribers.pop(ticker, None)
+
+    async def stream(self, ticker: str, heartbeat: float = HEARTBEAT) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield snapshots for ticker as they change; None every heartbeat seconds of silence."""
+        queue = self.subscribe(ticker)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.unsubscribe(ticker, queue)
+
+    async def close(self) -> None:
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+
+_hub: Optional[QuoteHub] = None
+
+def get_hub() -> QuoteHub:
+    global _hub
+    if _hub is None:
+        _hub = QuoteHub(load_quote)
+    return _hub
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from concurrency import coalesce, run_io
+
+CACHE_CAPACITY = int(os.environ.get('STOCKAPP_CACHE_CAPACITY', 256))
+# Seconds a cached response may still be served while a fresh one is computed
+CACHE_STALE = float(os.environ.get('STOCKAPP_CACHE_STALE', 300))
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: float
+    fresh_until: float
+    stale_until: float
+    media_type: str = 'application/json'
+
+    def encode(self) -> bytes:
+        header = {'etag': self.etag, 'last_modified': self.last_modified,
+                  'fresh_until': self.fresh_until, 'stale_until': self.stale_until, 'media_type': self.media_type}
+        return json.dumps(header).encode() + b'\n' + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> 'CachedResponse':
+        header, _, body = raw.partition(b'\n')
+        return cls(body=body, **json.loads(header))
+
+class SQLiteKV:
+    """Redis-style get/setex/delete over a local SQLite file.
+
+    Stands in for Redis when several worker processes on one host should
+    share cached responses without running a server.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def setex(self, key: str, ttl: float, value: bytes) -> None:
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+            db.execute("DELETE FROM kv WHERE expires <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+def backend_from_env():
+    # STOCKAPP_CACHE_URL=redis://host:6379/0 or sqlite:///path/to/cache.db; unset keeps the cache in-process
+    url = os.environ.get('STOCKAPP_CACHE_URL', '')
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            import redis
+        except ImportError:
+            print("⚠ STOCKAPP_CACHE_URL points at Redis but the redis package is not installed; using the in-process cache only")
+            return None
+        return redis.Redis.from_url(url)
+    if url.startswith('sqlite://'):
+        return SQLiteKV(url[len('sqlite://'):])
+    return None
+
+class ResponseCache:
+    """Two-tier cache of encoded responses with stale-while-revalidate.
+
+    The first tier is an in-process LRU; the optional second tier is any
+    object with Redis-style get/setex (redis.Redis or SQLiteKV). A fresh
+    entry is served as is. A stale one is served immediately while a single
+    background task recomputes it. Past stale_until the caller waits for
+    the recomputation.
+    """
+
+    def __init__(self, capacity: int = CACHE_CAPACITY, stale: float = CACHE_STALE, backend=None):
+        self.capacity = capacity
+        self.stale = stale
+        self.backend = backend
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0,
+                         'backend_hits': 0, 'backend_errors': 0, 'revalidations': 0}
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, 'entries': len(self._entries)}
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    async def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self.backend is None:
+            return None
+        try:
+            raw = await run_io(self.backend.get, key)
+        except Exception as e:
+            self.counters['backend_errors'] += 1
+            print(f"⚠ Cache backend read failed for {key}: {e}")
+            return None
+        if raw is None:
+            return None
+        entry = CachedResponse.decode(raw)
+        self.counters['backend_hits'] += 1
+        self._remember(key, entry)
+        return entry
+
+    def _entry(self, body: bytes, media_type: str, ttl: float) -> CachedResponse:
+        now = time.time()
+        return CachedResponse(body=body, etag=f'"{hashlib.sha1(body).hexdigest()[:20]}"', last_modified=now,
+                              fresh_until=now + ttl, stale_until=now + ttl + self.stale, media_type=media_type)
+
+    async def _store(self, key: str, body: bytes, media_type: str, ttl: float) -> CachedResponse:
+        entry = self._entry(body, media_type, ttl)
+        previous = self._entries.get(key)
+        if previous is not None and previous.etag == entry.etag:
+            # Same content: keep the original Last-Modified so conditional requests still match
+            entry = entry._replace(last_modified=previous.last_modified)
+        self._remember(key, entry)
+        if self.backend is not None:
+            try:
+                await run_io(self.backend.setex, key, max(1, int(ttl + self.stale)), entry.encode())
+            except Exception as e:
+                self.counters['backend_errors'] += 1
+                print(f"⚠ Cache backend write failed for {key}: {e}")
+        return entry
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Tuple[bytes, str, bool]]],
+                       ttl: Callable[[], float]) -> CachedResponse:
+        async def run():
+            body, media_type, cacheable = await compute()
+            # Errors are passed through to the caller but never stored
+            return await self._store(key, body, media_type, ttl()) if cacheable else self._entry(body, media_type, 0)
+        return await coalesce(('response-cache', key), run)
+
+    async def _revalidate(self, key: str, compute: Callable[[], Awaitable[Tuple[bytes, str, bool]]],
+                          ttl: Callable[[], float]) -> None:
+        try:
+            await self._compute(key, compute, ttl)
+        except Exception as e:
+            # Keep serving the stale entry; the next request past stale_until retries in the foreground
+            print(f"⚠ Background refresh of {key} failed: {e}")
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Tuple[bytes, str, bool]]],
+                  ttl: Callable[[], float]) -> Tuple[CachedResponse, str]:
+        """(response, 'hit' | 'stale' | 'miss') for key, computing it with compute() when missing or expired.
+
+        compute() returns (body, media type, cacheable). ttl is called after each
+        computation, so it can depend on the market session at that moment.
+        """
+        entry = await self._lookup(key)
+        now = time.time()
+        if entry is not None and now < entry.fresh_until:
+            self.counters['hits'] += 1
+            return entry, 'hit'
+        if entry is not None and now < entry.stale_until:
+            self.counters['stale_hits'] += 1
+            if key not in self._revalidating:
+                self.counters['revalidations'] += 1
+                self._revalidating[key] = asyncio.ensure_future(self._revalidate(key, compute, ttl))
+                self._revalidating[key].add_done_callback(lambda _: self._revalidating.pop(key, None))
+            return entry, 'stale'
+        self.counters['misses'] += 1
+        return await self._compute(key, compute, ttl), 'miss'
+
+    async def put(self, key: str, body: bytes, media_type: str, ttl: float) -> CachedResponse:
+        """Store a response computed ahead of any request for it, e.g. by the precompute scheduler."""
+        return await self._store(key, body, media_type, ttl)
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+_cache: Optional[ResponseCache] = None
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(backend=backend_from_env())
+    return _cache
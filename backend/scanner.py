@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import numpy as np
+from typing import Any, Dict, List, Literal, Optional, get_args
+from concurrency import run_io
+from fetch_data import load_many_base_data, latest_indicators
+
+# Seconds between passes over the universe, and tickers per bulk download
+SCAN_INTERVAL = float(os.environ.get('STOCKAPP_SCAN_INTERVAL', 300))
+SCAN_CHUNK = int(os.environ.get('STOCKAPP_SCAN_CHUNK', 100))
+SCAN_DAYS = 90
+
+# Used when STOCKAPP_UNIVERSE is not set; point it at a file (one ticker per line,
+# e.g. NIFTY 500 and S&P 500 constituents) or give a comma-separated list
+DEFAULT_UNIVERSE = [
+    'AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'JPM', 'V', 'UNH',
+    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS', 'SBIN.NS',
+]
+
+IndexColumn = Literal['Close', 'Volume', 'MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Support', 'Resistance', 'ATR',
+                      'Score', 'Volume_Spike', 'Updated']
+INDEX_COLUMNS: List[str] = list(get_args(IndexColumn))
+
+def load_universe(spec: Optional[str] = None) -> List[str]:
+    spec = spec if spec is not None else os.environ.get('STOCKAPP_UNIVERSE', '')
+    if not spec:
+        return list(DEFAULT_UNIVERSE)
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            tickers = [line.split(',')[0].strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        tickers = [t.strip() for t in spec.split(',') if t.strip()]
+    return list(dict.fromkeys(t.upper() for t in tickers))
+
+class SignalIndex:
+    """Latest indicator row per ticker, stored column-wise for fast filtering.
+
+    Rows are updated in place as tickers refresh; queries are numpy masks
+    over the whole block plus an argpartition for top-k.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.columns = {name: i for i, name in enumerate(INDEX_COLUMNS)}
+        self.values = np.full((capacity, len(INDEX_COLUMNS)), np.nan)
+        self.tickers: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.latest_time: List[Optional[str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def update(self, ticker: str, indicators: Dict[str, Any], latest_time: Optional[str] = None) -> None:
+        with self._lock:
+            row = self.rows.get(ticker)
+            if row is None:
+                row = len(self.tickers)
+                if row == len(self.values):
+                    grown = np.full((2 * len(self.values), len(INDEX_COLUMNS)), np.nan)
+                    grown[:row] = self.values
+                    self.values = grown
+                self.rows[ticker] = row
+                self.tickers.append(ticker)
+                self.latest_time.append(None)
+            for name, col in self.columns.items():
+                self.values[row, col] = float(indicators.get(name, np.nan))
+            self.values[row, self.columns['Updated']] = time.time()
+            self.latest_time[row] = latest_time
+
+    def remove(self, ticker: str) -> None:
+        with self._lock:
+            row = self.rows.get(ticker)
+            if row is not None:
+                # Keep the row so positions stay stable; NaN Close excludes it from every query
+                self.values[row] = np.nan
+
+    def query(self, min_score: Optional[float] = None, max_rsi: Optional[float] = None,
+              min_rsi: Optional[float] = None, volume_spike: Optional[bool] = None,
+              sort_by: str = 'Score', descending: bool = True, limit: int = 50) -> List[Dict[str, Any]]:
+        if sort_by not in self.columns:
+            raise ValueError(f"Unknown sort column {sort_by!r}; choose from {INDEX_COLUMNS}")
+        with self._lock:
+            block = self.values[:len(self.tickers)]
+            col = self.columns
+            mask = ~np.isnan(block[:, col['Close']])
+            if min_score is not None:
+                mask &= block[:, col['Score']] >= min_score
+            if max_rsi is not None:
+                mask &= block[:, col['RSI']] < max_rsi
+            if min_rsi is not None:
+                mask &= block[:, col['RSI']] > min_rsi
+            if volume_spike is not None:
+                mask &= (block[:, col['Volume_Spike']] == 1) == volume_spike
+            hits = np.flatnonzero(mask)
+            keys = block[hits, col[sort_by]]
+            # Missing values sort last either way
+            keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+            if len(hits) > limit:
+                top = np.argpartition(keys, limit)[:limit]
+                hits, keys = hits[top], keys[top]
+            order = hits[np.argsort(keys, kind='stable')]
+            selected = block[order, :-1].tolist()
+            tickers = [self.tickers[i] for i in order]
+            times = [self.latest_time[i] for i in order]
+        results = []
+        for ticker, latest_time, values in zip(tickers, times, selected):
+            row = {'ticker': ticker, 'latest_time': latest_time}
+            row.update((name, None if v != v else v) for name, v in zip(INDEX_COLUMNS, values))
+            for name in ('Score', 'Volume_Spike'):
+                if row[name] is not None:
+                    row[name] = int(row[name])
+            results.append(row)
+        return results
+
+class Scanner:
+    """Keeps a SignalIndex current for a universe of tickers.
+
+    A background task walks the universe in chunks: each chunk is one bulk
+    bar-store refresh, and each ticker's indicators advance incrementally
+    from its streaming state, so a pass costs roughly the new bars.
+    """
+
+    def __init__(self, universe: Optional[List[str]] = None, interval: float = SCAN_INTERVAL,
+                 chunk: int = SCAN_CHUNK, days: int = SCAN_DAYS):
+        self.universe = universe if universe is not None else load_universe()
+        self.interval = interval
+        self.chunk = chunk
+        self.days = days
+        self.index = SignalIndex(capacity=max(16, len(self.universe)))
+        self.last_pass: Optional[float] = None
+        self.failed: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh_chunk(self, tickers: List[str]) -> int:
+        frames = load_many_base_data(tickers, self.days)
+        updated = 0
+        for ticker in tickers:
+            data = frames.get(ticker)
+            if data is None or data.empty:
+                self.failed[ticker] = "❌ No data"
+                self.index.remove(ticker)
+                continue
+            try:
+                indicators = latest_indicators(ticker, data.tail(self.days).to_frame())
+            except Exception as e:
+                self.failed[ticker] = str(e)
+                continue
+            self.failed.pop(ticker, None)
+            self.index.update(ticker, indicators, data.dates[-1].isoformat())
+            updated += 1
+        return updated
+
+    async def refresh(self) -> None:
+        started = time.perf_counter()
+        updated = 0
+        for i in range(0, len(self.universe), self.chunk):
+            chunk = self.universe[i:i + self.chunk]
+            try:
+                updated += await run_io(self.refresh_chunk, chunk, timeout=None)
+            except Exception as e:
+                logging.error(f"🔥 Scanner chunk {chunk[0]}..{chunk[-1]} failed: {str(e)}")
+        self.last_pass = time.time()
+        logging.info(f"🔎 Scanner refreshed {updated}/{len(self.universe)} tickers in {time.perf_counter() - started:.1f}s")
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'universe': len(self.universe),
+            'indexed': len(self.index),
+            'failed': len(self.failed),
+            'last_pass': self.last_pass,
+            'running': self._task is not None and not self._task.done(),
+        }
+
+_scanner: Optional[Scanner] = None
+
+def get_scanner() -> Scanner:
+    global _scanner
+    if _scanner is None:
+        _scanner = Scanner()
+    return _scanner
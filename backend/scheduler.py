@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from concurrency import CPU_WORKERS
+from market_calendar import Exchange, exchange_for, ist, next_close, next_open
+from scanner import load_universe
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs its own scheduler
+    fcntl = None
+
+# Concurrent precompute jobs; the default leaves half the CPU pool to interactive requests
+PRECOMPUTE_WORKERS = int(os.environ.get('STOCKAPP_PRECOMPUTE_WORKERS', max(1, CPU_WORKERS // 2)))
+# Attempts after the first failure, and the first retry delay in seconds (doubled per attempt)
+PRECOMPUTE_RETRIES = int(os.environ.get('STOCKAPP_PRECOMPUTE_RETRIES', 3))
+PRECOMPUTE_BACKOFF = float(os.environ.get('STOCKAPP_PRECOMPUTE_BACKOFF', 30))
+
+# Runs happen this long after each session boundary: the close, once the final
+# daily bar has settled, and the open, once the first intraday bars are in
+CLOSE_DELAY = timedelta(minutes=float(os.environ.get('STOCKAPP_PRECOMPUTE_CLOSE_DELAY', 20)))
+OPEN_DELAY = timedelta(minutes=float(os.environ.get('STOCKAPP_PRECOMPUTE_OPEN_DELAY', 5)))
+
+# The planner wakes at least this often, so holiday or clock changes are picked up
+MAX_SLEEP = 3600
+
+# Held by the one server worker that runs the scheduler when several share a host
+SCHEDULER_LOCK = os.environ.get('STOCKAPP_SCHEDULER_LOCK',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'scheduler.lock'))
+
+class Watchlist(NamedTuple):
+    name: str
+    tickers: List[str]
+    priority: int  # lower runs first
+
+class Job(NamedTuple):
+    priority: int
+    seq: int
+    ticker: str
+    attempt: int
+    reason: str
+
+def load_watchlists(spec: Optional[str] = None) -> List[Watchlist]:
+    """Watchlists from STOCKAPP_WATCHLISTS: a JSON file or inline JSON such as
+    {"core": {"tickers": ["AAPL", "TCS.NS"], "priority": 0}, "nifty": {"tickers": "nifty500.txt", "priority": 5}}.
+    tickers is a list, a comma-separated string or a file with one ticker per line.
+    """
+    spec = spec if spec is not None else os.environ.get('STOCKAPP_WATCHLISTS', '')
+    if not spec:
+        return []
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            config = json.load(f)
+    else:
+        config = json.loads(spec)
+    watchlists = []
+    for name, entry in config.items():
+        tickers = entry.get('tickers', [])
+        tickers = load_universe(','.join(tickers) if isinstance(tickers, list) else tickers) if tickers else []
+        if tickers:
+            watchlists.append(Watchlist(name, tickers, int(entry.get('priority', 0))))
+    return sorted(watchlists, key=lambda w: w.priority)
+
+class Scheduler:
+    """Runs job(ticker) for every watchlist ticker at session boundaries, in IST.
+
+    Jobs go through a priority queue (a ticker is queued once, at its best
+    priority) to a fixed number of worker tasks. A failed job is retried
+    with exponential backoff and jitter, up to `retries` times.
+    """
+
+    def __init__(self, job: Callable[[str], Awaitable[Any]], watchlists: Optional[List[Watchlist]] = None,
+                 workers: int = PRECOMPUTE_WORKERS, retries: int = PRECOMPUTE_RETRIES,
+                 backoff: float = PRECOMPUTE_BACKOFF):
+        self.job = job
+        self.watchlists = watchlists if watchlists is not None else load_watchlists()
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self._queued: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._retrying: Set[asyncio.TimerHandle] = set()
+        self._workers: List[asyncio.Task] = []
+        self._planner: Optional[asyncio.Task] = None
+        self.running: Dict[str, float] = {}
+        self.next_run: Optional[Tuple[datetime, str]] = None
+        self.failures: Dict[str, str] = {}
+        self.counters = {'enqueued': 0, 'completed': 0, 'failed': 0, 'retries': 0}
+        self._lock_handle = None
+
+    def claim(self, path: str = SCHEDULER_LOCK) -> bool:
+        """Take the scheduler lock without waiting; False when another process holds it."""
+        if fcntl is None or self._lock_handle is not None:
+            return True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            logging.info(f"🗓 Scheduler lock {path} is held by another worker; not precomputing here")
+            return False
+        self._lock_handle = handle
+        return True
+
+    def _push(self, ticker: str, priority: int, reason: str, attempt: int = 0) -> bool:
+        queued = self._queued.get(ticker)
+        if queued is not None and queued <= priority:
+            return False
+        # A better-priority entry supersedes the queued one, which is skipped when it comes up
+        self._queued[ticker] = priority
+        self.queue.put_nowait(Job(priority, next(self._seq), ticker, attempt, reason))
+        return True
+
+    def _start_workers(self) -> None:
+        if self.queue is None:
+            self.queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def enqueue(self, tickers: List[str], priority: int = 0, reason: str = 'manual') -> int:
+        """Queue tickers for a run; returns how many were not already queued at this priority or better.
+
+        Workers start on the first enqueue, so manual runs also work in a
+        process that does not run the session planner.
+        """
+        self._start_workers()
+        added = sum(self._push(t.upper(), priority, reason) for t in tickers)
+        self.counters['enqueued'] += added
+        return added
+
+    def enqueue_watchlist(self, name: str, reason: str = 'manual') -> int:
+        for watchlist in self.watchlists:
+            if watchlist.name == name:
+                return self.enqueue(watchlist.tickers, watchlist.priority, reason)
+        raise KeyError(name)
+
+    def _schedule_retry(self, job: Job, delay: float) -> None:
+        def fire():
+            self._retrying.discard(handle)
+            self._push(job.ticker, job.priority, job.reason, job.attempt)
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self._retrying.add(handle)
+
+    async def _run_job(self, job: Job) -> None:
+        self.running[job.ticker] = time.time()
+        started = time.perf_counter()
+        try:
+            await self.job(job.ticker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if job.attempt < self.retries:
+                delay = self.backoff * 2 ** job.attempt * random.uniform(0.8, 1.2)
+                self.counters['retries'] += 1
+                logging.warning(f"⚠ Precompute of {job.ticker} failed ({e}); retry {job.attempt + 1}/{self.retries} in {delay:.0f}s")
+                self._schedule_retry(job._replace(attempt=job.attempt + 1), delay)
+            else:
+                self.counters['failed'] += 1
+                self.failures[job.ticker] = str(e)
+                logging.error(f"🔥 Precompute of {job.ticker} failed after {job.attempt + 1} attempts: {e}")
+        else:
+            self.counters['completed'] += 1
+            self.failures.pop(job.ticker, None)
+            logging.info(f"🗓 Precomputed {job.ticker} ({job.reason}) in {time.perf_counter() - started:.1f}s")
+        finally:
+            self.running.pop(job.ticker, None)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if self._queued.get(job.ticker) != job.priority:
+                    continue
+                del self._queued[job.ticker]
+                await self._run_job(job)
+            finally:
+                self.queue.task_done()
+
+    def boundaries(self, now: datetime) -> List[Tuple[datetime, str, Exchange]]:
+        """The next open and close run time of every exchange the watchlists trade on, soonest first."""
+        exchanges = {exchange_for(t).name: exchange_for(t) for w in self.watchlists for t in w.tickers}
+        runs = []
+        for exchange in exchanges.values():
+            # Shift by the delay so a boundary that passed less than a delay ago still counts
+            runs.append((next_open(exchange, now - OPEN_DELAY) + OPEN_DELAY, 'open', exchange))
+            runs.append((next_close(exchange, now - CLOSE_DELAY) + CLOSE_DELAY, 'close', exchange))
+        return sorted(runs, key=lambda run: run[0])
+
+    async def _plan(self) -> None:
+        while True:
+            now = datetime.now(ist)
+            due, kind, exchange = self.boundaries(now)[0]
+            self.next_run = (due, f"{exchange.name} {kind}")
+            await asyncio.sleep(min(max(0.0, (due - now).total_seconds()), MAX_SLEEP))
+            if datetime.now(ist) < due:
+                continue
+            for watchlist in self.watchlists:
+                tickers = [t for t in watchlist.tickers if exchange_for(t).name == exchange.name]
+                if tickers:
+                    self.enqueue(tickers, watchlist.priority, f"{watchlist.name} {exchange.name} {kind}")
+
+    def start(self, warm: bool = True) -> None:
+        """Start the workers and the session planner; with warm, queue every watchlist right away."""
+        if self._planner is not None:
+            return
+        self._start_workers()
+        if not self.watchlists:
+            return
+        self._planner = asyncio.ensure_future(self._plan())
+        if warm:
+            for watchlist in self.watchlists:
+                self.enqueue(watchlist.tickers, watchlist.priority, f"{watchlist.name} startup")
+
+    async def drain(self) -> None:
+        """Wait until nothing is queued, running or waiting to be retried."""
+        while self._queued or self.running or self._retrying:
+            await asyncio.sleep(0.05)
+
+    async def stop(self) -> None:
+        for handle in self._retrying:
+            handle.cancel()
+        self._retrying.clear()
+        tasks = self._workers + ([self._planner] if self._planner is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers, self._planner = [], None
+        if self._lock_handle is not None:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'watchlists': {w.name: {'tickers': len(w.tickers), 'priority': w.priority} for w in self.watchlists},
+            'active': self._planner is not None,
+            'workers': self.workers,
+            'running': sorted(self.running),
+            'queued': len(self._queued),
+            'retrying': len(self._retrying),
+            'next_run': {'at': self.next_run[0].isoformat(), 'boundary': self.next_run[1]} if self.next_run else None,
+            **self.counters,
+            'failures': dict(self.failures),
+        }
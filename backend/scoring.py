@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def generate_score(row: pd.Series) -> int:
@@ -29,4 +30,45 @@ def generate_score(row: pd.Series) -> int:
 
     except Exception as e:
         print(f"⚠ Error in generate_score: {e}")
-        return 0
\ No newline at end of file
+        return 0
+
+_SCORE_COLUMNS = ["Close", "MA20", "MA50", "RSI", "BB_lower", "Support", "Resistance"]
+
+def _present(values: np.ndarray) -> np.ndarray:
+    # Mirrors the truthiness checks in generate_score: NaN/None and 0.0 never fire a rule
+    return ~np.isnan(values) & (values != 0)
+
+def score_frame(df: pd.DataFrame) -> pd.Series:
+    """Vectorized generate_score over every row of df.
+
+    Works on a single-ticker frame or a stacked (ticker, date) panel, since
+    every rule only looks at columns of the same row.
+    """
+    if df.empty or not all(col in df.columns for col in _SCORE_COLUMNS):
+        return pd.Series(0, index=df.index, dtype='int64')
+
+    try:
+        cols = {col: df[col].to_numpy(dtype='float64', na_value=np.nan) for col in _SCORE_COLUMNS}
+    except (TypeError, ValueError) as e:
+        print(f"⚠ Error in score_frame: {e}, falling back to row-wise scoring")
+        return df.apply(generate_score, axis=1).astype('int64')
+
+    close, ma20, ma50 = cols["Close"], cols["MA20"], cols["MA50"]
+    rsi, bb_lower = cols["RSI"], cols["BB_lower"]
+    support, resistance = cols["Support"], cols["Resistance"]
+    has_close = _present(close)
+
+    score = (_present(ma20) & _present(ma50) & (ma20 > ma50)).astype('int64')
+    score += _present(rsi) & (rsi < 30)
+    score += has_close & _present(bb_lower) & (close < bb_lower)
+    if "Volume_Spike" in df.columns:
+        spike = df["Volume_Spike"]
+        if pd.api.types.is_numeric_dtype(spike):
+            # bool(nan) is True in the row-wise version, and NaN != 0 keeps that
+            score += spike.to_numpy(dtype='float64', na_value=np.nan) != 0
+        else:
+            score += spike.to_numpy(dtype=object).astype(bool)
+    score += has_close & _present(support) & (close < support)
+    score -= has_close & _present(resistance) & (close > resistance)
+
+    return pd.Series(score, index=df.index, dtype='int64')
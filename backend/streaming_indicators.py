@@ -0,0 +1,311 @@
+import math
+from collections import deque
+from typing import Any, Dict, Mapping, Optional, Tuple
+import pandas as pd
+from indicators import DEFAULT_INDICATOR_SPEC
+
+# Running sums are rebuilt from the window this often, so float drift cannot accumulate
+RESYNC_EVERY = 4096
+
+NAN = float('nan')
+
+def _float(value: Any) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return NAN
+    return value
+
+def _dump(values) -> list:
+    # JSON has no NaN; store missing values as None
+    return [None if math.isnan(v) else v for v in values]
+
+def _load(values) -> list:
+    return [NAN if v is None else float(v) for v in values]
+
+class RollingMean:
+    """Mean of the non-NaN values among the last `window` pushes (rolling(window, min_periods=1).mean())."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+        self.nonzero = 0
+        self.pushes = 0
+
+    def _step(self, x: float) -> Tuple[float, int, int]:
+        total, count, nonzero = self.total, self.count, self.nonzero
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if not math.isnan(old):
+                total, count, nonzero = total - old, count - 1, nonzero - (old != 0)
+        if not math.isnan(x):
+            total, count, nonzero = total + x, count + 1, nonzero + (x != 0)
+        return total, count, nonzero
+
+    def push(self, x: float, commit: bool = True) -> float:
+        """Mean after appending x; with commit=False the window is left unchanged."""
+        total, count, nonzero = self._step(x)
+        if commit:
+            self.values.append(x)
+            self.total, self.count, self.nonzero = total, count, nonzero
+            self.pushes += 1
+            if self.pushes % RESYNC_EVERY == 0:
+                self._resync()
+        if count == 0:
+            return NAN
+        # An all-zero window is exactly zero, whatever the running sum has drifted to
+        return total / count if nonzero else 0.0
+
+    def _resync(self) -> None:
+        present = [v for v in self.values if not math.isnan(v)]
+        self.total, self.count, self.nonzero = math.fsum(present), len(present), sum(v != 0 for v in present)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'window': self.window, 'values': _dump(self.values)}
+
+    @classmethod
+    def from_dict(cls, state: Mapping[str, Any]) -> 'RollingMean':
+        rolling = cls(state['window'])
+        rolling.values.extend(_load(state['values']))
+        rolling._resync()
+        return rolling
+
+class RollingMoments:
+    """Rolling mean and sample standard deviation via Welford's update and downdate.
+
+    Like pandas, a window whose valid values are all identical has a
+    standard deviation of exactly zero rather than rounding noise.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.pushes = 0
+        self.last = NAN
+        self.same = 0
+
+    def _step(self, x: float) -> Tuple[int, float, float]:
+        count, mean, m2 = self.count, self.mean, self.m2
+        if len(self.values) == self.window and not math.isnan(self.values[0]):
+            old = self.values[0]
+            if count == 1:
+                count, mean, m2 = 0, 0.0, 0.0
+            else:
+                count -= 1
+                delta = old - mean
+                mean -= delta / count
+                m2 -= delta * (old - mean)
+        if not math.isnan(x):
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        return count, mean, max(m2, 0.0)
+
+    def push(self, x: float, commit: bool = True) -> Tuple[float, float]:
+        """(mean, std) after appending x; std is NaN with fewer than two values, as in pandas."""
+        count, mean, m2 = self._step(x)
+        # Length of the run of identical valid values ending at x
+        last, same = (self.last, self.same) if math.isnan(x) else (x, self.same + 1 if x == self.last else 1)
+        if commit:
+            self.values.append(x)
+            self.count, self.mean, self.m2 = count, mean, m2
+            self.last, self.same = last, same
+            self.pushes += 1
+            if self.pushes % RESYNC_EVERY == 0:
+                self._resync()
+        if count == 0:
+            return NAN, NAN
+        if count == 1:
+            return mean, NAN
+        if same >= count:
+            return last, 0.0
+        return mean, math.sqrt(m2 / (count - 1))
+
+    def _resync(self) -> None:
+        present = [v for v in self.values if not math.isnan(v)]
+        self.count = len(present)
+        self.mean = math.fsum(present) / self.count if present else 0.0
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in present)
+        self.last, self.same = NAN, 0
+        for v in reversed(present):
+            if self.same and v != self.last:
+                break
+            self.last, self.same = v, self.same + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'window': self.window, 'values': _dump(self.values)}
+
+    @classmethod
+    def from_dict(cls, state: Mapping[str, Any]) -> 'RollingMoments':
+        rolling = cls(state['window'])
+        rolling.values.extend(_load(state['values']))
+        rolling._resync()
+        return rolling
+
+class RollingExtremes:
+    """Rolling min and max over the last `window` pushes using monotonic deques."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.position = 0
+        # (position, value) pairs; values increase along lows and decrease along highs
+        self.lows: deque = deque()
+        self.highs: deque = deque()
+
+    def _front(self, side: deque) -> float:
+        # Oldest entry still inside the window once the next value is appended;
+        # at most the front entry can expire on a single push
+        for position, value in side:
+            if position > self.position - self.window:
+                return value
+        return NAN
+
+    def push(self, x: float, commit: bool = True) -> Tuple[float, float]:
+        low, high = self._front(self.lows), self._front(self.highs)
+        if not math.isnan(x):
+            low = x if math.isnan(low) else min(low, x)
+            high = x if math.isnan(high) else max(high, x)
+        if commit:
+            expired = self.position - self.window
+            for side in (self.lows, self.highs):
+                while side and side[0][0] <= expired:
+                    side.popleft()
+            if not math.isnan(x):
+                while self.lows and self.lows[-1][1] >= x:
+                    self.lows.pop()
+                while self.highs and self.highs[-1][1] <= x:
+                    self.highs.pop()
+                self.lows.append((self.position, x))
+                self.highs.append((self.position, x))
+            self.position += 1
+        return low, high
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'window': self.window, 'position': self.position,
+                'lows': [list(entry) for entry in self.lows], 'highs': [list(entry) for entry in self.highs]}
+
+    @classmethod
+    def from_dict(cls, state: Mapping[str, Any]) -> 'RollingExtremes':
+        rolling = cls(state['window'])
+        rolling.position = state['position']
+        rolling.lows.extend((int(p), float(v)) for p, v in state['lows'])
+        rolling.highs.extend((int(p), float(v)) for p, v in state['highs'])
+        return rolling
+
+class IndicatorState:
+    """Streaming counterpart of compute_indicators: one constant-time update per bar.
+
+    update() returns the indicator row compute_indicators would produce for
+    the new bar given every bar pushed so far. Pass commit=False to evaluate
+    a provisional bar (e.g. the still-forming 5-minute bar) without adding
+    it to the windows; push it again with commit=True once it is final.
+    """
+
+    def __init__(self, spec: Optional[Dict[str, Any]] = None):
+        self.spec = {**DEFAULT_INDICATOR_SPEC, **(spec or {})}
+        self.closes = {w: RollingMoments(w) for w in {self.spec['short_window'], self.spec['long_window'], self.spec['bb_window']}}
+        self.gains = RollingMean(self.spec['rsi_period'])
+        self.losses = RollingMean(self.spec['rsi_period'])
+        self.volumes = RollingMean(self.spec['volume_window'])
+        self.extremes = RollingExtremes(self.spec['sr_window'])
+        self.true_ranges = RollingMean(self.spec['atr_period'])
+        self.prev_close: Optional[float] = None
+        self.first_close: Optional[float] = None
+        self.last_ma = (NAN, NAN)
+        self.bars = 0
+
+    def update(self, bar: Mapping[str, Any], commit: bool = True) -> Dict[str, float]:
+        close, high, low = _float(bar.get('Close')), _float(bar.get('High')), _float(bar.get('Low'))
+        volume = _float(bar.get('Volume'))
+        spec = self.spec
+        first_close = close if self.first_close is None else self.first_close
+        prev_close = NAN if self.prev_close is None else self.prev_close
+
+        moments = {w: rolling.push(close, commit) for w, rolling in self.closes.items()}
+        # MA columns are forward filled when a window holds no valid closes
+        ma_short, ma_long = moments[spec['short_window']][0], moments[spec['long_window']][0]
+        ma_short = self.last_ma[0] if math.isnan(ma_short) else ma_short
+        ma_long = self.last_ma[1] if math.isnan(ma_long) else ma_long
+
+        delta = close - prev_close
+        delta = 0.0 if math.isnan(delta) else delta
+        avg_gain = self.gains.push(max(delta, 0.0), commit)
+        avg_loss = self.losses.push(-min(delta, 0.0), commit)
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss) if avg_loss else 50.0
+
+        bb_mean, bb_std = moments[spec['bb_window']]
+        band = 0.0 if math.isnan(bb_std) else 2 * bb_std
+
+        avg_volume = self.volumes.push(volume, commit)
+        support, resistance = self.extremes.push(close, commit)
+
+        prev_for_range = first_close if math.isnan(prev_close) else prev_close
+        ranges = [r for r in (high - low, abs(high - prev_for_range), abs(low - prev_for_range)) if not math.isnan(r)]
+        atr = self.true_ranges.push(max(ranges) if ranges else NAN, commit)
+
+        if commit:
+            self.prev_close, self.first_close = close, first_close
+            self.last_ma = (ma_short, ma_long)
+            self.bars += 1
+        return {
+            'MA20': ma_short,
+            'MA50': ma_long,
+            'RSI': rsi,
+            'BB_upper': bb_mean + band,
+            'BB_lower': bb_mean - band,
+            'Volume_Spike': int(volume > avg_volume * spec['spike_multiplier']),
+            'Support': support,
+            'Resistance': resistance,
+            'ATR': 0.0 if math.isnan(atr) else atr,
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, spec: Optional[Dict[str, Any]] = None) -> 'IndicatorState':
+        """State after every bar of df, replaying only as many bars as the longest window needs."""
+        state = cls(spec)
+        if df.empty:
+            return state
+        longest = max(state.spec[key] for key in DEFAULT_INDICATOR_SPEC if key != 'spike_multiplier')
+        state.first_close = _float(df['Close'].iloc[0])
+        columns = [col for col in ('Close', 'High', 'Low', 'Volume') if col in df.columns]
+        for bar in df[columns].tail(longest + 1).to_dict('records'):
+            state.update(bar)
+        return state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'spec': self.spec,
+            'closes': [rolling.to_dict() for rolling in self.closes.values()],
+            'gains': self.gains.to_dict(),
+            'losses': self.losses.to_dict(),
+            'volumes': self.volumes.to_dict(),
+            'extremes': self.extremes.to_dict(),
+            'true_ranges': self.true_ranges.to_dict(),
+            'prev_close': _dump([self.prev_close])[0] if self.prev_close is not None else None,
+            'first_close': _dump([self.first_close])[0] if self.first_close is not None else None,
+            'last_ma': _dump(self.last_ma),
+            'bars': self.bars,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Mapping[str, Any]) -> 'IndicatorState':
+        restored = cls(state['spec'])
+        restored.closes = {c['window']: RollingMoments.from_dict(c) for c in state['closes']}
+        restored.gains = RollingMean.from_dict(state['gains'])
+        restored.losses = RollingMean.from_dict(state['losses'])
+        restored.volumes = RollingMean.from_dict(state['volumes'])
+        restored.extremes = RollingExtremes.from_dict(state['extremes'])
+        restored.true_ranges = RollingMean.from_dict(state['true_ranges'])
+        restored.prev_close = state['prev_close']
+        restored.first_close = state['first_close']
+        if state['bars'] and restored.first_close is None:
+            restored.first_close = NAN
+        restored.last_ma = tuple(_load(state['last_ma']))
+        restored.bars = state['bars']
+        return restored
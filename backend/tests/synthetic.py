@@ -0,0 +1,91 @@
+"""Synthetic market data and the original implementations that the tests and benchmark.py compare against."""
+import numpy as np
+import pandas as pd
+from typing import List
+from indicators import (
+    add_moving_averages,
+    add_rsi,
+    add_bollinger_bands,
+    add_volume_spike,
+    add_support_resistance,
+    add_atr,
+)
+
+def synthetic_ohlcv(rows: int, tickers: int = 1, freq: str = 'B', seed: int = 42) -> pd.DataFrame:
+    """Random-walk OHLCV bars; a (Ticker, Date) panel of rows // tickers bars each when tickers > 1."""
+    rng = np.random.default_rng(seed)
+    per_ticker = max(rows // tickers, 1)
+    index = pd.date_range('2000-01-03', periods=per_ticker, freq=freq, name='Date')
+    frames = []
+    for _ in range(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, per_ticker)))
+        spread = close * rng.uniform(0.002, 0.03, per_ticker)
+        frames.append(pd.DataFrame({
+            'Open': close + rng.normal(0, 0.5, per_ticker) * spread,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, per_ticker),
+        }, index=index))
+    if tickers == 1:
+        return frames[0]
+    return pd.concat(frames, keys=[f'T{t:04d}' for t in range(tickers)], names=['Ticker', 'Date'])
+
+def yfinance_style_bars(index: pd.DatetimeIndex, rng: np.random.Generator) -> pd.DataFrame:
+    """Bars with the columns a yfinance history(auto_adjust=False) download stores."""
+    rows = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+    spread = close * rng.uniform(0.002, 0.03, rows)
+    # Each stored series is read back with its own index
+    index = index.copy(deep=True)
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, rows) * spread, 'High': close + spread, 'Low': close - spread,
+        'Close': close, 'Adj Close': close * 0.98, 'Volume': rng.integers(1_000_000, 50_000_000, rows),
+        'Dividends': np.zeros(rows), 'Stock Splits': np.zeros(rows),
+    }, index=index)
+
+def with_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """The original add_* chain compute_indicators must reproduce."""
+    df = add_moving_averages(df)
+    df = add_rsi(df)
+    df = add_bollinger_bands(df)
+    df = add_volume_spike(df)
+    df = add_support_resistance(df)
+    df = add_atr(df)
+    return df
+
+def backtest_strategy_rowwise(df: pd.DataFrame, holding_days: int = 10, min_score: float = 4.5,
+                              stop_loss_pct: float = 5, take_profit_pct: float = 10) -> List[dict]:
+    """The original iloc-driven backtest loop backtest_strategy must reproduce."""
+    results = []
+    df = df.dropna()
+    for i in range(len(df) - holding_days):
+        row = df.iloc[i]
+        if row['Score'] >= min_score:
+            buy_price = row['Close']
+            max_hold_price = buy_price * (1 + take_profit_pct / 100)
+            min_hold_price = buy_price * (1 - stop_loss_pct / 100)
+            sell_price = df.iloc[i + holding_days]['Close']
+            for j in range(1, holding_days + 1):
+                day_price = df.iloc[i + j]['Close']
+                if day_price >= max_hold_price:
+                    sell_price = max_hold_price
+                    break
+                elif day_price <= min_hold_price:
+                    sell_price = min_hold_price
+                    break
+            return_pct = ((sell_price - buy_price) / buy_price) * 100
+            results.append({
+                'Buy Date': df.index[i].strftime('%Y-%m-%d'),
+                'Buy Price': round(buy_price, 2),
+                'Sell Price': round(sell_price, 2),
+                'Return (%)': round(return_pct, 2)
+            })
+    return results
+
+def legacy_merge_intraday(data: pd.DataFrame, intraday_data: pd.DataFrame) -> pd.DataFrame:
+    """fetch_data._merge_intraday before Bars: concat the last session and drop_duplicates on values."""
+    if intraday_data.empty:
+        return data
+    last_session = intraday_data.index.normalize() == intraday_data.index[-1].normalize()
+    return pd.concat([data, intraday_data[last_session]]).sort_index().drop_duplicates()
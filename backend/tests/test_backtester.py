@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import backtest_strategy, sweep_backtest
+from indicators import compute_indicators
+from scoring import score_frame
+from synthetic import backtest_strategy_rowwise, synthetic_ohlcv
+
+def scored_frame(rows: int = 120, score: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    return pd.DataFrame({'Close': close, 'Score': score}, index=pd.date_range('2024-01-01', periods=rows, freq='B'))
+
+@pytest.mark.parametrize('freq, holding_days', [('B', 10), ('5min', 78)])
+def test_backtest_strategy_matches_the_row_loop(freq, holding_days):
+    df = compute_indicators(synthetic_ohlcv(1_500, freq=freq))
+    # The live Score rarely reaches 4.5, so lift it until there are plenty of trades
+    df['Score'] = score_frame(df) + np.random.default_rng(0).integers(0, 5, len(df))
+    expected = backtest_strategy_rowwise(df, holding_days=holding_days)
+    assert len(expected) > 100
+    assert backtest_strategy(df, holding_days=holding_days) == expected
+
+def test_sweep_without_entries_reports_no_trades():
+    results = sweep_backtest(scored_frame(score=0.0), (5,), (4.5,), (5,), (10,))
+    assert len(results) == 1
+    assert results[0]['trades'] == 0 and results[0]['mean_return'] is None
+
+def test_sweep_without_entries_on_a_larger_grid():
+    results = sweep_backtest(scored_frame(score=0.0), (5, 10, 20), (2, 3, 4.5), (3, 5), (5, 10))
+    assert len(results) == 3 * 3 * 2 * 2
+    assert all(r['trades'] == 0 for r in results)
+
+def test_sweep_rejects_holding_days_below_one():
+    with pytest.raises(ValueError):
+        sweep_backtest(scored_frame(score=5.0), (0, 5), (4.5,), (5,), (10,))
+
+def test_sweep_matches_backtest_strategy():
+    df = compute_indicators(synthetic_ohlcv(600))
+    df['Score'] = score_frame(df) + np.random.default_rng(1).integers(0, 4, len(df))
+    grid = dict(holding_days=(3, 10, 20), min_scores=(2, 3.5), stop_losses=(2, 5), take_profits=(3, 10))
+    results = sweep_backtest(df, *grid.values(), max_workers=1)
+    assert len(results) == 3 * 2 * 2 * 2
+    for result in results:
+        trades = backtest_strategy(df, result['holding_days'], result['min_score'], result['stop_loss_pct'],
+                                   result['take_profit_pct'])
+        returns = np.array([trade['Return (%)'] for trade in trades])
+        assert result['trades'] == len(trades) > 0
+        # backtest_strategy rounds each return to 2 decimals, the sweep only the summary,
+        # so a tiny gain shown as 0.0 may still count as a hit
+        assert result['mean_return'] == pytest.approx(returns.mean(), abs=0.01)
+        assert (returns > 0).mean() * 100 - 0.01 <= result['hit_rate'] <= (returns >= 0).mean() * 100 + 0.01
+
+def test_sweep_reports_periods_longer_than_the_data():
+    df = scored_frame(rows=30, score=5.0)
+    results = sweep_backtest(df, (5, 30, 45), (4.5,), (5,), (10,))
+    assert [r['holding_days'] for r in results] == [5, 30, 45]
+    assert results[0]['trades'] == 25 and results[1]['trades'] == results[2]['trades'] == 0
+
+def test_sweep_endpoint_rejects_holding_days_below_one():
+    from fastapi.testclient import TestClient
+    import main
+
+    response = TestClient(main.app).get('/backtest/sweep', params={'ticker': 'AAPL', 'holding_days': [0, 5]})
+    assert response.status_code == 422
@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from providers import BarProvider
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+class LiveProvider(BarProvider):
+    """Daily bars that grow as the test advances; the newest bar can still be revised."""
+
+    name = 'live'
+
+    def __init__(self, rows: int = 50):
+        self.calls = []
+        self._lock = threading.Lock()
+        self.bars = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], dtype='float64')
+        self.append(rows)
+
+    def append(self, rows: int) -> None:
+        with self._lock:
+            first = len(self.bars)
+            index = pd.date_range(START, periods=first + rows, freq='D', name='Date')[first:]
+            close = 100.0 + np.arange(first, first + rows)
+            new = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                                'Volume': np.full(rows, 1_000.0)}, index=index)
+            self.bars = pd.concat([self.bars, new]) if first else new
+
+    def revise_last(self, close: float) -> None:
+        with self._lock:
+            self.bars.iloc[-1, self.bars.columns.get_loc('Close')] = close
+            self.bars.iloc[-1, self.bars.columns.get_loc('Volume')] += 500
+
+    def fetch_bars(self, ticker, interval, start, end=None):
+        with self._lock:
+            self.calls.append((ticker, pd.Timestamp(start) if start is not None else None))
+            bars = self.bars if start is None else self.bars[self.bars.index >= pd.Timestamp(start)]
+            return bars.copy()
+
+def store_for(tmp_path, provider, max_age: float = 0) -> BarStore:
+    return BarStore(root=str(tmp_path), provider=provider, max_age={'1d': max_age})
+
+def test_second_refresh_only_asks_for_bars_after_the_stored_tail(tmp_path):
+    provider = LiveProvider(50)
+    store = store_for(tmp_path, provider)
+    first = store.refresh_bars('AAA', '1d', start=START)
+    assert len(first) == 50 and provider.calls == [('AAA', pd.Timestamp(START))]
+
+    provider.append(3)
+    second = store.refresh_bars('AAA', '1d', start=START)
+    # The last stored bar is asked for again, since it may have been provisional
+    assert provider.calls[-1] == ('AAA', first.dates[-1].tz_convert('UTC'))
+    assert len(second) == 53
+    pd.testing.assert_frame_equal(second.to_frame(), provider.bars.rename_axis('Date'), check_freq=False,
+                                  check_dtype=False)
+
+def test_overlapping_bars_are_replaced_not_duplicated(tmp_path):
+    provider = LiveProvider(20)
+    store = store_for(tmp_path, provider)
+    store.refresh_bars('AAA', '1d', start=START)
+    provider.revise_last(555.0)
+    refreshed = store.refresh_bars('AAA', '1d', start=START)
+    assert len(refreshed) == 20 and np.all(np.diff(refreshed.stamps) > 0)
+    assert refreshed.close[-1] == 555.0 and refreshed.volume[-1] == 1_500
+
+def test_fresh_series_is_served_without_the_provider(tmp_path):
+    provider = LiveProvider(20)
+    store = store_for(tmp_path, provider, max_age=3600)
+    store.refresh_bars('AAA', '1d', start=START)
+    provider.append(5)
+    assert len(store.refresh_bars('AAA', '1d', start=START)) == 20 and len(provider.calls) == 1
+    assert len(store.refresh_bars('AAA', '1d', start=START, force=True)) == 25
+
+def test_earlier_start_downloads_the_whole_series_again(tmp_path):
+    provider = LiveProvider(30)
+    store = store_for(tmp_path, provider, max_age=3600)
+    later = START.replace(day=15)
+    assert len(store.refresh_bars('AAA', '1d', start=later)) == 16
+    full = store.refresh_bars('AAA', '1d', start=START)
+    assert provider.calls[-1] == ('AAA', pd.Timestamp(START)) and len(full) == 30
+
+def test_empty_result_is_remembered_until_max_age(tmp_path):
+    provider = LiveProvider(5)
+    store = store_for(tmp_path, provider, max_age=3600)
+    # Bars only start in 2026, so nothing before is stored
+    assert store.refresh_bars('AAA', '1d', start=datetime(2030, 1, 1, tzinfo=timezone.utc)).empty
+    assert store.refresh_bars('AAA', '1d', start=datetime(2030, 1, 1, tzinfo=timezone.utc)).empty
+    assert len(provider.calls) == 1
+
+def test_refresh_many_is_one_bulk_call_then_incremental(tmp_path):
+    provider = LiveProvider(10)
+    calls = []
+    provider.fetch_many = lambda tickers, interval, start, end=None: (
+        calls.append(list(tickers)) or BarProvider.fetch_many(provider, tickers, interval, start, end))
+    store = store_for(tmp_path, provider)
+    frames = store.refresh_many_bars(['AAA', 'BBB'], '1d', start=START)
+    provider.append(2)
+    frames = store.refresh_many_bars(['AAA', 'BBB'], '1d', start=START)
+    assert calls == [['AAA', 'BBB'], ['AAA', 'BBB']]
+    assert {t: len(bars) for t, bars in frames.items()} == {'AAA': 12, 'BBB': 12}
+    assert provider.calls[-1][1] == pd.Timestamp(START) + pd.Timedelta(days=9)
+
+def test_concurrent_refreshes_keep_the_store_consistent(tmp_path):
+    provider = LiveProvider(200)
+    # Two stores on one root: threads share a lock per store, stores share only the file lock
+    stores = [store_for(tmp_path, provider), store_for(tmp_path, provider)]
+
+    def refresh(i: int) -> int:
+        if i % 5 == 0:
+            provider.append(1)
+        if i % 7 == 0:
+            provider.revise_last(1_000.0 + i)
+        return len(stores[i % 2].refresh_bars('AAA', '1d', start=START))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        lengths = list(pool.map(refresh, range(100)))
+    assert min(lengths) >= 200
+
+    final = stores[0].refresh_bars('AAA', '1d', start=START, force=True)
+    assert np.all(np.diff(final.stamps) > 0)
+    pd.testing.assert_frame_equal(final.to_frame(), provider.bars.rename_axis('Date'), check_freq=False,
+                                  check_dtype=False)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bars import Bars
+from synthetic import legacy_merge_intraday, yfinance_style_bars
+
+LAST_DAY = pd.Timestamp('2026-10-16 16:00', tz='America/New_York')
+
+def daily_and_session():
+    daily = yfinance_style_bars(pd.date_range(end=LAST_DAY.normalize() - pd.Timedelta(days=1), periods=300,
+                                              freq='B', name='Date'), np.random.default_rng(7))
+    # Two sessions of 5-minute bars; only the last is merged
+    minutes = pd.date_range(end=LAST_DAY, periods=78 * 2, freq='5min', name='Date')
+    return daily, yfinance_style_bars(minutes, np.random.default_rng(8))
+
+@pytest.mark.parametrize('dtype, rtol', [('float64', 0), ('float32', 1e-6)])
+def test_merge_matches_the_frame_version(dtype, rtol):
+    daily, intraday = daily_and_session()
+    merged = Bars.from_frame(daily, dtype).merge(Bars.from_frame(intraday, dtype).last_session())
+    frame = merged.to_frame()
+    expected = legacy_merge_intraday(daily, intraday)
+    assert merged.close.dtype == dtype and len(frame) == len(expected)
+    pd.testing.assert_frame_equal(frame, expected[list(frame.columns)], check_dtype=False, check_freq=False,
+                                  check_exact=rtol == 0, rtol=rtol or 1e-5)
+
+def test_tail_and_to_frame_are_views():
+    daily, _ = daily_and_session()
+    bars = Bars.from_frame(daily)
+    window = bars.tail(90).to_frame()
+    assert len(window) == 90 and np.shares_memory(window['Close'].to_numpy(), bars.close)
+
+def test_from_frame_cleans_provider_rows():
+    index = pd.DatetimeIndex(['2026-10-14', '2026-10-12', '2026-10-13', '2026-10-12'], tz='UTC', name='Date')
+    frame = pd.DataFrame({'Open': [3.0, 1.0, 2.0, 2.5], 'High': [3.0, 1.0, 2.0, 2.5], 'Low': [3.0, 1.0, 2.0, 2.5],
+                          'Close': ['3', '1', 'bad', '2.5'], 'Volume': [30, 10, 20, 25]}, index=index)
+    bars = Bars.from_frame(frame)
+    # Sorted by time, the last of duplicate timestamps kept, unparseable cells NaN
+    assert list(bars.dates.day) == [12, 13, 14]
+    np.testing.assert_array_equal(bars.close, [2.5, np.nan, 3.0])
+    np.testing.assert_array_equal(bars.volume, [25, 20, 30])
+
+@pytest.mark.parametrize('interval, rule', [('15m', '15min'), ('1h', 'h'), ('1d', 'D')])
+def test_resample_matches_pandas_across_dst(interval, rule):
+    # Extended-hours 5-minute bars (04:00-20:00 ET) over the November DST change
+    sessions = pd.bdate_range(end='2026-11-13', periods=20)
+    minutes = pd.timedelta_range('4h', '19h55min', freq='5min')
+    index = pd.DatetimeIndex([d + m for d in sessions for m in minutes]).tz_localize('America/New_York')
+    frame = yfinance_style_bars(index, np.random.default_rng(7))
+    aggregation = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    expected = frame.resample(rule).agg(aggregation).dropna().rename_axis('Date')
+    pd.testing.assert_frame_equal(Bars.from_frame(frame).resample(interval).to_frame(), expected, check_freq=False)
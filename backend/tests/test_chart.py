@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+import bar_store
+from bar_store import BarStore
+from generate_graphs import bucket_max, lttb
+from providers import BarProvider
+from synthetic import synthetic_ohlcv
+
+def test_lttb_keeps_the_endpoints_in_order():
+    y = np.cumsum(np.random.default_rng(1).normal(size=50_000))
+    kept = lttb(y, 1200)
+    assert len(kept) == 1200 and kept[0] == 0 and kept[-1] == len(y) - 1
+    assert np.all(np.diff(kept) > 0)
+    # LTTB favours turning points, so the drawn range is nearly the full one
+    assert np.ptp(y[kept]) / np.ptp(y) > 0.95
+
+@pytest.mark.parametrize('threshold', [2, 100, 500])
+def test_lttb_keeps_short_series_whole(threshold):
+    y = np.arange(100, dtype='float64')
+    # Below three points there is nothing between the endpoints to choose from
+    assert lttb(y, threshold).tolist() == list(range(100))
+
+def test_bucket_max_keeps_every_peak_and_flag():
+    values = np.array([1, 5, 2, 3, 9, 4, 0, 7], dtype='float64')
+    flags = np.array([False, False, False, True, False, False, False, False])
+    starts, peaks, spikes = bucket_max(values, flags, 4)
+    assert starts.tolist() == [0, 2, 4, 6]
+    assert peaks.tolist() == [5, 3, 9, 7] and spikes.tolist() == [False, True, False, False]
+
+class DailyProvider(BarProvider):
+    name = 'test'
+
+    def __init__(self):
+        self.bars = synthetic_ohlcv(400)
+        yesterday = pd.Timestamp.now(tz='UTC').normalize() - pd.Timedelta(days=1)
+        self.bars.index = (self.bars.index - self.bars.index[-1] + yesterday.tz_localize(None)).tz_localize('UTC')
+
+    def fetch_bars(self, ticker, interval, start, end=None):
+        if interval != '1d':
+            return pd.DataFrame()
+        mask = self.bars.index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.bars.index < pd.Timestamp(end)
+        return self.bars[mask].copy()
+
+def test_chart_is_cached_and_revalidated(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(bar_store, '_store', BarStore(root=str(tmp_path), provider=DailyProvider()))
+    client = TestClient(main.app)
+    params = {'ticker': 'CHARTTEST', 'days': 180, 'width': 600, 'height': 400}
+    cold = client.get('/chart', params=params)
+    assert cold.status_code == 200 and cold.headers['x-cache'] == 'MISS'
+    assert cold.headers['content-type'] == 'image/png' and cold.content.startswith(b'\x89PNG')
+    warm = client.get('/chart', params=params)
+    assert warm.headers['x-cache'] == 'HIT' and warm.content == cold.content
+    revalidated = client.get('/chart', params=params, headers={'If-None-Match': warm.headers['etag']})
+    assert revalidated.status_code == 304
+    svg = client.get('/chart', params={**params, 'format': 'svg'})
+    assert svg.status_code == 200 and b'<svg' in svg.content
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import subprocess
+import sys
+import concurrency
+from concurrency import coalesce
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return object()
+
+    async def run():
+        results = await asyncio.gather(*(coalesce(('test', 'shared'), factory) for _ in range(20)))
+        assert ('test', 'shared') not in concurrency._in_flight
+        return results
+
+    results = asyncio.run(run())
+    assert len(calls) == 1 and all(result is results[0] for result in results)
+
+def test_a_caller_timing_out_does_not_cancel_the_shared_call():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    async def run():
+        impatient = asyncio.wait_for(coalesce(('test', 'timeout'), factory), 0.01)
+        patient = coalesce(('test', 'timeout'), factory)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(run())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == 'done' and len(calls) == 1
+
+def test_the_key_is_released_after_a_failure():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ValueError('provider down')
+        return 'recovered'
+
+    async def run():
+        failed = await asyncio.gather(*(coalesce(('test', 'failure'), factory) for _ in range(5)),
+                                      return_exceptions=True)
+        assert ('test', 'failure') not in concurrency._in_flight
+        return failed, await coalesce(('test', 'failure'), factory)
+
+    failed, retried = asyncio.run(run())
+    assert all(isinstance(error, ValueError) for error in failed)
+    assert retried == 'recovered' and len(calls) == 2
+
+def test_timeouts_come_from_the_environment():
+    # The timeouts are read at import, so check them in a fresh interpreter
+    code = (
+        "import asyncio, time, concurrency\n"
+        "print(concurrency.FETCH_TIMEOUT, concurrency.NEWS_TIMEOUT, concurrency.ANALYZE_TIMEOUT)\n"
+        "try:\n"
+        "    asyncio.run(concurrency.run_io(time.sleep, 2))\n"
+        "except asyncio.TimeoutError:\n"
+        "    print('timed out')\n"
+        "concurrency.shutdown()\n"
+    )
+    env = {**os.environ, 'STOCKAPP_FETCH_TIMEOUT': '0.2', 'STOCKAPP_NEWS_TIMEOUT': '3',
+           'STOCKAPP_ANALYZE_TIMEOUT': '45'}
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(concurrency.__file__)),
+                            env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split('\n')[:2] == ['0.2 3.0 45.0', 'timed out']
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import numpy as np
+import pandas as pd
+import fetch_data
+from bars import Bars
+from synthetic import synthetic_ohlcv
+
+def test_background_retrain_is_held_until_done_and_failures_logged(monkeypatch, caplog):
+    async def failing_train(ticker, recent_data, fingerprint):
+        await asyncio.sleep(0)
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(fetch_data, '_train_model', failing_train)
+
+    async def run():
+        fetch_data._retrain_in_background('AAPL', pd.DataFrame(), 'fp')
+        held = set(fetch_data._background_tasks)
+        await asyncio.gather(*held)
+        return held
+
+    with caplog.at_level(logging.ERROR):
+        held = asyncio.run(run())
+    assert len(held) == 1 and not fetch_data._background_tasks
+    assert "Background retrain failed for AAPL: provider down" in caplog.text
+
+def ohlcv(index: pd.DatetimeIndex, start: float = 100.0) -> Bars:
+    close = start + np.arange(len(index), dtype='float64')
+    return Bars.from_frame(pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                                         'Volume': np.full(len(index), 1_000.0)}, index=index))
+
+def session(day: str) -> Bars:
+    # Extended-hours 5-minute bars for one session
+    minutes = pd.date_range(f'{day} 04:00', f'{day} 19:55', freq='5min', tz='America/New_York')
+    return ohlcv(minutes, start=500.0)
+
+def daily_through(day: str) -> Bars:
+    return ohlcv(pd.date_range(end=day, periods=30, freq='B', tz='America/New_York'))
+
+def test_session_bar_is_appended_after_the_last_daily_bar():
+    daily, intraday = daily_through('2026-10-15'), session('2026-10-16')
+    merged = fetch_data._with_session_bar(daily, intraday)
+    assert len(merged) == len(daily) + 1
+    assert merged.dates[-1] == pd.Timestamp('2026-10-16', tz='America/New_York')
+    assert merged.close[-1] == intraday.close[-1] and merged.volume[-1] == intraday.volume.sum()
+
+def test_session_bar_never_replaces_a_daily_bar_for_the_same_date():
+    # e.g. after the close, once the provider has published the day's final bar
+    daily = daily_through('2026-10-16')
+    merged = fetch_data._with_session_bar(daily, session('2026-10-16'))
+    assert len(merged) == len(daily) and merged.close[-1] == daily.close[-1]
+    assert merged.volume[-1] == daily.volume[-1]
+
+def test_scored_panel_matches_per_ticker_frames():
+    frames = {f"T{seed}": Bars.from_frame(synthetic_ohlcv(300 + 10 * seed, seed=seed)) for seed in range(5)}
+    frames['EMPTY'] = Bars.empty_bars()
+    for days in (90, None):
+        panel = fetch_data.build_scored_panel(frames, days)
+        assert 'EMPTY' not in panel
+        for ticker, bars in frames.items():
+            if not bars.empty:
+                pd.testing.assert_frame_equal(panel[ticker], fetch_data.build_scored_frame(bars, days))
+
+class RecordingStore:
+    """Bar store stub that records where each series was asked to start."""
+
+    def __init__(self):
+        self.starts = {}
+
+    def refresh_bars(self, ticker, interval, start=None, end=None):
+        self.starts[interval] = start
+        return Bars.empty_bars()
+
+def test_analysis_downloads_days_calendar_days(monkeypatch):
+    # /analyze and /analyze/batch load the last `days` calendar days of daily bars, as they always have
+    asked = []
+
+    async def fetch_base_data(ticker, days, interval):
+        asked.append(('single', days))
+        return Bars.empty_bars()
+
+    def load_many_base_data(tickers, days, interval):
+        asked.append(('batch', days))
+        return {t: Bars.empty_bars() for t in tickers}
+
+    async def no_news(tickers):
+        return {}
+
+    monkeypatch.setattr(fetch_data, 'fetch_base_data', fetch_base_data)
+    monkeypatch.setattr(fetch_data, 'load_many_base_data', load_many_base_data)
+    monkeypatch.setattr(fetch_data, 'fetch_news_many', no_news)
+
+    async def run():
+        await fetch_data.analyze_stock('AAPL')
+        return [result async for result in fetch_data.analyze_many(['AAPL', 'MSFT'])]
+
+    batch = asyncio.run(run())
+    assert asked == [('single', 90), ('batch', 90)] and all('error' in result for result in batch)
+
+    store = RecordingStore()
+    monkeypatch.setattr(fetch_data, 'get_store', lambda: store)
+    fetch_data.load_base_data('AAPL', 90)
+    midnight = pd.Timestamp.now(tz=fetch_data.ist).normalize()
+    assert pd.Timestamp(store.starts['1d']) == midnight - pd.Timedelta(days=90)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import compute_indicators
+from synthetic import synthetic_ohlcv, with_indicators
+
+@pytest.mark.parametrize('rows', [10, 60, 5_000])
+def test_compute_indicators_matches_the_add_chain(rows):
+    df = synthetic_ohlcv(rows)
+    pd.testing.assert_frame_equal(with_indicators(df), compute_indicators(df), check_exact=True)
+
+def test_missing_closes():
+    df = synthetic_ohlcv(500)
+    df.iloc[::37, df.columns.get_loc('Close')] = np.nan
+    pd.testing.assert_frame_equal(with_indicators(df), compute_indicators(df), check_exact=True)
+
+def test_volume_is_coerced_like_add_volume_spike():
+    df = synthetic_ohlcv(200)
+    df['Volume'] = df['Volume'].astype(object)
+    df.iloc[[3, 50], df.columns.get_loc('Volume')] = ['n/a', None]
+    result = compute_indicators(df)
+    assert result['Volume'].dtype == 'float64' and result['Volume'].isna().sum() == 2
+    pd.testing.assert_frame_equal(with_indicators(df), result, check_exact=True)
+
+def test_recomputing_overwrites_existing_indicator_columns():
+    df = compute_indicators(synthetic_ohlcv(300))
+    df['Close'] *= 1.01
+    pd.testing.assert_frame_equal(with_indicators(df), compute_indicators(df), check_exact=True)
@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytest
+import market_calendar
+from market_calendar import NSE, US, session_ttl
+
+def new_york(*args) -> datetime:
+    return US.tz.localize(datetime(*args))
+
+HOUR = 3600
+
+@pytest.mark.parametrize('now, expected', [
+    # Wednesday mid-session: the open TTL
+    (new_york(2026, 10, 14, 10, 0), 60),
+    # Thirty seconds before the close: never past it
+    (new_york(2026, 10, 14, 19, 59, 30), 30),
+    # After the close: until Thursday's 04:00 open
+    (new_york(2026, 10, 14, 20, 30), 7.5 * HOUR),
+    # Friday evening and Saturday: until Monday's open
+    (new_york(2026, 10, 16, 20, 0), 56 * HOUR),
+    (new_york(2026, 10, 17, 12, 0), 40 * HOUR),
+])
+def test_session_ttl_for_a_us_ticker(now, expected):
+    assert session_ttl('AAPL', 60, now) == pytest.approx(expected)
+
+def test_closed_ttl_caps_only_off_hours():
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 14, 10, 0), closed_ttl=HOUR) == 60
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 17, 12, 0), closed_ttl=HOUR) == HOUR
+    # Shortly before the open the time to the open is still the limit
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 19, 3, 50), closed_ttl=HOUR) == pytest.approx(600)
+
+def test_session_ttl_follows_the_ticker_exchange():
+    now = NSE.tz.localize(datetime(2026, 10, 14, 10, 0))
+    assert session_ttl('RELIANCE.NS', 60, now) == 60
+    # 10:00 IST is 00:30 in New York, before the US pre-market opens at 04:00
+    assert session_ttl('AAPL', 60, now) == pytest.approx(3.5 * HOUR)
+
+def test_holidays_are_closed(monkeypatch):
+    monkeypatch.setattr(market_calendar, 'HOLIDAYS', {'2026-10-19'})
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 17, 12, 0)) == pytest.approx(64 * HOUR)
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 19, 10, 0)) == pytest.approx(18 * HOUR)
+
+def test_session_ttl_is_at_least_one_second():
+    assert session_ttl('AAPL', 60, new_york(2026, 10, 14, 19, 59, 59, 900_000)) == 1.0
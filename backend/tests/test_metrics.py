@@ -0,0 +1,48 @@
+import re
+from fastapi.testclient import TestClient
+import main
+import metrics
+
+# One sample line of the Prometheus text format: name, optional {labels}, value
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+def sample(name: str, **labels: str) -> str:
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+def scrape(client: TestClient) -> dict:
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith('#'):
+            assert re.match(r'^# (HELP|TYPE) \S+ ', line), line
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        samples[match.group(1) + (match.group(2) or '')] = float(match.group(3))
+    return samples
+
+def test_metrics_after_one_request():
+    client = TestClient(main.app)
+    before = scrape(client)
+    assert client.get('/').status_code == 200
+    with metrics.span('test_stage', cache='miss') as stage:
+        stage['rows'] = 7
+    after = scrape(client)
+
+    def delta(name: str) -> float:
+        return after.get(name, 0) - before.get(name, 0)
+
+    request = dict(method='GET', route='/', status='200')
+    assert delta(sample('stockapp_request_seconds_count', **request)) == 1
+    assert delta(sample('stockapp_request_seconds_bucket', **request, le='+Inf')) == 1
+    assert delta(sample('stockapp_request_seconds_sum', **request)) > 0
+    # Buckets are cumulative and end at the count
+    buckets = [after[sample('stockapp_request_seconds_bucket', **request, le=str(bound))]
+               for bound in list(metrics.BUCKETS) + ['+Inf']]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == after[sample('stockapp_request_seconds_count', **request)]
+
+    assert delta(sample('stockapp_stage_seconds_count', stage='test_stage', cache='miss')) == 1
+    assert delta(sample('stockapp_stage_rows_total', stage='test_stage')) == 7
+    assert 'stockapp_response_cache_entries' in after
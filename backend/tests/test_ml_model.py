@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+import ml_model
+from indicators import compute_indicators
+from ml_model import HORIZON, MIN_TEST_FRACTION, MIN_TRAIN, train_ml_model, walk_forward_splits
+from scoring import score_frame
+from synthetic import synthetic_ohlcv
+
+@pytest.mark.parametrize('n', [60, 80, 120, 250, 1000, 2500])
+def test_folds_are_at_least_the_old_holdout(n):
+    folds = walk_forward_splits(n)
+    for train, test in folds:
+        assert len(test) >= MIN_TEST_FRACTION * n
+        # Training targets look HORIZON bars ahead and must not reach the test block
+        assert train[-1] + HORIZON < test[0] and test[-1] < n
+    # Newest first, tiling the later part of the data
+    assert [test[0] for _, test in folds] == sorted((test[0] for _, test in folds), reverse=True)
+
+@pytest.mark.parametrize('n', [120, 250, 1000, 2500])
+def test_walk_forward_folds_keep_the_minimum_training_window(n):
+    folds = walk_forward_splits(n)
+    assert len(folds) > 1
+    assert all(len(train) >= max(MIN_TRAIN, n // 2) for train, _ in folds)
+
+@pytest.mark.parametrize('n', [60, 70, 80])
+def test_short_data_falls_back_to_one_holdout_split(n):
+    # No fold fits both MIN_TRAIN training rows and a 20% test block
+    [(train, test)] = walk_forward_splits(n)
+    assert test.tolist() == list(range(n - len(test), n)) and len(test) >= MIN_TEST_FRACTION * n
+    assert train.tolist() == list(range(test[0] - HORIZON))
+
+def indicator_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    df = compute_indicators(synthetic_ohlcv(rows, seed=seed))
+    df['Score'] = score_frame(df)
+    return df
+
+def test_candidates_are_screened_before_the_older_folds(monkeypatch):
+    calls = []
+    fit_fold = ml_model._fit_fold
+
+    def recording(name, X, y, train, test, fit=None, max_steps=len(ml_model.GROWTH_STEPS)):
+        calls.append((name, int(test[0]), max_steps))
+        return fit_fold(name, X, y, train, test, fit, max_steps)
+
+    monkeypatch.setattr(ml_model, '_fit_fold', recording)
+    model, mse = train_ml_model(indicator_frame(300), n_jobs=1)
+    assert hasattr(model, 'predict') and mse > 0
+
+    screening = [call for call in calls if call[2] == 1]
+    newest = max(start for _, start, _ in calls)
+    # Screening only sees the newest fold, so pruning can skip the older ones
+    assert len(screening) == 3 and {start for _, start, _ in screening} == {newest}
+    assert any(start < newest for _, start, _ in calls)
@@ -0,0 +1,100 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+import pytest
+import news_helper
+from news_helper import NEWS_UNAVAILABLE, NewsService, SentimentMemo, get_analyzer
+
+SHARED_HEADLINES = ["Stocks rally as inflation cools faster than expected",
+                    "Markets slump on recession fears", "Fed holds rates steady, signals patience"]
+
+def fixture_titles(ticker: str):
+    return SHARED_HEADLINES + [f"{ticker} beats earnings estimates", f"Analysts downgrade {ticker} on weak guidance"]
+
+class FixtureFeedHandler(BaseHTTPRequestHandler):
+    """Local RSS server: /rss?s=TICKER returns five headlines, three shared by every ticker."""
+
+    requests = 0
+
+    def do_GET(self):
+        FixtureFeedHandler.requests += 1
+        ticker = parse_qs(urlparse(self.path).query).get('s', ['X'])[0]
+        items = ''.join(f"<item><title>{escape(t)}</title><link>http://fixture/{i}</link>"
+                        f"<pubDate>Mon, 05 Oct 2026 1{i}:00:00 GMT</pubDate></item>"
+                        for i, t in enumerate(fixture_titles(ticker)))
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>{ticker}</title>{items}</channel></rss>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureFeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(news_helper, 'FEED_URL', f"http://127.0.0.1:{server.server_address[1]}/rss?s=%s")
+    FixtureFeedHandler.requests = 0
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def memo_path(tmp_path):
+    return os.path.join(tmp_path, 'news.db')
+
+def test_headlines_match_vader(feed_server, memo_path):
+    service = NewsService(memo=SentimentMemo(memo_path))
+    result = service.sentiment_many(['aapl', 'msft'])
+    assert list(result) == ['AAPL', 'MSFT']
+    analyzer = get_analyzer()
+    for ticker, news in result.items():
+        titles = fixture_titles(ticker)
+        assert [h['title'] for h in news['headlines']] == titles
+        expected = [analyzer.polarity_scores(t)['compound'] for t in titles]
+        assert [h['sentiment'] for h in news['headlines']] == expected
+        assert news['sentiment'] == pytest.approx(sum(expected) / len(expected))
+
+def test_shared_headlines_are_scored_once(feed_server, memo_path):
+    service = NewsService(memo=SentimentMemo(memo_path))
+    service.sentiment_many(['A', 'B', 'C'])
+    stats = service.stats()
+    assert stats['fetches'] == 3 and stats['headlines'] == 15
+    assert stats['unique_headlines'] == stats['scored'] == 3 + 2 * 3
+
+def test_cached_feeds_are_not_refetched(feed_server, memo_path):
+    service = NewsService(memo=SentimentMemo(memo_path))
+    first = service.sentiment_many(['A', 'B'])
+    assert service.sentiment_many(['B', 'A']) == {'B': first['B'], 'A': first['A']}
+    assert FixtureFeedHandler.requests == 2 and service.stats()['hits'] == 2
+
+def test_memo_survives_a_restart(feed_server, memo_path):
+    cold = NewsService(memo=SentimentMemo(memo_path)).sentiment_many(['A', 'B'])
+    # A new process: empty TTL cache, but the memo on disk still has every score
+    restarted = NewsService(memo=SentimentMemo(memo_path))
+    assert restarted.sentiment_many(['A', 'B']) == cold
+    assert restarted.stats()['fetches'] == 2 and restarted.stats()['scored'] == 0
+
+def test_failed_fetch_is_reported_unavailable(memo_path):
+    def fetch(ticker):
+        raise ConnectionError("feed down")
+
+    service = NewsService(memo=SentimentMemo(memo_path), fetch=fetch)
+    assert service.headlines_many(['A'])['A'] == NEWS_UNAVAILABLE
+    assert service.stats()['fetch_errors'] == 1
+
+def test_counters_add_up_under_concurrent_callers(memo_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    service = NewsService(ttl=0, memo=SentimentMemo(memo_path),
+                          fetch=lambda ticker: [{'title': f"{ticker} headline"}], workers=8)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: service.headlines_many([f"T{i % 50}", f"T{(i + 1) % 50}"]), range(400)))
+    stats = service.stats()
+    # ttl=0: nothing is served from the cache, so every ticker a caller owned was fetched once
+    assert stats['hits'] == 0 and stats['fetches'] == stats['headlines'] and stats['fetch_errors'] == 0
@@ -0,0 +1,67 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import payloads
+from payloads import ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, arrow_available, negotiate, render
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(payloads, 'orjson', None)
+    elif payloads.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def analysis() -> dict:
+    dates = pd.date_range('2026-10-14', periods=3, freq='D', tz='Asia/Kolkata', name='Date')
+    data = pd.DataFrame({'Date': dates, 'Close': [101.5, 102.0, 103.25], 'RSI': [np.nan, 55.0, np.inf],
+                         'Score': np.array([1, 2, 3], dtype='int64')})
+    return {'ticker': 'TCS.NS', 'data': data, 'predicted_price': np.float64('nan'), 'sentiment': 0.25}
+
+def test_records_round_trip(encoder):
+    body, media_type = render(analysis(), 'records')
+    payload = json.loads(body)
+    assert media_type == JSON_MEDIA_TYPE and 'format' not in payload
+    assert payload['predicted_price'] is None and payload['sentiment'] == 0.25
+    assert payload['data'][0] == {'Date': '2026-10-14T00:00:00+05:30', 'Close': 101.5, 'RSI': None, 'Score': 1}
+    assert [row['RSI'] for row in payload['data']] == [None, 55.0, None]
+
+def test_columnar_round_trip(encoder):
+    body, _ = render(analysis(), 'columnar')
+    # JSON.parse in the browser rejects bare NaN/Infinity, so strict parsing must succeed
+    payload = json.loads(body, parse_constant=lambda name: pytest.fail(f"non-JSON constant {name}"))
+    assert payload['format'] == 'columnar'
+    dates = pd.date_range('2026-10-14', periods=3, freq='D', tz='Asia/Kolkata')
+    assert payload['data']['Date'] == [int(d.timestamp() * 1000) for d in dates]
+    assert payload['data']['Close'] == [101.5, 102.0, 103.25]
+    assert payload['data']['RSI'] == [None, 55.0, None] and payload['data']['Score'] == [1, 2, 3]
+
+def test_encoders_agree(monkeypatch):
+    if payloads.orjson is None:
+        pytest.skip("orjson is not installed")
+    rendered = {fmt: json.loads(render(analysis(), fmt)[0]) for fmt in ('records', 'columnar')}
+    monkeypatch.setattr(payloads, 'orjson', None)
+    assert {fmt: json.loads(render(analysis(), fmt)[0]) for fmt in ('records', 'columnar')} == rendered
+
+def test_error_results_are_not_marked_columnar(encoder):
+    assert json.loads(render({'error': 'No data'}, 'columnar')[0]) == {'error': 'No data'}
+
+@pytest.mark.parametrize('fmt, accept, expected', [
+    ('columnar', ARROW_MEDIA_TYPE, 'columnar'),
+    ('arrow', None, 'arrow'),
+    (None, f"{ARROW_MEDIA_TYPE}, application/json;q=0.5", 'arrow'),
+    (None, 'application/json', 'records'),
+    ('bogus', None, 'records'),
+    (None, None, 'records'),
+])
+def test_negotiate(fmt, accept, expected):
+    assert negotiate(fmt, accept) == expected
+
+@pytest.mark.skipif(not arrow_available(), reason="pyarrow is not installed")
+def test_arrow_round_trip():
+    import pyarrow as pa
+    body, media_type = render(analysis(), 'arrow')
+    table = pa.ipc.open_stream(body).read_all()
+    assert media_type == ARROW_MEDIA_TYPE and table.column('Close').to_pylist() == [101.5, 102.0, 103.25]
+    assert json.loads(table.schema.metadata[b'stockapp'])['ticker'] == 'TCS.NS'
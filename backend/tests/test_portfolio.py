@@ -0,0 +1,103 @@
+import numpy as np
+import portfolio
+from indicators import compute_indicators
+from portfolio import build_panel, simulate_portfolio, summarize_portfolio
+from scoring import score_frame
+from synthetic import synthetic_ohlcv
+
+def scored_frames(tickers: int = 20, rows: int = 500):
+    scored = compute_indicators(synthetic_ohlcv(rows * tickers, tickers=tickers))
+    # The live Score rarely reaches 4.5, so lift it until the portfolio trades
+    scored['Score'] = score_frame(scored) + np.random.default_rng(0).integers(0, 5, len(scored))
+    return {ticker: group.droplevel(0) for ticker, group in scored.groupby(level=0, sort=False)}
+
+def test_memory_mapped_panel_gives_the_same_simulation(tmp_path, monkeypatch):
+    frames = scored_frames()
+    panel = build_panel(frames)
+    sim = simulate_portfolio(panel.close, panel.score, panel.atr, cost_bps=5)
+    assert summarize_portfolio(sim, 100_000)['trades'] > 0
+
+    monkeypatch.setattr(portfolio, 'MEMMAP_BYTES', 0)
+    mapped = build_panel(frames, str(tmp_path))
+    assert isinstance(mapped.close, np.memmap)
+    mapped_sim = simulate_portfolio(mapped.close, mapped.score, mapped.atr, cost_bps=5)
+    np.testing.assert_array_equal(sim['equity'], mapped_sim['equity'])
+
+def simulate(close, score=None, atr=None, **params):
+    """simulate_portfolio over hand-built (date x ticker) lists; by default every ticker signals on day 0 only."""
+    close = np.array(close, dtype='float64')
+    if score is None:
+        score = np.zeros_like(close)
+        score[:1] = 5
+    if atr is None:
+        atr = np.ones_like(close)
+    return simulate_portfolio(close, np.array(score, dtype='float64'), np.array(atr, dtype='float64'), **params)
+
+def test_take_profit_exits_at_the_level():
+    # 10% of equity buys 100 shares; the 112 close is beyond the 110 take-profit
+    sim = simulate([[100], [105], [112], [90]])
+    np.testing.assert_allclose(sim['equity'], [100_000, 100_500, 101_000, 101_000])
+    assert list(sim['exit_day']) == [2]
+    np.testing.assert_allclose(sim['sell_price'], [110])
+    np.testing.assert_allclose(sim['shares'], [100])
+    assert list(sim['positions']) == [1, 1, 0, 0]
+
+def test_stop_loss_exits_at_the_level():
+    sim = simulate([[100], [97], [94], [120]])
+    np.testing.assert_allclose(sim['equity'], [100_000, 99_700, 99_500, 99_500])
+    assert list(sim['exit_day']) == [2]
+    np.testing.assert_allclose(sim['sell_price'], [95])
+
+def test_positions_expire_after_holding_days_of_bars():
+    sim = simulate([[100], [101], [102], [103], [104]], holding_days=3)
+    assert list(sim['exit_day']) == [3] and list(sim['sell_price']) == [103]
+    # A day without a bar does not count towards the holding period
+    sim = simulate([[100], [np.nan], [101], [102], [103]], holding_days=2)
+    assert list(sim['exit_day']) == [3] and list(sim['sell_price']) == [102]
+    assert sim['equity'][1] == 100_000
+
+def test_max_positions_keeps_the_best_scores():
+    sim = simulate([[100, 100, 100]] * 3, score=[[5, 7, 6], [9, 0, 0], [0, 0, 0]], max_positions=2)
+    assert list(sim['positions']) == [2, 2, 2] and len(sim['ticker']) == 0
+    np.testing.assert_allclose(sim['cash'], 80_000)
+
+def test_atr_sizing_and_the_max_weight_cap():
+    # Losing 2 ATRs (20) on 50 shares is 1% of equity
+    sim = simulate([[100], [100]], atr=[[10], [10]])
+    np.testing.assert_allclose(sim['exposure'][0], 0.05)
+    # A tight ATR wants half the book; max_weight caps the position instead
+    sim = simulate([[100], [100]], atr=[[1], [1]], max_weight=0.25)
+    np.testing.assert_allclose(sim['exposure'][0], 0.25)
+
+def test_entries_stop_when_cash_runs_out():
+    close = [[100, 100, 100]] * 2
+    sim = simulate(close, score=[[7, 6, 5], [0, 0, 0]], max_weight=0.5)
+    assert list(sim['positions']) == [2, 2]
+    np.testing.assert_allclose(sim['cash'], 0)
+    # With costs the second position no longer fits
+    sim = simulate(close, score=[[7, 6, 5], [0, 0, 0]], max_weight=0.5, cost_bps=10)
+    assert list(sim['positions']) == [1, 1]
+
+def test_costs_are_paid_on_both_legs():
+    sim = simulate([[100], [105], [112]], cost_bps=10)
+    # 10 bps on the 10,000 buy, then on the 11,000 sale
+    np.testing.assert_allclose(sim['equity'], [99_990, 100_490, 100_979])
+    np.testing.assert_allclose(sim['turnover'], [10_000 / 99_990, 0, 11_000 / 100_979])
+
+def test_drawdown_from_the_running_peak():
+    np.testing.assert_allclose(portfolio.drawdown(np.array([100, 110, 99, 121, 110])), [0, 0, 0.1, 0, 11 / 121])
+
+def test_summarize_portfolio():
+    sim = simulate([[100], [97], [94], [120]])
+    summary = summarize_portfolio(sim, 100_000)
+    assert summary['trades'] == 1 and summary['hit_rate'] == 0
+    assert summary['total_return'] == -0.5 and summary['max_drawdown'] == 0.5
+    assert summary['cagr'] == round((0.995 ** (252 / 4) - 1) * 100, 2)
+    assert summary['mean_exposure'] == round((0.1 + 9_700 / 99_700) / 4 * 100, 2)
+    assert summary['annual_turnover'] == round((0.1 + 9_500 / 99_500) / (4 / 252) * 100, 2)
+
+def test_summarize_empty_portfolio():
+    sim = simulate(np.empty((0, 2)))
+    assert summarize_portfolio(sim, 100_000) == {
+        'trades': 0, 'total_return': None, 'cagr': None, 'max_drawdown': None,
+        'annual_turnover': None, 'hit_rate': None, 'mean_exposure': None}
@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+import pytest
+from providers import BarProvider, CSVProvider
+
+def test_provider_must_implement_fetch_bars():
+    class Incomplete(BarProvider):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_fetch_many_defaults_to_fetch_bars():
+    provider, start = CSVProvider(), datetime(1990, 1, 1, tzinfo=timezone.utc)
+    bars = provider.fetch_many(['AAA', 'BBB'], '1d', start)
+    assert list(bars) == ['AAA', 'BBB'] and not bars['AAA'].empty
+    assert bars['AAA'].equals(provider.fetch_bars('AAA', '1d', start))
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import math
+from collections import Counter
+import pytest
+from fastapi.testclient import TestClient
+import main
+import quote_hub
+from quote_hub import QuoteHub
+
+class CountingLoader:
+    """Quote loader that records each upstream poll; the snapshot changes every `every` polls."""
+
+    def __init__(self, every: int = 1):
+        self.every = every
+        self.calls: Counter = Counter()
+
+    def __call__(self, ticker: str):
+        self.calls[ticker] += 1
+        return {'ticker': ticker, 'price': 100 + self.calls[ticker] // self.every}
+
+def test_one_poller_per_symbol_fans_out_to_every_subscriber():
+    loader = CountingLoader()
+
+    async def run():
+        hub = QuoteHub(loader, interval=0.02, linger=0)
+        apple = [hub.subscribe('aapl') for _ in range(5)]
+        microsoft = [hub.subscribe('MSFT') for _ in range(3)]
+        assert set(hub._pollers) == {'AAPL', 'MSFT'}
+        assert hub.subscriber_count('AAPL') == 5 and hub.subscriber_count() == 8
+        first = [await queue.get() for queue in apple + microsoft]
+        await asyncio.sleep(0.1)
+        await hub.close()
+        return first
+
+    first = asyncio.run(run())
+    # Every subscriber got the very same snapshot object
+    assert all(snapshot is first[0] for snapshot in first[:5]) and first[0]['ticker'] == 'AAPL'
+    assert all(snapshot is first[5] for snapshot in first[5:]) and first[5]['ticker'] == 'MSFT'
+    # Upstream polls follow the interval, not the number of subscribers
+    assert 2 <= loader.calls['AAPL'] <= 10 and 2 <= loader.calls['MSFT'] <= 10
+
+def test_unchanged_snapshots_are_not_republished():
+    loader = CountingLoader(every=1_000)
+
+    async def run():
+        hub = QuoteHub(loader, interval=0.01, linger=0)
+        queue = hub.subscribe('AAPL')
+        await asyncio.sleep(0.1)
+        await hub.close()
+        return queue.qsize()
+
+    assert asyncio.run(run()) == 1 and loader.calls['AAPL'] > 1
+
+def test_a_slow_subscriber_drops_its_oldest_snapshots():
+    async def run():
+        hub = QuoteHub(CountingLoader(), interval=0.01, linger=0, queue_size=2)
+        queue = hub.subscribe('AAPL')
+        await asyncio.sleep(0.1)
+        await hub.close()
+        return [queue.get_nowait()['price'] for _ in range(queue.qsize())]
+
+    prices = asyncio.run(run())
+    assert len(prices) == 2 and prices[0] > 101 and prices[1] == prices[0] + 1
+
+def test_the_poller_stops_after_the_last_unsubscribe():
+    loader = CountingLoader()
+
+    async def run():
+        hub = QuoteHub(loader, interval=0.01, linger=0)
+        first, second = hub.subscribe('AAPL'), hub.subscribe('AAPL')
+        await first.get()
+        poller = hub._pollers['AAPL']
+        hub.unsubscribe('AAPL', first)
+        await asyncio.sleep(0.05)
+        assert not poller.done()
+        hub.unsubscribe('AAPL', second)
+        await asyncio.wait_for(poller, 1)
+        assert hub._pollers == {} and hub._latest == {} and hub.subscriber_count() == 0
+        polls = loader.calls['AAPL']
+        await asyncio.sleep(0.05)
+        return polls
+
+    assert asyncio.run(run()) == loader.calls['AAPL']
+
+def nan_quote(ticker):
+    return {'ticker': ticker, 'price': 101.5, 'indicators': {'RSI': math.nan, 'MA20': 100.0}}
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+def test_sse_quotes_are_strict_json(monkeypatch):
+    monkeypatch.setattr(quote_hub, '_hub', QuoteHub(nan_quote, interval=0.01, linger=0))
+
+    async def first_event():
+        # The event stream never ends, so read one frame straight off the response body
+        response = await main.stream(ConnectedRequest(), 'AAPL')
+        try:
+            return await response.body_iterator.__anext__()
+        finally:
+            await response.body_iterator.aclose()
+            await quote_hub.get_hub().close()
+
+    event, data = asyncio.run(first_event()).strip().split('\n')
+    assert event == 'event: quote'
+    assert json.loads(data.removeprefix('data: '), parse_constant=pytest.fail) == {
+        'ticker': 'AAPL', 'price': 101.5, 'indicators': {'RSI': None, 'MA20': 100.0}}
+
+def test_websocket_quotes_are_strict_json(monkeypatch):
+    monkeypatch.setattr(quote_hub, '_hub', QuoteHub(nan_quote, interval=0.01, linger=0))
+    with TestClient(main.app).websocket_connect('/ws?ticker=AAPL') as websocket:
+        message = json.loads(websocket.receive_text(), parse_constant=pytest.fail)
+    assert message == {'type': 'quote', 'ticker': 'AAPL', 'price': 101.5, 'indicators': {'RSI': None, 'MA20': 100.0}}
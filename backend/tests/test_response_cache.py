@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import main
+import response_cache
+from response_cache import ResponseCache, SQLiteKV
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+class Computation:
+    """compute() for ResponseCache.get that returns a new body each call."""
+
+    def __init__(self, cacheable: bool = True):
+        self.calls = 0
+        self.cacheable = cacheable
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return f'{{"version": {self.calls}}}'.encode(), 'application/json', self.cacheable
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+def test_stale_entries_are_served_while_one_refresh_runs(clock):
+    cache = ResponseCache(stale=100)
+    compute = Computation()
+
+    async def run():
+        first, status = await cache.get('key', compute, lambda: 60)
+        assert status == 'miss' and first.body == b'{"version": 1}'
+        assert (await cache.get('key', compute, lambda: 60))[1] == 'hit'
+
+        clock.now += 90
+        served = [await cache.get('key', compute, lambda: 60) for _ in range(3)]
+        # The old body goes out at once, and only one background refresh is started
+        assert all(status == 'stale' and entry.body == b'{"version": 1}' for entry, status in served)
+        await asyncio.gather(*cache._revalidating.values())
+        assert compute.calls == 2 and cache.counters['revalidations'] == 1
+
+        entry, status = await cache.get('key', compute, lambda: 60)
+        assert status == 'hit' and entry.body == b'{"version": 2}'
+
+        # Past stale_until the caller waits for a fresh computation
+        clock.now += 60 + 100
+        entry, status = await cache.get('key', compute, lambda: 60)
+        assert status == 'miss' and entry.body == b'{"version": 3}'
+
+    asyncio.run(run())
+
+def test_a_failed_background_refresh_keeps_the_stale_entry(clock):
+    cache = ResponseCache(stale=100)
+
+    async def failing():
+        raise RuntimeError('provider down')
+
+    async def run():
+        await cache.get('key', Computation(), lambda: 60)
+        clock.now += 90
+        entry, status = await cache.get('key', failing, lambda: 60)
+        await asyncio.gather(*cache._revalidating.values())
+        assert status == 'stale' and cache._entries['key'] is entry
+
+    asyncio.run(run())
+
+def test_errors_are_returned_but_not_cached(clock):
+    cache = ResponseCache()
+    compute = Computation(cacheable=False)
+
+    async def run():
+        for _ in range(2):
+            assert (await cache.get('key', compute, lambda: 60))[1] == 'miss'
+
+    asyncio.run(run())
+    assert compute.calls == 2 and cache.stats()['entries'] == 0
+
+def test_unchanged_content_keeps_its_etag_and_last_modified(clock):
+    cache = ResponseCache()
+
+    async def run():
+        first = await cache.put('key', b'{}', 'application/json', 60)
+        clock.now += 120
+        second = await cache.put('key', b'{}', 'application/json', 60)
+        changed = await cache.put('key', b'{"new": 1}', 'application/json', 60)
+        return first, second, changed
+
+    first, second, changed = asyncio.run(run())
+    assert second.etag == first.etag and second.last_modified == first.last_modified
+    assert second.fresh_until == first.fresh_until + 120
+    assert changed.etag != first.etag and changed.last_modified == clock.now
+
+def test_entries_round_trip_through_the_shared_backend(tmp_path):
+    backend = SQLiteKV(str(tmp_path / 'cache.db'))
+
+    async def run():
+        stored = await ResponseCache(backend=backend).put('key', b'{"a": 1}', 'application/json', 60)
+        # Another worker process starts with an empty in-process tier
+        other = ResponseCache(backend=backend)
+        entry, status = await other.get('key', Computation(), lambda: 60)
+        return stored, entry, status, other.counters['backend_hits']
+
+    stored, entry, status, backend_hits = asyncio.run(run())
+    assert status == 'hit' and entry == stored and backend_hits == 1
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def analyze_stock(ticker, interval='1d'):
+        calls.append(ticker)
+        return {'ticker': ticker, 'sentiment': 0.25}
+
+    monkeypatch.setattr(main, 'analyze_stock', analyze_stock)
+    monkeypatch.setattr(response_cache, '_cache', ResponseCache())
+    client = TestClient(main.app)
+    client.calls = calls
+    return client
+
+def test_conditional_requests_get_304(client):
+    first = client.get('/analyze', params={'ticker': 'TEST'})
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    assert first.json() == {'ticker': 'TEST', 'sentiment': 0.25}
+
+    revalidated = client.get('/analyze', params={'ticker': 'TEST'}, headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+    assert revalidated.headers['ETag'] == first.headers['ETag'] and revalidated.headers['X-Cache'] == 'HIT'
+
+    since = client.get('/analyze', params={'ticker': 'TEST'},
+                       headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+    other = client.get('/analyze', params={'ticker': 'TEST'}, headers={'If-None-Match': '"something-else"'})
+    assert other.status_code == 200 and other.content == first.content
+    assert client.calls == ['TEST']
+
+def test_each_format_is_cached_separately(client):
+    records = client.get('/analyze', params={'ticker': 'TEST'})
+    columnar = client.get('/analyze', params={'ticker': 'TEST', 'format': 'columnar'})
+    assert columnar.headers['X-Cache'] == 'MISS' and columnar.headers['ETag'] != records.headers['ETag']
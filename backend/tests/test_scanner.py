@@ -0,0 +1,70 @@
+import math
+import pytest
+from scanner import SignalIndex
+
+def indicators(close=100.0, score=0, rsi=50.0, spike=0, volume=1_000.0):
+    return {'Close': close, 'Volume': volume, 'Score': score, 'RSI': rsi, 'Volume_Spike': spike}
+
+def filled_index() -> SignalIndex:
+    # Small capacity so the block has to grow
+    index = SignalIndex(capacity=2)
+    index.update('AAA', indicators(score=3, rsi=25, spike=1))
+    index.update('BBB', indicators(score=1, rsi=45))
+    index.update('CCC', indicators(score=4, rsi=75, spike=1))
+    index.update('DDD', indicators(score=2, rsi=float('nan')))
+    index.update('EEE', indicators(score=0, rsi=35), latest_time='2026-10-16T15:30:00+05:30')
+    return index
+
+def tickers(rows):
+    return [row['ticker'] for row in rows]
+
+def test_filters():
+    index = filled_index()
+    assert len(index) == 5
+    assert tickers(index.query(min_score=2)) == ['CCC', 'AAA', 'DDD']
+    # RSI bounds are strict and never match a missing RSI
+    assert tickers(index.query(max_rsi=35)) == ['AAA']
+    assert tickers(index.query(min_rsi=35, max_rsi=75)) == ['BBB']
+    assert tickers(index.query(volume_spike=True)) == ['CCC', 'AAA']
+    assert tickers(index.query(volume_spike=False, min_score=1)) == ['DDD', 'BBB']
+
+def test_rows_are_typed_and_missing_values_are_none():
+    row = {r['ticker']: r for r in filled_index().query()}
+    assert row['AAA']['Score'] == 3 and isinstance(row['AAA']['Score'], int) and row['AAA']['Volume_Spike'] == 1
+    assert row['DDD']['RSI'] is None and row['DDD']['MA20'] is None
+    assert row['EEE']['latest_time'] == '2026-10-16T15:30:00+05:30' and 'Updated' not in row['EEE']
+
+def test_missing_values_sort_last_in_both_directions():
+    index = filled_index()
+    assert tickers(index.query(sort_by='RSI')) == ['CCC', 'BBB', 'EEE', 'AAA', 'DDD']
+    assert tickers(index.query(sort_by='RSI', descending=False)) == ['AAA', 'EEE', 'BBB', 'CCC', 'DDD']
+
+def test_top_k_matches_a_full_sort():
+    index = SignalIndex(capacity=4)
+    scores = [(i * 37) % 101 for i in range(300)]
+    for i, score in enumerate(scores):
+        index.update(f"T{i:03d}", indicators(score=score, rsi=float(i % 97)))
+    expected = sorted(range(300), key=lambda i: (-scores[i], i))[:10]
+    top = index.query(limit=10)
+    assert [row['Score'] for row in top] == [scores[i] for i in expected]
+    by_rsi = index.query(sort_by='RSI', descending=False, limit=7)
+    assert [row['RSI'] for row in by_rsi] == sorted(float(i % 97) for i in range(300))[:7]
+
+def test_remove_excludes_the_ticker_until_it_is_updated_again():
+    index = filled_index()
+    index.remove('CCC')
+    index.remove('ZZZ')  # Never indexed: nothing to do
+    assert 'CCC' not in tickers(index.query()) and len(index) == 5
+    index.update('CCC', indicators(score=5))
+    assert tickers(index.query(limit=1)) == ['CCC']
+
+def test_unknown_sort_column():
+    with pytest.raises(ValueError):
+        filled_index().query(sort_by='Bogus')
+
+def test_scan_rejects_unknown_sort_column():
+    from fastapi.testclient import TestClient
+    import main
+
+    response = TestClient(main.app).get('/scan', params={'sort': 'Bogus'})
+    assert response.status_code == 422
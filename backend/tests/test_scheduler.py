@@ -0,0 +1,41 @@
+import asyncio
+from scheduler import Scheduler, Watchlist
+
+def test_enqueue_runs_jobs_without_start():
+    # e.g. /precompute/run with no watchlists, or in a worker that lost the scheduler lock
+    done = []
+
+    async def job(ticker: str) -> None:
+        done.append(ticker)
+
+    async def run():
+        scheduler = Scheduler(job, [])
+        assert scheduler.enqueue(['aapl', 'msft']) == 2
+        await asyncio.wait_for(scheduler.drain(), 5)
+        status = scheduler.status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(run())
+    assert sorted(done) == ['AAPL', 'MSFT']
+    assert status['completed'] == 2 and not status['active']
+
+def test_failed_job_is_retried():
+    attempts = []
+
+    async def job(ticker: str) -> None:
+        attempts.append(ticker)
+        if len(attempts) == 1:
+            raise RuntimeError("provider down")
+
+    async def run():
+        scheduler = Scheduler(job, [Watchlist('core', ['TCS.NS'], 0)], retries=1, backoff=0.01)
+        scheduler.start()
+        await asyncio.wait_for(scheduler.drain(), 5)
+        status = scheduler.status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(run())
+    assert attempts == ['TCS.NS', 'TCS.NS']
+    assert status['active'] and status['retries'] == 1 and status['completed'] == 1
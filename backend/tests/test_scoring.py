@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import compute_indicators
+from scoring import generate_score, score_frame
+from synthetic import synthetic_ohlcv
+
+def synthetic_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    return compute_indicators(synthetic_ohlcv(rows, seed=seed))
+
+def assert_matches_rowwise(df: pd.DataFrame) -> None:
+    expected = df.apply(generate_score, axis=1)
+    np.testing.assert_array_equal(score_frame(df).to_numpy(), expected.to_numpy())
+
+def test_score_frame_matches_generate_score():
+    assert_matches_rowwise(synthetic_frame(2_000))
+
+def test_nan_and_zero_never_fire_a_rule():
+    # generate_score treats NaN/None and 0.0 as missing
+    df = synthetic_frame(2_000)
+    df.iloc[::97, df.columns.get_loc('RSI')] = np.nan
+    df.iloc[::89, df.columns.get_loc('MA20')] = 0.0
+    df.iloc[::83, df.columns.get_loc('Support')] = np.nan
+    df.iloc[::79, df.columns.get_loc('Close')] = 0.0
+    assert_matches_rowwise(df)
+
+def test_none_in_object_columns():
+    df = synthetic_frame(300)
+    df['Support'] = df['Support'].astype(object)
+    df.iloc[::7, df.columns.get_loc('Support')] = None
+    df['Volume_Spike'] = df['Volume_Spike'].astype(object)
+    df.iloc[::11, df.columns.get_loc('Volume_Spike')] = None
+    assert_matches_rowwise(df)
+
+def test_nan_volume_spike_counts_as_set():
+    # bool(nan) is True in the row-wise version
+    df = synthetic_frame(300)
+    df['Volume_Spike'] = df['Volume_Spike'].astype('float64')
+    df.iloc[::5, df.columns.get_loc('Volume_Spike')] = np.nan
+    assert_matches_rowwise(df)
+
+def test_panel_is_scored_per_row():
+    frames = {t: synthetic_frame(500, seed) for seed, t in enumerate(['AAA', 'BBB'])}
+    panel = pd.concat(frames, names=['Ticker'])
+    assert_matches_rowwise(panel)
+
+@pytest.mark.parametrize('df', [pd.DataFrame(), pd.DataFrame({'Close': [1.0, 2.0]})])
+def test_missing_columns_score_zero(df):
+    scores = score_frame(df)
+    assert scores.dtype == 'int64' and (scores == 0).all() and len(scores) == len(df)
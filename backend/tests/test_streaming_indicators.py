@@ -0,0 +1,31 @@
+import json
+import numpy as np
+import pandas as pd
+from indicators import compute_indicators
+from streaming_indicators import IndicatorState
+from synthetic import synthetic_ohlcv
+
+COLUMNS = ['MA20', 'MA50', 'RSI', 'BB_upper', 'BB_lower', 'Volume_Spike', 'Support', 'Resistance', 'ATR']
+
+def bars(rows: int = 2_000) -> pd.DataFrame:
+    df = synthetic_ohlcv(rows)
+    df.iloc[::97, df.columns.get_loc('Close')] = np.nan
+    return df
+
+def test_updates_match_compute_indicators():
+    df = bars()
+    state = IndicatorState()
+    got = pd.DataFrame([state.update(bar) for bar in df.to_dict('records')])[COLUMNS].to_numpy()
+    expected = compute_indicators(df)[COLUMNS].to_numpy()
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+    assert np.nanmax(np.abs(got - expected)) < 1e-6
+
+def test_state_round_trips_through_json():
+    records = bars().to_dict('records')
+    state = IndicatorState()
+    for bar in records[:-1]:
+        state.update(bar)
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    before, after = state.update(records[-1], commit=False), restored.update(records[-1], commit=False)
+    for col in COLUMNS:
+        assert np.isclose(before[col], after[col], rtol=1e-9, equal_nan=True), col
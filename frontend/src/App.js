@@ -28,6 +28,8 @@ import {
   RefreshCw,
 } from "lucide-react";
 
+const API_BASE = "https://stock-analysis-l6x2.onrender.com";
+
 // Enhanced UI Components
 const AnimatedCard = ({ children, className = "", gradient = "from-purple-400 to-pink-400", ...props }) => (
   <div
@@ -159,59 +161,61 @@ const ColorfulChart = ({ data, type = "line", colors = ["#FF6B6B", "#4ECDC4", "#
 function StockDashboard() {
   const [darkMode, setDarkMode] = useState(true);
   const [ticker, setTicker] = useState("AAPL");
+  // The analyzed symbol; ticker is only the input box, which changes on every keystroke
+  const [symbol, setSymbol] = useState("AAPL");
   const [isLoading, setIsLoading] = useState(false);
   const [stockData, setStockData] = useState(null);
   const [chartData, setChartData] = useState([]);
   const [rsiData, setRsiData] = useState([]);
   const [error, setError] = useState(null);
 
-  // Fetch stock data from backend
+  // Fetch the full analysis from backend; live prices arrive over the quote stream
   const fetchStockData = useCallback(async (symbol) => {
     setIsLoading(true);
     setError(null);
 
     try {
-      const priceResponse = await axios.get(`https://stock-analysis-l6x2.onrender.com/latest?ticker=${symbol}`);
-      const { latest_price, latest_time } = priceResponse.data;
-
-      const analyzeResponse = await axios.get(
-        `https://stock-analysis-l6x2.onrender.com/analyze?ticker=${symbol}&days=90`
-      );
+      // Columnar payload: one array per field, Date as epoch milliseconds
+      const analyzeResponse = await axios.get(`${API_BASE}/analyze?ticker=${symbol}&days=90&format=columnar`);
       const result = analyzeResponse.data;
 
       if (result.error) throw new Error(result.error);
 
-      const latestData = result.data[result.data.length - 1];
+      const cols = result.data;
+      const last = cols.Date.length - 1;
+      const lastClose = cols.Close[last];
       setStockData({
-        price: latest_price,
-        change: latest_price - latestData.Close || 0,
-        changePercent: ((latest_price - latestData.Close) / latestData.Close) * 100 || 0,
-        volume: latestData.Volume || 0,
+        price: lastClose,
+        lastClose,
+        change: 0,
+        changePercent: 0,
+        volume: cols.Volume[last] || 0,
         marketCap: 0, // Not available from current API, to be added if needed
-        rsi: latestData.RSI || 0,
-        ma20: latestData.MA20 || 0,
-        ma50: latestData.MA50 || 0,
-        support: latestData.Support || 0,
-        resistance: latestData.Resistance || 0,
-        score: latestData.Score || 0,
+        rsi: cols.RSI[last] || 0,
+        ma20: cols.MA20[last] || 0,
+        ma50: cols.MA50[last] || 0,
+        support: cols.Support[last] || 0,
+        resistance: cols.Resistance[last] || 0,
+        score: cols.Score[last] || 0,
         accuracy: 0, // Placeholder, to be calculated if ML model provides it
       });
 
       // Prepare chart data
       setChartData(
-        result.data.map((d) => ({
-          name: new Date(d.Date).toLocaleTimeString("en-US", { timeZone: "Asia/Kolkata", hour: "2-digit", minute: "2-digit" }),
-          value: d.Close,
-          volume: d.Volume,
-          price: d.Close,
+        cols.Date.map((date, i) => ({
+          name: new Date(date).toLocaleTimeString("en-US", { timeZone: "Asia/Kolkata", hour: "2-digit", minute: "2-digit" }),
+          value: cols.Close[i],
+          volume: cols.Volume[i],
+          price: cols.Close[i],
         }))
       );
 
-      // Prepare RSI data (simplified for now)
+      // Prepare RSI data (simplified for now); fewer than five rows just gives fewer points
+      const recentRsi = cols.RSI.slice(-5);
       setRsiData(
-        result.data.slice(-5).map((d) => ({
-          name: new Date(d.Date).toLocaleDateString("en-US", { weekday: "short" }),
-          value: d.RSI || 0,
+        cols.Date.slice(-recentRsi.length).map((date, i) => ({
+          name: new Date(date).toLocaleDateString("en-US", { weekday: "short" }),
+          value: recentRsi[i] || 0,
         }))
       );
     } catch (err) {
@@ -222,25 +226,53 @@ function StockDashboard() {
     }
   }, []);
 
+  // Apply a pushed quote: latest price plus the newest indicator values
+  const applyQuote = useCallback((quote) => {
+    if (quote.error) {
+      console.error("Stream Error:", quote.error);
+      return;
+    }
+    setStockData((prev) => {
+      if (!prev) return prev;
+      const ind = quote.indicators || {};
+      const price = quote.latest_price ?? prev.price;
+      return {
+        ...prev,
+        price,
+        change: price - prev.lastClose || 0,
+        changePercent: ((price - prev.lastClose) / prev.lastClose) * 100 || 0,
+        volume: ind.Volume ?? prev.volume,
+        rsi: ind.RSI ?? prev.rsi,
+        ma20: ind.MA20 ?? prev.ma20,
+        ma50: ind.MA50 ?? prev.ma50,
+        support: ind.Support ?? prev.support,
+        resistance: ind.Resistance ?? prev.resistance,
+        score: ind.Score ?? prev.score,
+      };
+    });
+  }, []);
+
   // Handle analyze button click
   const handleAnalyze = useCallback(() => {
     if (ticker && /^[A-Z]{1,5}$/.test(ticker)) {
-      fetchStockData(ticker);
+      // A new symbol reloads through the effect below; the same one just refreshes
+      if (ticker === symbol) fetchStockData(ticker);
+      else setSymbol(ticker);
     } else {
       alert("Please enter a valid stock ticker (e.g., AAPL).");
     }
-  }, [ticker, fetchStockData]);
+  }, [ticker, symbol, fetchStockData]);
 
-  // Initial load and polling
+  // Initial load, then subscribe to server-pushed quotes (EventSource reconnects on its own)
   useEffect(() => {
-    fetchStockData(ticker);
+    fetchStockData(symbol);
 
-    const interval = setInterval(() => {
-      if (ticker) fetchStockData(ticker);
-    }, 60000); // Poll every minute
+    const source = new EventSource(`${API_BASE}/stream?ticker=${symbol}`);
+    source.addEventListener("quote", (event) => applyQuote(JSON.parse(event.data)));
+    source.onerror = (err) => console.error("Stream Error:", err);
 
-    return () => clearInterval(interval);
-  }, [ticker, fetchStockData]);
+    return () => source.close();
+  }, [symbol, fetchStockData, applyQuote]);
 
   return (
     <div
@@ -340,7 +372,7 @@ function StockDashboard() {
               <div className="flex items-center justify-between mb-6">
                 <h2 className="text-2xl font-bold text-white flex items-center gap-2">
                   <Zap className="w-6 h-6" />
-                  {ticker} Price Movement
+                  {symbol} Price Movement
                 </h2>
                 <div className="px-4 py-2 rounded-xl bg-green-400/30 text-green-100 text-sm font-semibold">
                   {stockData.changePercent.toFixed(2)}%